@@ -1,14 +1,47 @@
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+import time
+
+# Measured from here to the end of the imports below, which is nearly all of a worker's import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 import os
+import json
 import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from app.services.youtube_service import get_youtube_transcript
-from app.services.llm_service import generate_summary, generate_mcqs
+from app.services.youtube_service import (
+    get_youtube_transcript, get_transcript_for_video, get_transcript_cache, transcript_flights,
+    provider_registry, host_limiter, select_time_range
+)
+from app.services.http_client import close_http_clients
+from app.services.groq_client import close_groq_clients
+from app.services.caption_parsing import shutdown_parser_pool
+from app.services.pipeline import process_video, OUTPUTS
+from app.services.retrieval import focus_transcript, search_transcript, RETRIEVAL_TOP_K
+from app.services.metrics import registry as metrics_registry, MetricsMiddleware, gauge, counter
+from app.services.disconnect import DisconnectMiddleware
+from app.services.batch import canonicalize_inputs, get_playlist_video_ids, fetch_transcripts, BATCH_MAX_VIDEOS
+from app.services.llm_scheduler import llm_scheduler, LLMOverloadedError
+from app.services.jobs import (
+    get_job_manager, public_job, key_hash, JobQueueFullError, JobsDrainingError, FINISHED
+)
+from app.services.llm_service import (
+    generate_summary, generate_mcqs, stream_summary, stream_mcqs, llm_flights, get_llm_cache,
+    admit_summary, admit_quiz, CACHE_DEFAULT, CACHE_REFRESH, CACHE_BYPASS, QUIZ_MAX_QUESTIONS
+)
+from app.services.warmup import warm_up, WARMUP_ON_STARTUP
+from app.services.providers import NoTranscriptError, TranscriptNotCachedError
+from app.services.responses import (
+    EncodedBodyCache, encode_body, applied_encoding, negotiate_encoding, content_etag, quoted_etag, etag_matches,
+    IDENTITY,
+)
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 # Configure logging
 logging.basicConfig(
@@ -20,10 +53,29 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Seconds spent importing and starting up this worker, reported on /metrics
+startup_timings: Dict[str, float] = {"import": IMPORT_SECONDS}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if WARMUP_ON_STARTUP:
+        startup_timings.update({f"warmup_{step}": seconds for step, seconds in (await warm_up()).items()})
+    await get_job_manager().start()
+    startup_timings["startup"] = time.perf_counter() - started
+    logger.info(f"Worker ready: imports took {IMPORT_SECONDS:.2f}s, startup {startup_timings['startup']:.2f}s")
+    yield
+    await get_job_manager().stop()
+    # Release pooled outbound connections
+    await close_http_clients()
+    await close_groq_clients()
+    shutdown_parser_pool()
+
 app = FastAPI(
     title="Epochly Backend API",
     description="Backend API for Epochly learning platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS - make it more permissive for development
@@ -34,17 +86,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(DisconnectMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Request and Response Models
 class TranscriptRequest(BaseModel):
     url: str
     instructions: Optional[str] = None
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds to wait for the transcript")
+    start: Optional[float] = Field(None, ge=0, description="Section start in seconds")
+    end: Optional[float] = Field(None, gt=0, description="Section end in seconds")
+    focus: Optional[str] = Field(None, min_length=1, max_length=500, description="Topic to restrict the summary to")
 
 class TranscriptResponse(BaseModel):
     success: bool
     transcript: str
     summary: Optional[str] = None
     video_id: str
+    normalization: Optional[Dict[str, Any]] = Field(None, description="Transcript clean-up statistics, including tokens saved")
 
 class QuizQuestion(BaseModel):
     question: str
@@ -53,12 +112,69 @@ class QuizQuestion(BaseModel):
     explanation: Optional[str] = None
 
 class QuizRequest(BaseModel):
-    transcript: str
-    numQuestions: Optional[int] = 5
+    transcript: Optional[str] = None
+    video_id: Optional[str] = Field(None, description="Quiz a video from the server-side transcript store instead")
+    numQuestions: int = Field(5, ge=1, le=QUIZ_MAX_QUESTIONS, description="Number of quiz questions")
+    start: Optional[float] = Field(None, ge=0, description="Section start in seconds (with video_id)")
+    end: Optional[float] = Field(None, gt=0, description="Section end in seconds (with video_id)")
+    focus: Optional[str] = Field(None, min_length=1, max_length=500, description="Topic to restrict the questions to")
+    
+    @model_validator(mode="after")
+    def check_source(self) -> "QuizRequest":
+        if (self.transcript is None) == (self.video_id is None):
+            raise ValueError("Provide exactly one of transcript or video_id")
+        if self.transcript is not None and (self.start is not None or self.end is not None):
+            raise ValueError("start and end require video_id")
+        return self
 
 class QuizResponse(BaseModel):
     questions: List[QuizQuestion]
 
+class TranscriptPassage(BaseModel):
+    text: str
+    score: float
+    start: Optional[float] = None
+
+class TranscriptSearchResponse(BaseModel):
+    video_id: str
+    query: str
+    results: List[TranscriptPassage]
+
+class ProcessRequest(BaseModel):
+    url: str
+    outputs: List[Literal["transcript", "summary", "quiz"]] = Field(list(OUTPUTS), min_length=1)
+    instructions: Optional[str] = None
+    numQuestions: int = Field(5, ge=1, le=QUIZ_MAX_QUESTIONS, description="Number of quiz questions")
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds to wait for the transcript")
+    start: Optional[float] = Field(None, ge=0, description="Section start in seconds")
+    end: Optional[float] = Field(None, gt=0, description="Section end in seconds")
+    focus: Optional[str] = Field(None, min_length=1, max_length=500, description="Topic to restrict the summary and quiz to")
+
+class ProcessResponse(BaseModel):
+    success: bool
+    video_id: str
+    transcript: Optional[str] = None
+    summary: Optional[str] = None
+    questions: Optional[List[QuizQuestion]] = None
+
+class BatchTranscriptRequest(BaseModel):
+    urls: List[str] = Field([], description="Video URLs or IDs")
+    playlist: Optional[str] = Field(None, description="Playlist URL or ID whose videos are added")
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds to wait for each transcript")
+    include_transcript: bool = True
+
+class JobRequest(ProcessRequest):
+    outputs: List[Literal["transcript", "summary", "quiz"]] = Field(["transcript"], min_length=1)
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    outputs: List[str]
+    created_at: float
+    updated_at: float
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 # Dependency for API Key validation
 def get_api_credentials(
     x_api_key: Optional[str] = Header(None),
@@ -78,6 +194,65 @@ def get_api_credentials(
     
     return {"api_key": x_api_key, "api_provider": x_api_provider}
 
+def sse_event(event: str, data: dict) -> str:
+    """
+    Format a Server-Sent Event with a JSON payload
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Seconds between job re-reads while following a job over SSE
+JOB_EVENTS_POLL_INTERVAL = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "2"))
+
+# Browser and CDN lifetimes (seconds) of GET /api/transcript/{video_id} responses
+TRANSCRIPT_HTTP_MAX_AGE = int(os.getenv("TRANSCRIPT_HTTP_MAX_AGE", "3600"))
+TRANSCRIPT_HTTP_SHARED_MAX_AGE = int(os.getenv("TRANSCRIPT_HTTP_SHARED_MAX_AGE", "86400"))
+# Lifetime of "no transcript" answers, kept short because captions can be added later
+TRANSCRIPT_HTTP_MISSING_MAX_AGE = int(os.getenv("TRANSCRIPT_HTTP_MISSING_MAX_AGE", "300"))
+
+# Encoded and compressed transcript bodies, keyed by ETag
+transcript_bodies = EncodedBodyCache()
+
+# Dependency for the LLM result cache mode
+def get_cache_mode(
+    x_llm_cache: Optional[str] = Header(None),
+    cache_control: Optional[str] = Header(None)
+) -> str:
+    """
+    Read the caller's LLM cache preference
+
+    `X-LLM-Cache: refresh` (or `Cache-Control: no-cache`) regenerates the
+    result and replaces the cached one, which gives quizzes a fresh variant.
+    `X-LLM-Cache: bypass` (or `Cache-Control: no-store`) neither reads nor
+    writes the cache.
+    """
+    if x_llm_cache:
+        mode = x_llm_cache.strip().lower()
+        if mode not in (CACHE_DEFAULT, CACHE_REFRESH, CACHE_BYPASS):
+            raise HTTPException(
+                status_code=400,
+                detail="X-LLM-Cache must be one of: default, refresh, bypass"
+            )
+        return mode
+    if cache_control:
+        directives = {d.strip().lower() for d in cache_control.split(",")}
+        if "no-store" in directives:
+            return CACHE_BYPASS
+        if "no-cache" in directives:
+            return CACHE_REFRESH
+    return CACHE_DEFAULT
+
+def rate_limited(error: LLMOverloadedError) -> HTTPException:
+    """
+    429 response telling the client when to retry
+    """
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -92,26 +267,118 @@ async def global_exception_handler(request: Request, exc: Exception):
 async def root():
     return {"message": "Welcome to Epochly Backend API"}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        "transcripts": get_transcript_cache().get_stats(),
+        "llm": get_llm_cache().get_stats(),
+        "transcript_bodies": transcript_bodies.get_stats(),
+        "in_flight": {
+            "transcripts": transcript_flights.get_stats(),
+            "llm": llm_flights.get_stats(),
+        },
+    }
+
+def collect_service_metrics():
+    """
+    Cache, in-flight, queue and circuit breaker statistics for /metrics, read at scrape time
+    """
+    caches = {"transcripts": get_transcript_cache().get_stats(), "llm": get_llm_cache().get_stats()}
+    yield counter("cache_lookups_total", "Cache lookups by tier that answered them", [
+        ({"cache": name, "result": result}, stats[field])
+        for name, stats in caches.items()
+        for result, field in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("seed_hit", "seed_hits"), ("miss", "misses"))
+    ])
+    yield gauge("cache_hit_ratio", "Share of cache lookups that were hits", [
+        ({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()
+    ])
+    yield gauge("cache_memory_bytes", "Size of the in-process cache tier", [
+        ({"cache": name}, stats["memory_bytes"]) for name, stats in caches.items()
+    ])
+    flights = {"transcripts": transcript_flights.get_stats(), "llm": llm_flights.get_stats()}
+    yield gauge("in_flight", "Distinct transcript fetches and LLM generations in progress", [
+        ({"kind": name}, stats["in_flight"]) for name, stats in flights.items()
+    ])
+    yield counter("coalesced_total", "Calls that joined work already in flight", [
+        ({"kind": name}, stats["followers"]) for name, stats in flights.items()
+    ])
+    yield counter("cancelled_work_total", "Shared work cancelled because every request waiting for it went away", [
+        ({"kind": name}, stats["cancelled"]) for name, stats in flights.items()
+    ])
+    keys = llm_scheduler.get_stats().values()
+    yield gauge("llm_active_calls", "Groq calls in progress", [({}, sum(k["active"] for k in keys))])
+    yield gauge("llm_queued_calls", "Groq calls waiting for their API key's rate limit", [({}, sum(k["queued"] for k in keys))])
+    yield counter("llm_calls_total", "Groq calls by scheduler outcome", [
+        ({"result": result}, sum(k[result] for k in keys)) for result in ("calls", "shed", "rate_limited", "retries")
+    ])
+    jobs = get_job_manager().get_stats()
+    yield gauge("jobs_running", "Jobs running in this process", [({}, jobs["running"])])
+    yield gauge("jobs_queued", "Jobs queued in this process", [({}, jobs["queued"])])
+    hosts = host_limiter.get_stats()
+    yield counter("upstream_requests_total", "Requests sent to each upstream host", [
+        ({"host": host}, stats["requests"]) for host, stats in hosts.items()
+    ])
+    yield counter("upstream_throttled_total", "Upstream requests delayed by the host's rate limit", [
+        ({"host": host}, stats["throttled"]) for host, stats in hosts.items()
+    ])
+    providers = provider_registry.get_stats()["providers"]
+    yield gauge("worker_startup_seconds", "Seconds this worker spent in each startup phase (import, warm-up steps, startup)", [
+        ({"phase": phase}, seconds) for phase, seconds in startup_timings.items()
+    ])
+    yield gauge("provider_circuit_open", "Whether a transcript source's circuit breaker is not closed", [
+        ({"source": name}, 0 if stats["state"] == "closed" else 1) for name, stats in providers.items()
+    ])
+
+metrics_registry.add_collector(collect_service_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Metrics of this worker process in the Prometheus text format
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/llm/scheduler")
+async def llm_scheduler_stats():
+    return llm_scheduler.get_stats()
+
+@app.get("/api/providers")
+async def provider_health():
+    return {**provider_registry.get_stats(), "hosts": host_limiter.get_stats()}
+
 @app.post("/api/transcript", response_model=TranscriptResponse)
 async def fetch_transcript(
     request: TranscriptRequest,
-    credentials: dict = Depends(get_api_credentials)
+    credentials: dict = Depends(get_api_credentials),
+    cache_mode: str = Depends(get_cache_mode)
 ):
     try:
         logger.info(f"Processing transcript request for URL: {request.url}")
         
         # Get transcript from YouTube
-        transcript_result = get_youtube_transcript(request.url)
+        transcript_result = await get_youtube_transcript(request.url, deadline=request.deadline)
         logger.info(f"Successfully retrieved transcript for video ID: {transcript_result['video_id']}")
+        normalization = transcript_result.get("normalization")
+        sectioned = request.start is not None or request.end is not None
+        transcript_result = select_time_range(transcript_result, request.start, request.end)
         
         # Generate summary if requested
         summary = None
         if request.instructions:
             logger.info("Generating summary with instructions")
+            summary_text = transcript_result["transcript"]
+            if request.focus:
+                summary_text = await focus_transcript(
+                    summary_text, request.focus, video_id=None if sectioned else transcript_result["video_id"]
+                )
+            await admit_summary(summary_text, credentials["api_key"], request.instructions, cache_mode)
             summary = await generate_summary(
-                transcript_result["transcript"], 
+                summary_text, 
                 credentials["api_key"],
-                request.instructions
+                request.instructions,
+                # A section or focused excerpt is keyed by its own text, not the whole video
+                video_id=None if sectioned or request.focus else transcript_result["video_id"],
+                cache_mode=cache_mode
             )
             logger.info("Summary generated successfully")
         
@@ -119,8 +386,11 @@ async def fetch_transcript(
             "success": True,
             "transcript": transcript_result["transcript"],
             "summary": summary,
-            "video_id": transcript_result["video_id"]
+            "video_id": transcript_result["video_id"],
+            "normalization": normalization
         }
+    except LLMOverloadedError as e:
+        raise rate_limited(e)
     except ValueError as e:
         logger.error(f"ValueError in fetch_transcript: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -128,24 +398,373 @@ async def fetch_transcript(
         logger.error(f"Unexpected error in fetch_transcript: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@app.post("/api/transcript/stream")
+async def stream_transcript(
+    request: TranscriptRequest,
+    credentials: dict = Depends(get_api_credentials),
+    cache_mode: str = Depends(get_cache_mode)
+):
+    """
+    Streaming variant of /api/transcript over Server-Sent Events
+
+    Sends a `transcript` event as soon as the transcript is available, then
+    `summary` events carrying summary text deltas, and finally `done`.
+    """
+    logger.info(f"Processing streaming transcript request for URL: {request.url}")
+    try:
+        transcript_result = await get_youtube_transcript(request.url, deadline=request.deadline)
+        sectioned = request.start is not None or request.end is not None
+        transcript_result = select_time_range(transcript_result, request.start, request.end)
+        summary_text = transcript_result["transcript"]
+        if request.instructions and request.focus:
+            summary_text = await focus_transcript(
+                summary_text, request.focus, video_id=None if sectioned else transcript_result["video_id"]
+            )
+        if request.instructions:
+            await admit_summary(summary_text, credentials["api_key"], request.instructions, cache_mode)
+    except LLMOverloadedError as e:
+        raise rate_limited(e)
+    except ValueError as e:
+        logger.error(f"ValueError in stream_transcript: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def events() -> AsyncIterator[str]:
+        yield sse_event("transcript", {
+            "transcript": transcript_result["transcript"],
+            "video_id": transcript_result["video_id"]
+        })
+        if request.instructions:
+            try:
+                async for delta in stream_summary(
+                    summary_text,
+                    credentials["api_key"],
+                    request.instructions,
+                    cache_mode=cache_mode
+                ):
+                    yield sse_event("summary", {"delta": delta})
+            except LLMOverloadedError as e:
+                yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+                return
+            except Exception as e:
+                logger.error(f"Error streaming summary: {str(e)}")
+                yield sse_event("error", {"detail": str(e)})
+                return
+        yield sse_event("done", {"video_id": transcript_result["video_id"]})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def resolve_quiz_transcript(request: QuizRequest) -> str:
+    """
+    The transcript text to quiz on, looked up by video_id when no text was sent
+    
+    With a focus, only the passages most relevant to it are returned.
+    """
+    if request.transcript is not None:
+        transcript, whole_video_id = request.transcript, None
+    else:
+        transcript_result = await get_transcript_for_video(request.video_id)
+        sectioned = request.start is not None or request.end is not None
+        transcript = select_time_range(transcript_result, request.start, request.end)["transcript"]
+        whole_video_id = None if sectioned else request.video_id
+    if request.focus:
+        transcript = await focus_transcript(transcript, request.focus, video_id=whole_video_id)
+    return transcript
+
+@app.get("/api/transcript/{video_id}", response_model=TranscriptResponse)
+async def get_transcript_resource(
+    video_id: str,
+    request: Request,
+    start: Optional[float] = Query(None, ge=0, description="Section start in seconds"),
+    end: Optional[float] = Query(None, gt=0, description="Section end in seconds"),
+):
+    """
+    A video's transcript as a cacheable resource
+
+    Responses carry a strong ETag derived from the transcript content and
+    are compressed with brotli or gzip as the client accepts. A request with
+    a matching If-None-Match gets 304 Not Modified without a body. No
+    credentials are needed, so browsers and a CDN in front of the service
+    can cache the response. Only transcripts already fetched through an
+    authenticated endpoint are served; anonymous requests never reach
+    YouTube or the caption providers.
+    """
+    cache_control = f"public, max-age={TRANSCRIPT_HTTP_MAX_AGE}, s-maxage={TRANSCRIPT_HTTP_SHARED_MAX_AGE}"
+    try:
+        transcript_result = select_time_range(await get_transcript_for_video(video_id, fetch=False), start, end)
+    except TranscriptNotCachedError as e:
+        # Not cacheable: the transcript may be fetched a moment from now
+        raise HTTPException(status_code=404, detail=str(e), headers={"Cache-Control": "no-store"})
+    except NoTranscriptError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e),
+            headers={"Cache-Control": f"public, max-age={TRANSCRIPT_HTTP_MISSING_MAX_AGE}"},
+        )
+    except ValueError as e:
+        logger.error(f"ValueError in get_transcript_resource: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e), headers={"Cache-Control": "no-store"})
+
+    normalization = transcript_result.get("normalization")
+    tag = content_etag(
+        video_id, str(start), str(end), transcript_result["transcript"], json.dumps(normalization, sort_keys=True)
+    )
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    content = {
+        "success": True,
+        "transcript": transcript_result["transcript"],
+        "video_id": video_id,
+        "normalization": normalization,
+    }
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        encoding = await applied_encoding(transcript_bodies, tag, encoding, content)
+        return Response(status_code=304, headers={**headers, "ETag": quoted_etag(tag, encoding)})
+
+    body, encoding = await encode_body(transcript_bodies, tag, encoding, content)
+    headers["ETag"] = quoted_etag(tag, encoding)
+    if encoding != IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/transcript/{video_id}/search", response_model=TranscriptSearchResponse)
+async def search_video_transcript(
+    video_id: str,
+    q: str = Query(..., min_length=1, max_length=500, description="Search query"),
+    k: int = Query(RETRIEVAL_TOP_K, ge=1, le=50, description="Maximum number of passages"),
+    credentials: dict = Depends(get_api_credentials)
+):
+    """
+    Find the passages of a video's transcript that best match a query
+
+    Uses the same BM25 index over sentence windows as the `focus` option,
+    built once per video and cached with its transcript.
+    """
+    try:
+        transcript_result = await get_transcript_for_video(video_id)
+        results = await search_transcript(transcript_result, q, k)
+    except ValueError as e:
+        logger.error(f"ValueError in search_video_transcript: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"video_id": video_id, "query": q, "results": results}
+
+@app.post("/api/transcript/batch")
+async def batch_transcripts(
+    request: BatchTranscriptRequest,
+    credentials: dict = Depends(get_api_credentials)
+):
+    """
+    Fetch the transcripts of many videos, streamed back as NDJSON
+
+    Inputs are canonicalized to video IDs and deduplicated. Each line is one
+    video's result, written as soon as it completes; a failed video gets a
+    line with its error instead of failing the batch. The last line is a
+    `{"done": true, ...}` summary.
+    """
+    inputs = list(request.urls)
+    if request.playlist:
+        try:
+            inputs.extend(await get_playlist_video_ids(request.playlist))
+        except ValueError as e:
+            logger.error(f"ValueError in batch_transcripts: {str(e)}")
+            raise HTTPException(status_code=400, detail=str(e))
+    video_ids, errors = canonicalize_inputs(inputs)
+    if not video_ids and not errors:
+        raise HTTPException(status_code=400, detail="Provide urls or a playlist")
+    if len(video_ids) > BATCH_MAX_VIDEOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {BATCH_MAX_VIDEOS} videos, got {len(video_ids)}"
+        )
+    logger.info(f"Batch transcript request for {len(video_ids)} videos ({len(inputs) - len(video_ids) - len(errors)} duplicates)")
+    
+    async def lines() -> AsyncIterator[str]:
+        counts = {"succeeded": 0, "failed": len(errors)}
+        for error in errors:
+            yield json.dumps(error) + "\n"
+        async for item in fetch_transcripts(video_ids, request.deadline, request.include_transcript):
+            counts["succeeded" if item["success"] else "failed"] += 1
+            yield json.dumps(item) + "\n"
+        yield json.dumps({"done": True, "total": len(video_ids) + len(errors), **counts}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.post("/api/youtube/generate-quiz", response_model=QuizResponse)
 async def generate_quiz(
     request: QuizRequest,
-    credentials: dict = Depends(get_api_credentials)
+    credentials: dict = Depends(get_api_credentials),
+    cache_mode: str = Depends(get_cache_mode)
 ):
     try:
         logger.info(f"Generating quiz with {request.numQuestions} questions")
+        transcript = await resolve_quiz_transcript(request)
+        await admit_quiz(transcript, credentials["api_key"], request.numQuestions, cache_mode)
         questions = await generate_mcqs(
-            request.transcript, 
+            transcript, 
             credentials["api_key"], 
-            request.numQuestions
+            request.numQuestions,
+            cache_mode=cache_mode
         )
         logger.info(f"Successfully generated {len(questions)} questions")
         return {"questions": questions}
+    except LLMOverloadedError as e:
+        raise rate_limited(e)
     except Exception as e:
         logger.error(f"Error in generate_quiz: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/youtube/generate-quiz/stream")
+async def stream_quiz(
+    request: QuizRequest,
+    credentials: dict = Depends(get_api_credentials),
+    cache_mode: str = Depends(get_cache_mode)
+):
+    """
+    Streaming variant of /api/youtube/generate-quiz over Server-Sent Events
+
+    Sends a `question` event for each question as soon as it has been parsed
+    and validated, then `done` with the number of questions sent.
+    """
+    logger.info(f"Streaming quiz with {request.numQuestions} questions")
+    try:
+        transcript = await resolve_quiz_transcript(request)
+        await admit_quiz(transcript, credentials["api_key"], request.numQuestions, cache_mode)
+    except LLMOverloadedError as e:
+        raise rate_limited(e)
+    except ValueError as e:
+        logger.error(f"ValueError in stream_quiz: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def events() -> AsyncIterator[str]:
+        count = 0
+        try:
+            async for question in stream_mcqs(
+                transcript,
+                credentials["api_key"],
+                request.numQuestions,
+                cache_mode=cache_mode
+            ):
+                yield sse_event("question", {"index": count, **QuizQuestion(**question).model_dump()})
+                count += 1
+        except LLMOverloadedError as e:
+            yield sse_event("error", {"detail": str(e), "count": count, "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming quiz: {str(e)}")
+            yield sse_event("error", {"detail": str(e), "count": count})
+            return
+        logger.info(f"Streamed {count} questions")
+        yield sse_event("done", {"count": count})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/youtube/process", response_model=ProcessResponse)
+async def process(
+    request: ProcessRequest,
+    credentials: dict = Depends(get_api_credentials),
+    cache_mode: str = Depends(get_cache_mode)
+):
+    """
+    Transcript, summary and quiz for a video in one request
+
+    The transcript is fetched once and the summary and quiz are generated
+    from it concurrently.
+    """
+    try:
+        logger.info(f"Processing {', '.join(request.outputs)} for URL: {request.url}")
+        result = await process_video(
+            request.url,
+            credentials["api_key"],
+            outputs=request.outputs,
+            instructions=request.instructions,
+            num_questions=request.numQuestions,
+            deadline=request.deadline,
+            start=request.start,
+            end=request.end,
+            cache_mode=cache_mode,
+            focus=request.focus
+        )
+        return {"success": True, **result}
+    except LLMOverloadedError as e:
+        raise rate_limited(e)
+    except ValueError as e:
+        logger.error(f"ValueError in process: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error in process: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+async def get_owned_job(job_id: str, api_key: str) -> dict:
+    """
+    Load a job, treating jobs submitted with another API key as missing
+    """
+    job = await get_job_manager().get(job_id)
+    if job is None or job["key"] != key_hash(api_key):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    request: JobRequest,
+    credentials: dict = Depends(get_api_credentials)
+):
+    """
+    Queue transcript, summary and quiz work and return a job ID immediately
+    """
+    try:
+        job = await get_job_manager().submit(request.model_dump(), credentials["api_key"])
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except JobsDrainingError as e:
+        # Another worker takes the retry
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    logger.info(f"Queued job {job['id']} for URL: {request.url}")
+    return public_job(job)
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    return get_job_manager().get_stats()
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    credentials: dict = Depends(get_api_credentials)
+):
+    return public_job(await get_owned_job(job_id, credentials["api_key"]))
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    credentials: dict = Depends(get_api_credentials)
+):
+    """
+    Follow a job over Server-Sent Events
+
+    Sends a `status` event whenever the job's status changes, then a final
+    `succeeded` or `failed` event carrying the whole job.
+    """
+    job = await get_owned_job(job_id, credentials["api_key"])
+    manager = get_job_manager()
+    
+    async def events() -> AsyncIterator[str]:
+        current = job
+        status = None
+        while True:
+            if current["status"] in FINISHED:
+                yield sse_event(current["status"], public_job(current))
+                return
+            if current["status"] != status:
+                status = current["status"]
+                yield sse_event("status", {"id": job_id, "status": status})
+            # Other worker processes do not notify us, so re-read periodically
+            if not await manager.wait_for_change(job_id, JOB_EVENTS_POLL_INTERVAL):
+                yield ": keep-alive\n\n"
+            current = await manager.get(job_id)
+            if current is None:
+                yield sse_event("error", {"detail": "Job expired"})
+                return
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # For direct execution
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,209 @@
+"""
+Production entry point: python -m app.server
+
+Runs WEB_CONCURRENCY uvicorn workers on one shared socket under a small
+supervisor. Workers use uvloop and httptools when they are installed, and
+each one is recycled after about WORKER_MAX_REQUESTS requests: its
+replacement is started while it stops accepting connections and finishes
+its in-flight requests and running jobs. run.py remains the auto-reloading development
+server.
+"""
+import os
+import time
+import random
+import signal
+import logging
+import importlib.util
+import multiprocessing
+from socket import socket
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+# Before anything reads its configuration from the environment
+load_dotenv()
+
+import uvicorn
+
+logger = logging.getLogger("app.server")
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Worker processes (the variable Heroku sets for the dyno size)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Requests after which a worker is recycled (0 disables recycling), plus a
+# random extra of up to WORKER_MAX_REQUESTS_JITTER so workers do not restart together
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))
+WORKER_MAX_REQUESTS_JITTER = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+# Seconds a stopping worker gets to finish in-flight requests
+WORKER_GRACEFUL_TIMEOUT = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "25"))
+# Keep-alive timeout for client connections, in seconds
+WORKER_KEEPALIVE = int(os.getenv("WORKER_KEEPALIVE", "5"))
+
+# Extra seconds a stopping worker gets, after the graceful timeout, for its lifespan shutdown
+_SHUTDOWN_MARGIN = 5.0
+# A worker that dies sooner than this after starting is restarted after a pause
+_CRASH_WINDOW = 5.0
+_CRASH_BACKOFF = 1.0
+
+def server_config() -> uvicorn.Config:
+    """
+    Uvicorn configuration of one worker
+    """
+    max_requests = None
+    if WORKER_MAX_REQUESTS > 0:
+        max_requests = WORKER_MAX_REQUESTS + random.randint(0, max(0, WORKER_MAX_REQUESTS_JITTER))
+    return uvicorn.Config(
+        "app.main:app",
+        host=HOST,
+        port=PORT,
+        # "auto" picks uvloop and httptools when installed, asyncio and h11 otherwise
+        loop="auto",
+        http="auto",
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=WORKER_GRACEFUL_TIMEOUT,
+        timeout_keep_alive=WORKER_KEEPALIVE,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        log_level=os.getenv("LOG_LEVEL", "info"),
+    )
+
+class RecyclingServer(uvicorn.Server):
+    """
+    Uvicorn server that tells the supervisor when it starts retiring
+
+    On the way out, recycled or stopped, its background jobs drain
+    alongside its in-flight requests, within the same graceful timeout,
+    instead of being failed by the lifespan shutdown.
+    """
+
+    def __init__(self, config: uvicorn.Config, retiring):
+        super().__init__(config)
+        self.retiring = retiring
+
+    async def on_tick(self, counter: int) -> bool:
+        should_exit = await super().on_tick(counter)
+        limit = self.config.limit_max_requests
+        if limit is not None and self.server_state.total_requests >= limit and not self.retiring.is_set():
+            self.retiring.set()
+        return should_exit
+
+    async def shutdown(self, sockets: Optional[List[socket]] = None) -> None:
+        # Imported here: the supervisor process never loads the app
+        from app.services.jobs import get_job_manager
+        get_job_manager().drain(self.config.timeout_graceful_shutdown)
+        await super().shutdown(sockets=sockets)
+
+def run_worker(sock: socket, retiring) -> None:
+    """
+    Serve on an inherited listening socket until recycled or stopped
+
+    Args:
+        sock: Listening socket shared by all workers
+        retiring: multiprocessing Event set once the request limit is reached
+    """
+    started = time.perf_counter()
+    config = server_config()
+    server = RecyclingServer(config, retiring)
+    # Loads app.main, whose own import time is reported on /metrics
+    config.load()
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(
+        f"Worker {os.getpid()} loaded the app in {time.perf_counter() - started:.2f}s "
+        f"(loop={loop}, http={http}, max requests={config.limit_max_requests})"
+    )
+    server.run(sockets=[sock])
+
+class Supervisor:
+    """
+    Keep `workers` worker processes serving one socket
+
+    A worker that starts retiring is replaced right away, so the replacement
+    loads while the old worker drains. Workers that crash are replaced when
+    they exit. On SIGTERM or SIGINT every worker is asked to stop gracefully
+    and is killed if it has not finished within the graceful timeout (plus
+    a few seconds for its lifespan shutdown).
+    """
+
+    def __init__(self, workers: int, graceful_timeout: float = WORKER_GRACEFUL_TIMEOUT):
+        self.workers = max(1, workers)
+        self.graceful_timeout = graceful_timeout
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.started_at: Dict[int, float] = {}
+        self.retiring: Dict[int, Any] = {}
+        self.replaced: Set[int] = set()
+        self.stopping = False
+        self._context = multiprocessing.get_context("spawn")
+        self._sock: Optional[socket] = None
+
+    def _spawn(self) -> None:
+        retiring = self._context.Event()
+        process = self._context.Process(target=run_worker, args=(self._sock, retiring), daemon=False)
+        process.start()
+        self.processes[process.pid] = process
+        self.started_at[process.pid] = time.monotonic()
+        self.retiring[process.pid] = retiring
+
+    def _handle_signal(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        self._sock = server_config().bind_socket()
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        logger.info(f"Starting {self.workers} workers on {HOST}:{PORT}")
+        for _ in range(self.workers):
+            self._spawn()
+        try:
+            while not self.stopping:
+                for pid, process in list(self.processes.items()):
+                    if self.stopping:
+                        break
+                    lifetime = time.monotonic() - self.started_at[pid]
+                    if pid not in self.replaced and self.retiring[pid].is_set():
+                        logger.info(f"Worker {pid} is recycling after {lifetime:.0f}s, starting its replacement")
+                        self.replaced.add(pid)
+                        self._spawn()
+                    if process.is_alive():
+                        continue
+                    process.join()
+                    self._forget(pid)
+                    if pid in self.replaced:
+                        self.replaced.discard(pid)
+                        continue
+                    logger.error(f"Worker {pid} exited with code {process.exitcode} after {lifetime:.1f}s")
+                    if lifetime < _CRASH_WINDOW:
+                        time.sleep(_CRASH_BACKOFF)
+                    self._spawn()
+                time.sleep(0.5)
+        finally:
+            self.shutdown()
+
+    def _forget(self, pid: int) -> None:
+        del self.processes[pid]
+        del self.started_at[pid]
+        del self.retiring[pid]
+
+    def shutdown(self) -> None:
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.graceful_timeout + _SHUTDOWN_MARGIN
+        for pid, process in self.processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {pid} did not stop within {self.graceful_timeout}s, killing it")
+                process.kill()
+                process.join()
+        self.processes.clear()
+        if self._sock is not None:
+            self._sock.close()
+        logger.info("All workers stopped")
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    Supervisor(WEB_CONCURRENCY).run()
+
+if __name__ == "__main__":
+    main()
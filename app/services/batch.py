@@ -0,0 +1,148 @@
+import os
+import re
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from app.services.http_client import get_http_client
+from app.services.caption_parsing import run_parser
+from app.services.rate_limit import paced_fetches
+from app.services.youtube_service import (
+    extract_video_id, get_transcript_for_video, host_limiter, YOUTUBE_BASE_URL, YOUTUBE_HOST, VIDEO_ID_PATTERN
+)
+
+logger = logging.getLogger(__name__)
+
+# Videos fetched concurrently per batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Largest number of distinct videos accepted in one batch
+BATCH_MAX_VIDEOS = int(os.getenv("BATCH_MAX_VIDEOS", "200"))
+
+_PLAYLIST_ID = re.compile(r'^[a-zA-Z0-9_-]+$')
+_PLAYLIST_ENTRY = re.compile(r'"playlistVideoRenderer":\{"videoId":"([a-zA-Z0-9_-]{11})"')
+_ANY_VIDEO = re.compile(r'"videoId":"([a-zA-Z0-9_-]{11})"')
+
+def canonicalize_inputs(inputs: Iterable[str]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Turn URLs or bare video IDs into a deduplicated list of video IDs
+
+    Args:
+        inputs: YouTube URLs or video IDs, in the order given
+
+    Returns:
+        Tuple of (unique video IDs in first-seen order, errors for inputs that are not videos)
+    """
+    video_ids: List[str] = []
+    seen = set()
+    errors = []
+    for value in inputs:
+        value = value.strip()
+        try:
+            video_id = value if VIDEO_ID_PATTERN.match(value) else extract_video_id(value)
+        except ValueError as e:
+            errors.append({"input": value, "success": False, "error": str(e)})
+            continue
+        if video_id not in seen:
+            seen.add(video_id)
+            video_ids.append(video_id)
+    return video_ids, errors
+
+def _playlist_video_ids(html: str) -> List[str]:
+    """
+    Video IDs of a playlist page in playlist order (CPU-bound; run in the parser pool)
+    """
+    found = _PLAYLIST_ENTRY.findall(html) or _ANY_VIDEO.findall(html)
+    return list(dict.fromkeys(found))
+
+def playlist_id_from_url(url: str) -> str:
+    """
+    Extract the playlist ID from a playlist (or watch-with-list) URL, or accept a bare ID
+    """
+    if _PLAYLIST_ID.match(url) and "." not in url:
+        return url
+    playlist_ids = parse_qs(urlparse(url).query).get("list")
+    if not playlist_ids or not _PLAYLIST_ID.match(playlist_ids[0]):
+        raise ValueError(f"Invalid YouTube playlist URL: {url}")
+    return playlist_ids[0]
+
+async def get_playlist_video_ids(url: str) -> List[str]:
+    """
+    List the videos of a YouTube playlist
+
+    Only the videos embedded in the playlist page are returned (the first
+    100 for YouTube playlists), which covers typical course playlists.
+
+    Args:
+        url: Playlist URL or playlist ID
+
+    Returns:
+        Video IDs in playlist order
+    """
+    playlist_id = playlist_id_from_url(url)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    await host_limiter.acquire(YOUTUBE_HOST)
+    response = await get_http_client().get(
+        f"{YOUTUBE_BASE_URL}/playlist?list={playlist_id}", headers=headers, timeout=15
+    )
+    if response.status_code != 200:
+        raise ValueError(f"Failed to fetch YouTube playlist: {response.status_code}")
+    video_ids = await run_parser(_playlist_video_ids, response.text)
+    if not video_ids:
+        raise ValueError("No videos found in this playlist")
+    logger.info(f"Playlist {playlist_id} has {len(video_ids)} videos")
+    return video_ids
+
+async def fetch_transcripts(
+    video_ids: List[str],
+    deadline: Optional[float] = None,
+    include_transcript: bool = True,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Fetch many transcripts with bounded concurrency, yielding results as they complete
+
+    A failure is reported in that video's result and does not stop the batch.
+    Outbound calls are additionally paced by the per-host rate limits, which
+    interactive requests are exempt from.
+
+    Args:
+        video_ids: Video IDs to fetch
+        deadline: Optional seconds to wait for each transcript
+        include_transcript: Whether results carry the transcript text
+        concurrency: Maximum transcripts fetched at once
+
+    Yields:
+        One result per video, in completion order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(index: int, video_id: str) -> Dict[str, Any]:
+        # Each fetch runs in a task of its own, so this only paces the batch
+        paced_fetches.set(True)
+        async with semaphore:
+            try:
+                result = await get_transcript_for_video(video_id, deadline)
+            except Exception as e:
+                logger.warning(f"Batch transcript for video ID {video_id} failed: {str(e)}")
+                return {"index": index, "video_id": video_id, "success": False, "error": str(e)}
+        item = {
+            "index": index,
+            "video_id": video_id,
+            "success": True,
+            "characters": len(result["transcript"]),
+        }
+        if include_transcript:
+            item["transcript"] = result["transcript"]
+        return item
+
+    tasks = [asyncio.ensure_future(fetch_one(index, video_id)) for index, video_id in enumerate(video_ids)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away or the consumer stopped early
+        for task in tasks:
+            task.cancel()
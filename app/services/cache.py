@@ -0,0 +1,269 @@
+import os
+import time
+import json
+import zlib
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the on-disk tier of every cache
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(".cache", "epochly"))
+TRANSCRIPT_CACHE_DISK_MB = float(os.getenv("TRANSCRIPT_CACHE_DISK_MB", "1024"))
+
+# Trim the disk tier back under its size limit every N writes
+_DISK_TRIM_INTERVAL = 100
+
+class _MemoryEntry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Dict[str, Any], size: int, expires_at: Optional[float]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+class SQLiteStore:
+    """
+    On-disk cache tier backed by a SQLite database in WAL mode
+
+    WAL lets every worker process read concurrently while one writes, so all
+    uvicorn workers pointed at the same directory share this tier. Values
+    are stored as zlib-compressed JSON.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
+        conn = self._connect()
+        row = conn.execute("SELECT data, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(data)), expires_at
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: Optional[float]) -> None:
+        data = zlib.compress(json.dumps(value).encode("utf-8"))
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, data, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), expires_at, time.time()),
+        )
+        self._writes += 1
+        if self._writes % _DISK_TRIM_INTERVAL == 0:
+            self.trim()
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def trim(self) -> None:
+        """
+        Drop expired entries, then least recently used ones beyond max_bytes
+        """
+        conn = self._connect()
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+        logger.info(f"Trimmed {len(doomed)} entries from disk cache {self.path}")
+
+class TwoTierCache:
+    """
+    Two-tier cache of JSON-serializable values keyed by string
+
+    The first tier is an in-process LRU bounded by the serialized size of its
+    entries. The optional second tier is a SQLite store shared by all worker
+    processes. Seed values never expire and are served if both tiers miss.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        memory_bytes: int,
+        ttl: float,
+        disk: Optional[SQLiteStore] = None,
+        seed: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self.disk = disk
+        self._seed = dict(seed or {})
+        self._memory: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._memory_used = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "seed_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_errors": 0,
+        }
+        for key, value in self._seed.items():
+            self._remember(key, value, None)
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        size = len(json.dumps(value).encode("utf-8"))
+        if size > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= old.size
+        self._memory[key] = _MemoryEntry(value, size, expires_at)
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.size
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str, record: bool = True) -> Optional[Any]:
+        """
+        Look up a cached value
+
+        Args:
+            key: Cache key
+            record: Whether to count the lookup in the hit and miss statistics;
+                auxiliary entries stored next to the main ones are not counted,
+                so they do not distort the hit rate
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry.expires_at is None or entry.expires_at > time.time():
+                self._memory.move_to_end(key)
+                if record:
+                    self.stats["memory_hits"] += 1
+                return entry.value
+            self._memory.pop(key)
+            self._memory_used -= entry.size
+
+        if self.disk is not None:
+            try:
+                found = await asyncio.to_thread(self.disk.get, key)
+            except Exception as e:
+                self.stats["disk_errors"] += 1
+                logger.warning(f"{self.name} disk cache read failed: {str(e)}")
+                found = None
+            if found is not None:
+                value, expires_at = found
+                self._remember(key, value, expires_at)
+                if record:
+                    self.stats["disk_hits"] += 1
+                return value
+
+        if key in self._seed:
+            self._remember(key, self._seed[key], None)
+            if record:
+                self.stats["seed_hits"] += 1
+            return self._seed[key]
+
+        if record:
+            self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value in both cache tiers
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds (defaults to the cache TTL)
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, expires_at)
+            except Exception as e:
+                self.stats["disk_errors"] += 1
+                logger.warning(f"{self.name} disk cache write failed: {str(e)}")
+
+    async def delete(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_used -= entry.size
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.delete, key)
+            except Exception as e:
+                self.stats["disk_errors"] += 1
+                logger.warning(f"{self.name} disk cache delete failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and memory tier usage
+        """
+        lookups = (
+            self.stats["memory_hits"] + self.stats["disk_hits"]
+            + self.stats["seed_hits"] + self.stats["misses"]
+        )
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "memory_limit_bytes": self.memory_bytes,
+            "disk_enabled": self.disk is not None,
+        }
+
+def create_disk_store(name: str, enabled: bool = True) -> Optional[SQLiteStore]:
+    """
+    Create a SQLite store under TRANSCRIPT_CACHE_DIR, or None if disabled/unavailable
+    """
+    if not enabled:
+        return None
+    try:
+        return SQLiteStore(
+            os.path.join(TRANSCRIPT_CACHE_DIR, name),
+            int(TRANSCRIPT_CACHE_DISK_MB * 1024 * 1024),
+        )
+    except Exception as e:
+        logger.warning(f"Disk cache {name} unavailable, using memory only: {str(e)}")
+        return None
@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+# Threads for CPU-bound parsing that should stay off the event loop
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", "4"))
+# Give up on a watch page whose caption track JSON has not closed within this many characters
+CAPTION_TRACKS_MAX_CHARS = int(os.getenv("CAPTION_TRACKS_MAX_CHARS", str(256 * 1024)))
+
+CAPTION_TRACKS_MARKER = '"captionTracks":'
+
+_decoder = json.JSONDecoder()
+# A whole "segment-text" element, and the start of any div (to keep one split across chunks)
+_SEGMENT_ELEMENT = re.compile(r"<div\b[^>]*\bsegment-text\b[^>]*>.*?</div\s*>", re.DOTALL | re.IGNORECASE)
+_DIV_START = "<div"
+_parser_pool: Optional[ThreadPoolExecutor] = None
+
+def get_parser_pool() -> ThreadPoolExecutor:
+    """
+    Get the shared thread pool for CPU-bound parsing
+    """
+    global _parser_pool
+    if _parser_pool is None:
+        _parser_pool = ThreadPoolExecutor(max_workers=PARSER_WORKERS, thread_name_prefix="parser")
+    return _parser_pool
+
+async def run_parser(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a parsing function in the parser pool and await its result
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parser_pool(), partial(fn, *args, **kwargs))
+
+def shutdown_parser_pool() -> None:
+    """
+    Stop the parser pool threads (called on application shutdown)
+    """
+    global _parser_pool
+    if _parser_pool is not None:
+        _parser_pool.shutdown(wait=False, cancel_futures=True)
+        _parser_pool = None
+
+class CaptionTrackScanner:
+    """
+    Find the captionTracks JSON array in a watch page fed in chunks
+
+    Only a short tail is kept until the marker shows up, so the page is
+    never held in memory as a whole. Once the marker is found, the text after
+    it is decoded with a real JSON decoder as chunks arrive, which handles
+    "]" inside track names and escaped URLs.
+    """
+
+    def __init__(self, max_chars: int = CAPTION_TRACKS_MAX_CHARS):
+        self.max_chars = max_chars
+        self.tracks: Optional[List[Dict[str, Any]]] = None
+        self.chars_scanned = 0
+        self._tail = ""
+        self._pending: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.tracks is not None
+
+    def feed(self, text: str) -> bool:
+        """
+        Consume the next chunk of the page
+
+        Returns:
+            True once the caption tracks have been decoded
+        """
+        if self.done:
+            return True
+        self.chars_scanned += len(text)
+        if self._pending is None:
+            window = self._tail + text
+            index = window.find(CAPTION_TRACKS_MARKER)
+            if index < 0:
+                # Keep enough to catch a marker split across chunks
+                self._tail = window[-(len(CAPTION_TRACKS_MARKER) - 1):]
+                return False
+            self._tail = ""
+            self._pending = window[index + len(CAPTION_TRACKS_MARKER):].lstrip()
+        else:
+            self._pending += text
+
+        try:
+            tracks, _ = _decoder.raw_decode(self._pending)
+        except json.JSONDecodeError:
+            # Most likely the array continues in the next chunk
+            if len(self._pending) > self.max_chars:
+                raise ValueError("captionTracks JSON is malformed or too large")
+            return False
+        if not isinstance(tracks, list):
+            raise ValueError("captionTracks is not a JSON array")
+        self.tracks = [track for track in tracks if isinstance(track, dict)]
+        self._pending = None
+        return True
+
+class SegmentElementScanner:
+    """
+    Collect the "segment-text" elements of a watch page fed in chunks
+
+    Only the elements themselves and an unfinished tail are kept, never the
+    page as a whole. The collected HTML is what extract_segment_text needs
+    when the page has no caption tracks.
+    """
+
+    def __init__(self, max_chars: int = CAPTION_TRACKS_MAX_CHARS):
+        self.max_chars = max_chars
+        self.elements: List[str] = []
+        self._tail = ""
+
+    @property
+    def html(self) -> str:
+        return "".join(self.elements)
+
+    def feed(self, text: str) -> None:
+        window = self._tail + text
+        end = 0
+        for match in _SEGMENT_ELEMENT.finditer(window):
+            self.elements.append(match.group(0))
+            end = match.end()
+        rest = window[end:]
+        # Enough to catch "<div" split across chunks
+        self._tail = rest[-(len(_DIV_START) - 1):]
+        start = rest.rfind(_DIV_START)
+        if start < 0:
+            return
+        tail = rest[start:]
+        tag_end = tail.find(">")
+        # Wait for the rest of a segment element, or of an opening tag, unless it never ends
+        if (tag_end < 0 or "segment-text" in tail[:tag_end].lower()) and len(tail) <= self.max_chars:
+            self._tail = tail
+
+def select_caption_urls(tracks: List[Dict[str, Any]], language: str = "en") -> List[str]:
+    """
+    Order caption track URLs by preference
+
+    Manually created tracks in `language` come first, then auto-generated
+    ones in `language`, then everything else in page order.
+    """
+    def rank(track: Dict[str, Any]) -> int:
+        code = str(track.get("languageCode", ""))
+        matches = code == language or code.startswith(f"{language}-")
+        generated = track.get("kind") == "asr"
+        if matches:
+            return 1 if generated else 0
+        return 2
+
+    ordered = sorted((track for track in tracks if track.get("baseUrl")), key=rank)
+    return [track["baseUrl"] for track in ordered]
+
+class TimedTextParser:
+    """
+    Incremental parser for YouTube timedtext XML
+
+    Backed by expat through ElementTree.XMLPullParser, so entries are
+    extracted while the caption file is still downloading. Handles both the
+    classic format (<text start="s" dur="s">) and format 3 (<p t="ms" d="ms">).
+    """
+
+    def __init__(self):
+        self._parser = ElementTree.XMLPullParser(events=("end",))
+        self.entries: List[Dict[str, Any]] = []
+
+    def feed(self, data: str) -> None:
+        self._parser.feed(data)
+        self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._parser.close()
+        self._drain()
+        return self.entries
+
+    def _drain(self) -> None:
+        for _, element in self._parser.read_events():
+            if element.tag == "text":
+                start = float(element.get("start", 0))
+                duration = float(element.get("dur", 0))
+            elif element.tag == "p":
+                start = float(element.get("t", 0)) / 1000
+                duration = float(element.get("d", 0)) / 1000
+            else:
+                continue
+            # Format 3 splits words into <s> children
+            text = "".join(element.itertext())
+            if text:
+                self.entries.append({"text": text, "start": start, "duration": duration})
+            element.clear()
+
+def parse_timedtext(xml: str) -> List[Dict[str, Any]]:
+    """
+    Parse a complete timedtext XML document into timed entries
+    """
+    parser = TimedTextParser()
+    parser.feed(xml)
+    return parser.close()
+
+def extract_segment_text(html: str) -> str:
+    """
+    Collect transcript text rendered into "segment-text" elements of a watch page
+
+    Only used when the page has no caption tracks. Takes the page or just
+    its segment elements (see SegmentElementScanner). This is a full HTML
+    parse, so run it in the parser pool.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return " ".join(section.get_text() for section in soup.find_all('div', {'class': 'segment-text'}))
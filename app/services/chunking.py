@@ -0,0 +1,122 @@
+import re
+from typing import Iterator, List, Tuple
+
+# Rough characters-per-token ratio for English text with Llama tokenizers
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate used for prompt budgeting
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text on sentence-ending punctuation
+    """
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+def _split_span(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    # Auto-generated captions often have no punctuation at all, so fall back
+    # to word boundaries for "sentences" that exceed the budget
+    while end - start > max_chars:
+        cut = text.rfind(" ", start, start + max_chars)
+        if cut <= start:
+            # No space to break on: cut the word itself, losing no character
+            cut = start + max_chars
+        yield start, cut
+        start = cut + 1 if text[cut].isspace() else cut
+    if end > start:
+        yield start, end
+
+def sentence_spans(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    """
+    Character spans of the sentences of text, breaking sentences longer than max_chars on word boundaries
+    """
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.extend(_split_span(text, start, match.start(), max_chars))
+        start = match.end()
+    spans.extend(_split_span(text, start, len(text), max_chars))
+    return spans
+
+def _trimmed_spans(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    # Sentence spans without surrounding whitespace, and without blank ones
+    spans = []
+    for start, end in sentence_spans(text, max_chars):
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+    return spans
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    return [sentence[start:end] for start, end in _split_span(sentence, 0, len(sentence), max_chars)]
+
+def sentence_units(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into sentences, breaking sentences longer than max_chars on word boundaries
+    """
+    units = []
+    for sentence in split_sentences(text):
+        units.extend(_split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence])
+    return units
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens, on sentence boundaries
+
+    Chunks are slices of the text, so a word cut in two is not rejoined
+    with a space.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List of chunks in order
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    first = last = None
+    for start, end in _trimmed_spans(text, max_chars):
+        if first is not None and end - first > max_chars:
+            chunks.append(text[first:last])
+            first = None
+        if first is None:
+            first = start
+        last = end
+    if first is not None:
+        chunks.append(text[first:last])
+    return chunks
+
+def split_into_parts(text: str, parts: int) -> List[str]:
+    """
+    Split text into `parts` contiguous sections of similar length, on sentence boundaries
+
+    Args:
+        text: Text to split
+        parts: Number of sections wanted
+
+    Returns:
+        Up to `parts` non-empty sections in order (fewer if the text is short)
+    """
+    if parts <= 1:
+        return [text]
+    target = max(1, len(text) // parts)
+    sections = []
+    first = None
+    for start, end in _trimmed_spans(text, target):
+        if first is None:
+            first = start
+        if end - first >= target and len(sections) < parts - 1:
+            sections.append(text[first:end])
+            first = None
+    if first is not None:
+        sections.append(text[first:end])
+    return sections
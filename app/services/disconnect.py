@@ -0,0 +1,76 @@
+import os
+import asyncio
+import logging
+
+from app.services.metrics import HTTP_REQUESTS_CANCELLED
+
+logger = logging.getLogger(__name__)
+
+# Cancel a request's work when its client disconnects before the response starts
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"
+
+# nginx's status for a request closed by the client; nothing is sent, but it labels the request on /metrics
+CLIENT_CLOSED_REQUEST = 499
+
+class DisconnectMiddleware:
+    """
+    ASGI middleware cancelling a request's handler when its client disconnects
+
+    Request messages are read in a background task and handed to the app
+    through a queue, so a disconnect is noticed while the handler is still
+    waiting on upstream work, not only when it next reads the request. The
+    handler is then cancelled, which cancels the transcript fetches and Groq
+    calls it is waiting on unless other requests share them (see
+    SingleFlight). Streaming responses notice disconnects themselves once
+    they have started, so they are left alone here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not CANCEL_ON_DISCONNECT:
+            await self.app(scope, receive, send)
+            return
+        messages: asyncio.Queue = asyncio.Queue()
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def listen() -> None:
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        handler = asyncio.ensure_future(self.app(scope, messages.get, send_wrapper))
+        listener = asyncio.ensure_future(listen())
+        try:
+            done, _ = await asyncio.wait({handler, listener}, return_when=asyncio.FIRST_COMPLETED)
+            disconnected = listener in done and listener.exception() is None
+            if disconnected and not handler.done() and not response_started:
+                await self._cancel(scope, handler, send)
+                return
+            await handler
+        finally:
+            listener.cancel()
+            if not handler.done():
+                handler.cancel()
+
+    async def _cancel(self, scope, handler: asyncio.Task, send) -> None:
+        route = getattr(scope.get("route"), "path", "unmatched")
+        logger.info(f"Client disconnected, cancelling {scope['method']} {route}")
+        handler.cancel()
+        await asyncio.wait({handler})
+        if not handler.cancelled():
+            # Failed while being cancelled; the client is gone, so there is nobody to tell
+            handler.exception()
+        HTTP_REQUESTS_CANCELLED.inc(route=route)
+        # The server drops these, as the connection is closed, but MetricsMiddleware records the status
+        await send({"type": "http.response.start", "status": CLIENT_CLOSED_REQUEST, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
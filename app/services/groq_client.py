@@ -0,0 +1,156 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import groq
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GROQ_CLIENT_POOL_SIZE = int(os.getenv("GROQ_CLIENT_POOL_SIZE", "32"))
+GROQ_CLIENT_IDLE_TTL = float(os.getenv("GROQ_CLIENT_IDLE_TTL", "300"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "10"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+
+class _ClientEntry:
+    def __init__(self, client: groq.AsyncGroq):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.evicted = False
+
+class GroqClientRegistry:
+    """
+    Registry of pooled AsyncGroq clients keyed by API key
+
+    Each client keeps its own keep-alive connection pool. The registry holds
+    at most `max_clients` entries, evicting the least recently used one when
+    full and dropping entries idle for longer than `idle_ttl` seconds. An
+    evicted client that is still serving a request is closed once released.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = GROQ_CLIENT_POOL_SIZE,
+        idle_ttl: float = GROQ_CLIENT_IDLE_TTL,
+    ):
+        self.max_clients = max_clients
+        self.idle_ttl = idle_ttl
+        self._entries: "OrderedDict[str, _ClientEntry]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(api_key: str) -> str:
+        # Avoid keeping raw API keys as dictionary keys
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _create_client(api_key: str) -> groq.AsyncGroq:
+        timeout = httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT)
+        http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+            ),
+        )
+        return groq.AsyncGroq(
+            api_key=api_key,
+            timeout=timeout,
+            # Retries (and rate-limit backoff) are done by the LLM scheduler
+            max_retries=0,
+            http_client=http_client,
+        )
+
+    async def _release(self, entry: _ClientEntry) -> None:
+        entry.evicted = True
+        if entry.in_use == 0:
+            try:
+                await entry.client.close()
+            except Exception as e:
+                logger.warning(f"Error closing Groq client: {str(e)}")
+
+    async def _evict_stale(self) -> None:
+        now = time.monotonic()
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry.in_use == 0 and now - entry.last_used > self.idle_ttl:
+                del self._entries[key]
+                await self._release(entry)
+        while len(self._entries) > self.max_clients:
+            _, entry = self._entries.popitem(last=False)
+            await self._release(entry)
+
+    async def _checkout(self, api_key: str) -> _ClientEntry:
+        key = self._key(api_key)
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.client.is_closed():
+                entry = _ClientEntry(self._create_client(api_key))
+                self._entries[key] = entry
+                logger.info(f"Created pooled Groq client ({len(self._entries)} active)")
+            self._entries.move_to_end(key)
+            entry.in_use += 1
+            await self._evict_stale()
+            return entry
+
+    @asynccontextmanager
+    async def client(self, api_key: str) -> AsyncIterator[groq.AsyncGroq]:
+        """
+        Borrow the pooled AsyncGroq client for an API key
+
+        Args:
+            api_key: Groq API key
+
+        Yields:
+            A shared AsyncGroq client
+        """
+        entry = await self._checkout(api_key)
+        try:
+            yield entry.client
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            if entry.evicted and entry.in_use == 0:
+                await self._release(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def close(self) -> None:
+        """
+        Close every pooled client
+        """
+        async with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            await self._release(entry)
+
+_registry: Optional[GroqClientRegistry] = None
+
+def get_groq_registry() -> GroqClientRegistry:
+    """
+    Get the process-wide Groq client registry
+    """
+    global _registry
+    if _registry is None:
+        _registry = GroqClientRegistry()
+    return _registry
+
+async def close_groq_clients() -> None:
+    """
+    Close all pooled Groq clients (called on application shutdown)
+    """
+    if _registry is not None:
+        await _registry.close()
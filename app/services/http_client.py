@@ -0,0 +1,50 @@
+import os
+import logging
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+# One pooled client per SSL verification mode. The alternative caption APIs
+# often run with self-signed certificates, so they get an unverified client.
+_clients: Dict[bool, httpx.AsyncClient] = {}
+
+def get_http_client(verify: bool = True) -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client for outbound requests
+
+    Args:
+        verify: Whether SSL certificates should be verified
+
+    Returns:
+        A pooled httpx.AsyncClient reused across requests
+    """
+    client = _clients.get(verify)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            verify=verify,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        _clients[verify] = client
+    return client
+
+async def close_http_clients() -> None:
+    """
+    Close all shared HTTP clients (called on application shutdown)
+    """
+    for verify, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing HTTP client: {str(e)}")
+        _clients.pop(verify, None)
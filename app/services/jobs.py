@@ -0,0 +1,703 @@
+import os
+import time
+import json
+import uuid
+import zlib
+import base64
+import hashlib
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Collection, Deque, Dict, List, Optional
+
+from app.services.cache import TRANSCRIPT_CACHE_DIR
+from app.services.pipeline import process_video
+from app.services.llm_scheduler import background_work, key_hash
+from app.services.rate_limit import paced_fetches
+
+logger = logging.getLogger(__name__)
+
+# Job API keys can be stored encrypted when the cryptography package is installed
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+# "sqlite" keeps jobs across restarts; "memory" keeps them in this process only
+JOBS_BACKEND = os.getenv("JOBS_BACKEND", "sqlite").lower()
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+# Queued jobs allowed per API key before new submissions are rejected
+JOBS_MAX_PENDING_PER_KEY = int(os.getenv("JOBS_MAX_PENDING_PER_KEY", "20"))
+# Seconds finished jobs are kept for polling
+JOBS_RETENTION = float(os.getenv("JOBS_RETENTION", str(24 * 3600)))
+# A queued or running job not heartbeated for this many seconds is assumed
+# orphaned by a process that died, and taken over by another one
+JOBS_LEASE = float(os.getenv("JOBS_LEASE", "120"))
+# Server-side secret the API keys of unfinished jobs are encrypted under in
+# the SQLite store. Without it keys stay in memory and jobs cannot outlive
+# the process they were submitted to.
+JOBS_SECRET = os.getenv("JOBS_SECRET", "")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# Purge expired jobs every N submissions
+_PURGE_INTERVAL = 100
+
+# Recorded on jobs whose process stopped when no other process can recover
+# their API key
+ORPHANED_ERROR = "The server handling this job stopped before it finished; please resubmit it"
+
+class JobQueueFullError(Exception):
+    """
+    Raised when an API key already has too many queued jobs
+    """
+
+class JobsDrainingError(Exception):
+    """
+    Raised when a job is submitted to a process that is shutting down
+    """
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The fields of a job that are returned to clients
+    """
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "outputs": job["request"].get("outputs", []),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+    }
+
+class MemoryJobStore:
+    """
+    Job records kept in a dictionary; lost when the process exits
+    """
+
+    blocking = False
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, job: Dict[str, Any], sealed_key: Optional[str] = None) -> None:
+        self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+
+    def claim(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return False
+        now = time.time()
+        job.update(status=RUNNING, started_at=now, updated_at=now)
+        return True
+
+    def touch(self, job_ids: Collection[str]) -> None:
+        pass
+
+    def release(self, job_ids: Collection[str]) -> None:
+        pass
+
+    def adopt(self, keep: Collection[str] = ()) -> List[Dict[str, Any]]:
+        # Every job lives and dies with this process
+        return []
+
+    def expire(self, error: str, keep: Collection[str] = ()) -> List[str]:
+        return []
+
+    def purge(self, before: float) -> int:
+        doomed = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED and job["updated_at"] < before
+        ]
+        for job_id in doomed:
+            del self._jobs[job_id]
+        return len(doomed)
+
+class SQLiteJobStore:
+    """
+    Job records in a SQLite database shared by every worker process
+
+    Any worker can answer for any job, and finished results survive
+    restarts. The process holding a queued or running job heartbeats it.
+    Once the heartbeats stop, because that process crashed, or right away
+    when it hands the job back on the way out (see release), another
+    process takes the job over and runs it (see adopt). That needs the job's
+    API key, stored encrypted under JOBS_SECRET until the job finishes.
+    Other jobs whose process stopped are failed instead (see expire).
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, lease: float = JOBS_LEASE):
+        self.path = path
+        self.lease = lease
+        # Identifies this process's jobs; claim and touch only act on these
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                key TEXT NOT NULL,
+                api_key TEXT,  -- encrypted under JOBS_SECRET; cleared when the job finishes
+                request TEXT NOT NULL,
+                result BLOB,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                heartbeat_at REAL
+            )"""
+        )
+        for column in ("owner TEXT", "heartbeat_at REAL"):
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                # Already there
+                pass
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job.pop("api_key", None)
+        job.pop("owner", None)
+        job["request"] = json.loads(job["request"])
+        if job["result"] is not None:
+            job["result"] = json.loads(zlib.decompress(job["result"]))
+        return job
+
+    def create(self, job: Dict[str, Any], sealed_key: Optional[str] = None) -> None:
+        self._connect().execute(
+            """INSERT INTO jobs (id, status, key, api_key, request, created_at, updated_at, owner, heartbeat_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                job["id"], job["status"], job["key"], sealed_key, json.dumps(job["request"]),
+                job["created_at"], job["updated_at"], self.owner, job["updated_at"],
+            ),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = zlib.compress(json.dumps(fields["result"]).encode("utf-8"))
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+        )
+
+    def claim(self, job_id: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            """UPDATE jobs SET status = ?, started_at = ?, updated_at = ?, heartbeat_at = ?
+            WHERE id = ? AND status = ? AND owner = ?""",
+            (RUNNING, now, now, now, job_id, QUEUED, self.owner),
+        )
+        return cursor.rowcount == 1
+
+    def _set_unfinished(self, job_ids: Collection[str], assignments: str, values: tuple) -> None:
+        job_ids = list(job_ids)
+        conn = self._connect()
+        # Stay well below SQLite's limit on bound parameters
+        for i in range(0, len(job_ids), 500):
+            chunk = job_ids[i:i + 500]
+            conn.execute(
+                f"""UPDATE jobs SET {assignments}
+                WHERE status IN (?, ?) AND owner = ? AND id IN ({', '.join('?' * len(chunk))})""",
+                (*values, QUEUED, RUNNING, self.owner, *chunk),
+            )
+
+    def touch(self, job_ids: Collection[str]) -> None:
+        """
+        Heartbeat unfinished jobs held by this process
+        """
+        self._set_unfinished(job_ids, "heartbeat_at = ?", (time.time(),))
+
+    def release(self, job_ids: Collection[str]) -> None:
+        """
+        Hand unfinished jobs held by this process back to the queue, for any process to adopt now
+        """
+        self._set_unfinished(
+            job_ids, "status = ?, started_at = NULL, updated_at = ?, owner = NULL, heartbeat_at = 0", (QUEUED, time.time())
+        )
+
+    def _stale(self, keep: Collection[str]) -> List[sqlite3.Row]:
+        rows = self._connect().execute(
+            """SELECT id, key, api_key FROM jobs
+            WHERE status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?""",
+            (QUEUED, RUNNING, time.time() - self.lease),
+        ).fetchall()
+        return [row for row in rows if row["id"] not in keep]
+
+    def adopt(self, keep: Collection[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Take over queued and running jobs with a stored key whose heartbeats stopped longer than the lease ago
+
+        They are queued again, to be run from the start by the caller.
+
+        Args:
+            keep: IDs of jobs held by this process, which are never adopted
+
+        Returns:
+            The adopted jobs' id, key (hash) and api_key (encrypted)
+        """
+        conn = self._connect()
+        adopted = []
+        for row in self._stale(keep):
+            if row["api_key"] is None:
+                continue
+            now = time.time()
+            # Conditional, so that only one process adopts a job, and not one its owner heartbeated meanwhile
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, started_at = NULL, updated_at = ?, owner = ?, heartbeat_at = ?
+                WHERE id = ? AND status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?""",
+                (QUEUED, now, self.owner, now, row["id"], QUEUED, RUNNING, now - self.lease),
+            )
+            if cursor.rowcount == 1:
+                adopted.append(dict(row))
+        return adopted
+
+    def expire(self, error: str, keep: Collection[str] = ()) -> List[str]:
+        """
+        Fail queued and running jobs whose heartbeats stopped longer than the lease ago
+
+        Called after adopt, this fails the jobs no process can recover.
+
+        Args:
+            error: Error recorded on the failed jobs
+            keep: IDs of jobs held by this process, which are never expired
+
+        Returns:
+            IDs of the jobs failed
+        """
+        conn = self._connect()
+        expired = []
+        for row in self._stale(keep):
+            now = time.time()
+            # Conditional, in case the owner heartbeated it in the meantime
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, error = ?, api_key = NULL, updated_at = ?, finished_at = ?
+                WHERE id = ? AND status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?""",
+                (FAILED, error, now, now, row["id"], QUEUED, RUNNING, now - self.lease),
+            )
+            if cursor.rowcount == 1:
+                expired.append(row["id"])
+        return expired
+
+    def purge(self, before: float) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (*FINISHED, before)
+        )
+        return cursor.rowcount
+
+def create_job_store(backend: str = JOBS_BACKEND):
+    """
+    Create the configured job store, falling back to memory if SQLite is unavailable
+    """
+    if backend == "sqlite":
+        try:
+            return SQLiteJobStore(os.path.join(TRANSCRIPT_CACHE_DIR, "jobs.sqlite3"))
+        except Exception as e:
+            logger.warning(f"SQLite job store unavailable, keeping jobs in memory: {str(e)}")
+    elif backend != "memory":
+        logger.warning(f"Unknown JOBS_BACKEND {backend}, keeping jobs in memory")
+    return MemoryJobStore()
+
+def create_key_cipher(secret: str = JOBS_SECRET) -> Optional["Fernet"]:
+    """
+    Cipher for the API keys of stored jobs, or None if JOBS_SECRET or cryptography is missing
+    """
+    if not secret:
+        return None
+    if not CRYPTOGRAPHY_AVAILABLE:
+        logger.warning("JOBS_SECRET is set but cryptography is not installed; jobs will not survive restarts")
+        return None
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest()))
+
+class JobManager:
+    """
+    Runs submitted jobs on a bounded pool of worker tasks
+
+    Queued jobs are kept in one FIFO per API key, and workers take from the
+    keys in round-robin order. A key that submits a hundred jobs therefore
+    does not hold up a key that submits one.
+
+    A job's API key stays in this process's memory until the job finishes.
+    With a cipher it is also stored, encrypted, so that another process can
+    take the job over: a process shutting down hands its unfinished jobs
+    back (see stop), and a maintenance task heartbeats the jobs held here
+    and adopts jobs whose process died. Without one, such jobs can only be
+    failed. A process shutting down can drain first: it starts no more
+    queued jobs and gives running ones until a deadline to finish (see
+    drain).
+    """
+
+    def __init__(
+        self,
+        store,
+        runner: Callable[[Dict[str, Any], str], Awaitable[Dict[str, Any]]],
+        workers: int = JOBS_WORKERS,
+        max_pending_per_key: int = JOBS_MAX_PENDING_PER_KEY,
+        cipher: Optional["Fernet"] = None,
+    ):
+        self.store = store
+        self.runner = runner
+        self.cipher = cipher
+        self.workers = workers
+        self.max_pending_per_key = max_pending_per_key
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._available = asyncio.Semaphore(0)
+        self._tasks: List[asyncio.Task] = []
+        self._changes: Dict[str, asyncio.Event] = {}
+        # Callers in wait_for_change, by job ID; the job's entry in _changes goes with the last one
+        self._waiters: Dict[str, int] = {}
+        # Raw API keys of the unfinished jobs held by this process, by job ID
+        self._api_keys: Dict[str, str] = {}
+        self._maintenance: Optional[asyncio.Task] = None
+        self._draining = False
+        self._drain_deadline = 0.0
+        # Set whenever no job is running
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._running = 0
+        self._submitted = 0
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0, "adopted": 0, "expired": 0}
+
+    async def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.store.blocking:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    async def start(self) -> None:
+        """
+        Start the workers and the maintenance task, taking over jobs abandoned by earlier runs
+        """
+        if self._tasks:
+            return
+        await self._recover_orphans()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._maintenance = asyncio.create_task(self._maintain())
+
+    def drain(self, timeout: float) -> None:
+        """
+        Start no more queued jobs, and let running ones finish for up to `timeout` seconds
+
+        stop() waits for them until that deadline before failing what is left.
+        New submissions are refused from now on.
+        """
+        if self._draining:
+            return
+        self._draining = True
+        self._drain_deadline = time.monotonic() + timeout
+        if self._running:
+            logger.info(f"Draining jobs: giving {self._running} running jobs up to {timeout:.0f}s to finish")
+
+    async def stop(self) -> None:
+        """
+        Stop the workers and hand the jobs held by this process to other processes
+
+        After drain(), running jobs are first given until its deadline.
+        Without a cipher their API keys exist only here, so they are failed
+        instead.
+        """
+        if self._draining:
+            try:
+                await asyncio.wait_for(self._idle.wait(), max(0.0, self._drain_deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                logger.warning(f"{self._running} jobs were still running when the drain timeout expired")
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            self._maintenance = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        queued = []
+        while self._queues:
+            job_id = self._next()
+            if self._api_keys.pop(job_id, None) is not None:
+                queued.append(job_id)
+        if self.cipher is not None:
+            if queued:
+                await self._call(self.store.release, queued)
+                logger.info(f"Handed {len(queued)} queued jobs back for another worker")
+            return
+        for job_id in queued:
+            await self._call(self.store.update, job_id, status=FAILED, error=ORPHANED_ERROR, finished_at=time.time())
+            self.stats["failed"] += 1
+            self._notify(job_id)
+
+    def _unseal(self, sealed: str) -> Optional[str]:
+        try:
+            return self.cipher.decrypt(sealed.encode("ascii")).decode("utf-8")
+        except (InvalidToken, ValueError):
+            # Encrypted under another secret, or a raw key written by an earlier version
+            return None
+
+    async def _recover_orphans(self) -> None:
+        keep = set(self._api_keys)
+        if self.cipher is not None and not self._draining:
+            adopted = await self._call(self.store.adopt, keep)
+            for row in adopted:
+                api_key = self._unseal(row["api_key"])
+                if api_key is None:
+                    await self._call(
+                        self.store.update, row["id"], status=FAILED, error=ORPHANED_ERROR, api_key=None,
+                        finished_at=time.time(),
+                    )
+                    self.stats["failed"] += 1
+                    continue
+                self._api_keys[row["id"]] = api_key
+                self._enqueue(row["id"], row["key"])
+                self.stats["adopted"] += 1
+            if adopted:
+                logger.warning(f"Took over {len(adopted)} jobs abandoned by a stopped worker")
+        expired = await self._call(self.store.expire, ORPHANED_ERROR, keep)
+        if expired:
+            self.stats["expired"] += len(expired)
+            logger.warning(f"Failed {len(expired)} jobs abandoned by a stopped worker")
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(JOBS_LEASE / 3)
+            try:
+                if self._api_keys:
+                    await self._call(self.store.touch, list(self._api_keys))
+                await self._recover_orphans()
+            except Exception as e:
+                logger.error(f"Job maintenance failed: {str(e)}")
+
+    def _enqueue(self, job_id: str, key: str) -> None:
+        self._queues.setdefault(key, deque()).append(job_id)
+        self._available.release()
+
+    def _next(self) -> str:
+        # Serve the key at the front, then move it to the back of the rotation
+        key, queue = next(iter(self._queues.items()))
+        job_id = queue.popleft()
+        if queue:
+            self._queues.move_to_end(key)
+        else:
+            del self._queues[key]
+        return job_id
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changes.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def submit(self, request: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+        """
+        Store a new job and queue it
+
+        Args:
+            request: Job parameters (url, outputs, instructions, numQuestions, deadline, start, end, focus)
+            api_key: Groq API key the job runs with
+
+        Returns:
+            The stored job record
+
+        Raises:
+            JobQueueFullError: If the key already has too many queued jobs
+            JobsDrainingError: If this process is shutting down
+        """
+        if self._draining:
+            raise JobsDrainingError("This server is restarting; please resubmit the job")
+        key = key_hash(api_key)
+        if len(self._queues.get(key, ())) >= self.max_pending_per_key:
+            self.stats["rejected"] += 1
+            raise JobQueueFullError(f"Too many queued jobs for this API key (limit {self.max_pending_per_key})")
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "key": key,
+            "request": request,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        sealed_key = self.cipher.encrypt(api_key.encode("utf-8")).decode("ascii") if self.cipher else None
+        await self._call(self.store.create, job, sealed_key)
+        self._api_keys[job["id"]] = api_key
+        self._enqueue(job["id"], key)
+        self.stats["submitted"] += 1
+        self._submitted += 1
+        if self._submitted % _PURGE_INTERVAL == 0:
+            purged = await self._call(self.store.purge, now - JOBS_RETENTION)
+            if purged:
+                logger.info(f"Purged {purged} expired jobs")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.store.get, job_id)
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> bool:
+        """
+        Wait until this process next updates the job, for up to `timeout` seconds
+
+        Updates made by other processes are not seen, so callers re-read the
+        job after a timeout too.
+
+        Returns:
+            True if the job was updated, False if the timeout expired
+        """
+        event = self._changes.get(job_id)
+        if event is None:
+            event = asyncio.Event()
+            self._changes[job_id] = event
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            # Also on cancellation, when an events client disconnects
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                self._changes.pop(job_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            await self._available.acquire()
+            if self._draining:
+                # Left queued, for stop() to fail
+                continue
+            job_id = self._next()
+            # Expired meanwhile, if this process stalled for longer than the lease
+            if not await self._call(self.store.claim, job_id):
+                self._api_keys.pop(job_id, None)
+                continue
+            job = await self._call(self.store.get, job_id)
+            self._notify(job_id)
+            await self._execute(job)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        self._running += 1
+        self._idle.clear()
+        try:
+            api_key = self._api_keys.get(job_id)
+            if api_key is None:
+                raise ValueError(ORPHANED_ERROR)
+            result = await self.runner(job["request"], api_key)
+        except asyncio.CancelledError:
+            # Shutting down: another process re-runs the job, or without a
+            # cipher the API key goes with this process
+            if self.cipher is not None:
+                await asyncio.shield(self._call(self.store.release, [job_id]))
+            else:
+                await asyncio.shield(self._call(
+                    self.store.update, job_id, status=FAILED, error=ORPHANED_ERROR, finished_at=time.time()
+                ))
+                self.stats["failed"] += 1
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await self._call(
+                self.store.update, job_id, status=FAILED, error=str(e), api_key=None, finished_at=time.time()
+            )
+            self.stats["failed"] += 1
+        else:
+            await self._call(
+                self.store.update, job_id, status=SUCCEEDED, result=result, api_key=None, finished_at=time.time()
+            )
+            self.stats["succeeded"] += 1
+            logger.info(f"Job {job_id} finished")
+        finally:
+            self._running -= 1
+            if not self._running:
+                self._idle.set()
+            self._api_keys.pop(job_id, None)
+            self._notify(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "backend": type(self.store).__name__,
+            "restartable": self.cipher is not None,
+            "workers": self.workers,
+            "running": self._running,
+            "draining": self._draining,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "queued_keys": len(self._queues),
+        }
+
+async def run_video_job(request: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    """
+    Run a job submitted through POST /api/jobs
+    
+    Its LLM calls run at bulk priority and wait for capacity rather than
+    being shed, and its transcript fetches are paced by the per-host rate
+    limits.
+    """
+    token = background_work.set(True)
+    paced = paced_fetches.set(True)
+    try:
+        return await process_video(
+            request["url"],
+            api_key,
+            outputs=request.get("outputs") or ["transcript"],
+            instructions=request.get("instructions"),
+            num_questions=request.get("numQuestions") or 5,
+            deadline=request.get("deadline"),
+            start=request.get("start"),
+            end=request.get("end"),
+            focus=request.get("focus"),
+        )
+    finally:
+        paced_fetches.reset(paced)
+        background_work.reset(token)
+
+_job_manager: Optional[JobManager] = None
+
+def get_job_manager() -> JobManager:
+    """
+    Get the process-wide job manager
+    """
+    global _job_manager
+    if _job_manager is None:
+        store = create_job_store()
+        # Only the SQLite store outlives this process
+        cipher = create_key_cipher() if isinstance(store, SQLiteJobStore) else None
+        _job_manager = JobManager(store, run_video_job, cipher=cipher)
+    return _job_manager
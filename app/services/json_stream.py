@@ -0,0 +1,80 @@
+import re
+import json
+from typing import Any, List
+
+_SPECIAL = re.compile(r'[{}"\\]')
+
+class JSONObjectStreamParser:
+    """
+    Incrementally extract top-level JSON objects from streamed text
+
+    Meant for LLM output shaped like a JSON array of objects. Text outside
+    objects (the array brackets, commas, markdown fences, chatter) is skipped,
+    so a missing "[" or a truncated tail does not affect the objects that
+    were already complete. An object is parsed as soon as its closing brace
+    arrives; objects that fail to parse are counted in `errors` and dropped.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape_at = -2
+        self._offset = 0
+        self.errors = 0
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Consume the next piece of text
+
+        Args:
+            text: Newly received text
+
+        Returns:
+            Objects completed by this piece, in order
+        """
+        completed = []
+        start = 0
+        for match in _SPECIAL.finditer(text):
+            i = match.start()
+            position = self._offset + i
+            ch = text[i]
+
+            # A backslash only escapes the character right after it
+            if position == self._escape_at + 1:
+                continue
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._in_string = False
+                    start = i
+                    self._buffer = []
+                continue
+
+            if self._in_string:
+                if ch == "\\":
+                    self._escape_at = position
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(text[start:i + 1])
+                    raw = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        self.errors += 1
+
+        if self._depth > 0:
+            self._buffer.append(text[start:])
+        self._offset += len(text)
+        return completed
@@ -0,0 +1,420 @@
+import os
+import math
+import time
+import heapq
+import random
+import asyncio
+import hashlib
+import logging
+import itertools
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import groq
+
+from app.services.rate_limit import TokenBucket
+from app.services.groq_client import GROQ_MAX_RETRIES
+from app.services.metrics import LLM_QUEUE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Per-key limits, matching the Groq account's requests/tokens per minute
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "6000"))
+# Calls in flight at once per key
+LLM_KEY_CONCURRENCY = int(os.getenv("LLM_KEY_CONCURRENCY", "4"))
+# Calls allowed to wait per key before new ones are shed
+LLM_QUEUE_LIMIT = int(os.getenv("LLM_QUEUE_LIMIT", "32"))
+# Shed a call up front if its estimated queueing delay is longer than this (seconds)
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))
+# Retries after a 429 from Groq; other transient errors use GROQ_MAX_RETRIES
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+# Per-key schedulers idle for this long are dropped
+LLM_SCHEDULER_IDLE_TTL = float(os.getenv("LLM_SCHEDULER_IDLE_TTL", "600"))
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+T = TypeVar("T")
+
+# Work started from background jobs: never ahead of interactive calls, and
+# waits for capacity instead of being shed
+background_work: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_background_work", default=False)
+# Set once a request has been admitted (see LLMScheduler.admit): its calls
+# then queue instead of being shed halfway through the request
+admitted_work: contextvars.ContextVar[Optional["Admission"]] = contextvars.ContextVar("llm_admitted_work", default=None)
+
+_TRANSIENT_ERRORS = (groq.APIConnectionError, groq.InternalServerError)
+
+def key_hash(api_key: str) -> str:
+    """
+    Identify an API key without keeping the raw key around
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+class LLMOverloadedError(Exception):
+    """
+    Raised instead of calling Groq when a key's queue is full or too slow
+
+    `retry_after` is the suggested number of seconds to wait, for a 429
+    response's Retry-After header.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+def _retry_after(error: groq.RateLimitError) -> Optional[float]:
+    """
+    Seconds Groq asked us to wait, from the 429 response headers
+    """
+    try:
+        value = error.response.headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (AttributeError, ValueError):
+        return None
+
+class KeyScheduler:
+    """
+    Admission control and priority queue for one API key
+
+    A call needs one request token and its estimated token cost from two
+    token buckets refilled at the key's RPM and TPM, plus one of
+    `concurrency` slots. Waiting calls form a priority queue, so a queued
+    interactive summary is served before queued bulk quiz calls. Calls that
+    would overflow the queue, or wait longer than `max_wait`, are rejected
+    up front.
+    """
+
+    def __init__(
+        self,
+        rpm: float = GROQ_RPM,
+        tpm: float = GROQ_TPM,
+        concurrency: int = LLM_KEY_CONCURRENCY,
+        queue_limit: int = LLM_QUEUE_LIMIT,
+        max_wait: float = LLM_MAX_QUEUE_WAIT,
+    ):
+        self.requests = TokenBucket(rpm / 60, rpm)
+        self.tokens = TokenBucket(tpm / 60, tpm)
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.max_wait = max_wait
+        self.active = 0
+        # Estimated tokens of admitted requests that have not queued their calls yet
+        self.promised = 0.0
+        self.paused_until = 0.0
+        self.last_used = time.monotonic()
+        self._queue: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"calls": 0, "shed": 0, "rate_limited": 0, "retries": 0}
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, _, future in self._queue if not future.done())
+
+    def estimate_wait(self, cost: float, priority: int) -> float:
+        """
+        Rough seconds until a new call with this cost and priority would start
+
+        Requests admitted but still fetching their transcripts count as well,
+        so a burst of requests is not admitted against an empty queue.
+        """
+        ahead = [c for p, _, c, f in self._queue if p <= priority and not f.done()]
+        capacity = self.tokens.capacity
+        return max(
+            self.requests.backlog_time(len(ahead) + 1),
+            self.tokens.backlog_time(sum(min(c, capacity) for c in ahead) + self.promised + min(cost, capacity)),
+            self.paused_until - time.monotonic(),
+        )
+
+    def check(self, cost: float, priority: int) -> None:
+        """
+        Raise LLMOverloadedError if a call should be shed instead of queued
+        """
+        if self.queued >= self.queue_limit:
+            self.stats["shed"] += 1
+            raise LLMOverloadedError(
+                "Too many LLM requests queued for this API key",
+                self.estimate_wait(cost, priority),
+            )
+        wait = self.estimate_wait(cost, priority)
+        if wait > self.max_wait:
+            self.stats["shed"] += 1
+            raise LLMOverloadedError(
+                f"LLM rate limit for this API key would delay this request by about {math.ceil(wait)}s",
+                wait,
+            )
+
+    async def acquire(self, cost: float, priority: int, shed: bool = True) -> None:
+        """
+        Wait for a slot and the rate-limit budget for one call
+
+        Args:
+            cost: Estimated tokens of the call (prompt plus max completion)
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK
+            shed: Whether to reject the call instead of queueing it when overloaded
+        """
+        self.last_used = time.monotonic()
+        if shed:
+            self.check(cost, priority)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), cost, future))
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot and the unused tokens back
+                self.release(cost, 0)
+            raise
+        LLM_QUEUE_SECONDS.observe(
+            time.monotonic() - queued_at, priority="interactive" if priority == PRIORITY_INTERACTIVE else "bulk"
+        )
+
+    def release(self, reserved: float, used: Optional[float] = None) -> None:
+        """
+        Free a slot and settle the token estimate with the actual usage
+        """
+        self.active -= 1
+        if used is not None:
+            # Calls larger than the bucket only took a full bucket when they were granted
+            self.tokens.consume(used - min(reserved, self.tokens.capacity))
+        self._dispatch()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop starting calls for a while after Groq reported a rate limit
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.requests.drain()
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue and self.active < self.concurrency:
+            _, _, cost, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            delay = max(
+                self.paused_until - time.monotonic(),
+                self.requests.time_until(1),
+                self.tokens.time_until(cost),
+            )
+            if delay > 0:
+                # The head of the queue waits; nothing behind it may overtake it
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self.requests.try_acquire(1)
+            self.tokens.try_acquire(cost)
+            self.active += 1
+            self.stats["calls"] += 1
+            future.set_result(None)
+
+    def idle(self) -> bool:
+        return self.active == 0 and not self.queued and not self.promised
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active": self.active,
+            "queued": self.queued,
+            "promised_tokens": round(self.promised, 1),
+            "request_budget": round(self.requests.tokens, 1),
+            "token_budget": round(self.tokens.tokens, 1),
+        }
+
+class Reservation:
+    """
+    A granted call slot; release it exactly once when the call is over
+    """
+
+    __slots__ = ("scheduler", "cost", "released")
+
+    def __init__(self, scheduler: KeyScheduler, cost: float):
+        self.scheduler = scheduler
+        self.cost = cost
+        self.released = False
+
+    def release(self, used: Optional[float] = None) -> None:
+        if not self.released:
+            self.released = True
+            self.scheduler.release(self.cost, used)
+
+class Admission:
+    """
+    Token estimate of an admitted request, counted by its key's scheduler
+    until the request's calls are queued or the request is over
+    """
+
+    __slots__ = ("scheduler", "remaining")
+
+    def __init__(self, scheduler: KeyScheduler):
+        self.scheduler = scheduler
+        self.remaining = 0.0
+
+    def add(self, cost: float) -> None:
+        self.remaining += cost
+        self.scheduler.promised += cost
+
+    def claim(self, cost: float) -> None:
+        """
+        Stop counting up to `cost` tokens, once a call of that cost is queued
+        """
+        taken = min(cost, self.remaining)
+        self.remaining -= taken
+        self.scheduler.promised -= taken
+
+    def release(self) -> None:
+        self.claim(self.remaining)
+
+class LLMScheduler:
+    """
+    Per-API-key schedulers in front of every Groq call
+    """
+
+    def __init__(self, idle_ttl: float = LLM_SCHEDULER_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._keys: Dict[str, KeyScheduler] = {}
+
+    def for_key(self, api_key: str) -> KeyScheduler:
+        # Avoid keeping raw API keys as dictionary keys
+        key = key_hash(api_key)
+        scheduler = self._keys.get(key)
+        if scheduler is None:
+            self._prune()
+            scheduler = KeyScheduler()
+            self._keys[key] = scheduler
+        return scheduler
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, s in self._keys.items() if s.idle() and now - s.last_used > self.idle_ttl]:
+            del self._keys[key]
+
+    def admit(self, api_key: str, cost: float, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """
+        Shed a request before any work starts if its key is already overloaded
+
+        Once admitted, the request's Groq calls (map-reduce chunks, quiz
+        shards, retries) wait for capacity instead of being shed again.
+        Until they are queued, `cost` (at most the key's token bucket)
+        counts against later admissions for the key; it stops counting when
+        the current task (the request) ends. Background work is never shed
+        and is not counted.
+
+        Raises:
+            LLMOverloadedError: If the request should be rejected with 429
+        """
+        if background_work.get():
+            return
+        scheduler = self.for_key(api_key)
+        cost = min(cost, scheduler.tokens.capacity)
+        scheduler.check(cost, priority)
+        admission = admitted_work.get()
+        if admission is None or admission.scheduler is not scheduler:
+            admission = Admission(scheduler)
+            admitted_work.set(admission)
+            task = asyncio.current_task()
+            if task is not None:
+                task.add_done_callback(lambda _: admission.release())
+        admission.add(cost)
+
+    async def open(
+        self,
+        api_key: str,
+        cost: float,
+        priority: int,
+        call: Callable[[], Awaitable[T]],
+    ) -> Tuple["Reservation", T]:
+        """
+        Start one Groq call under the key's rate limits, retrying rate-limit responses
+
+        The caller keeps the slot until it releases the returned reservation,
+        which lets a streamed completion hold its slot while it is consumed.
+
+        Args:
+            api_key: Groq API key
+            cost: Estimated tokens of the call (prompt plus max completion)
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK
+            call: Zero-argument coroutine function making the call
+
+        Returns:
+            Tuple of (reservation to release when done, the call's result)
+
+        Raises:
+            LLMOverloadedError: If the call was shed or rate limits persisted
+        """
+        scheduler = self.for_key(api_key)
+        background = background_work.get()
+        admission = admitted_work.get()
+        if background:
+            priority = max(priority, PRIORITY_BULK)
+        rate_limited = 0
+        failures = 0
+        while True:
+            if admission is not None and admission.scheduler is scheduler:
+                # The call is about to be queued, where it counts by itself
+                admission.claim(cost)
+            await scheduler.acquire(cost, priority, shed=not (background or admission is not None))
+            reservation = Reservation(scheduler, cost)
+            backoff = 0.0
+            try:
+                return reservation, await call()
+            except groq.RateLimitError as e:
+                reservation.release()
+                rate_limited += 1
+                scheduler.stats["rate_limited"] += 1
+                delay = _retry_after(e) or LLM_RETRY_BASE_DELAY * 2 ** (rate_limited - 1)
+                # Hold back every call of this key, not just this one
+                scheduler.pause(delay)
+                if rate_limited > LLM_RATE_LIMIT_RETRIES:
+                    raise LLMOverloadedError("Groq rate limit reached for this API key", delay) from e
+                logger.warning(f"Groq rate limited this key, retrying in {delay:.1f}s ({rate_limited}/{LLM_RATE_LIMIT_RETRIES})")
+            except _TRANSIENT_ERRORS as e:
+                reservation.release()
+                failures += 1
+                if failures > GROQ_MAX_RETRIES:
+                    raise
+                backoff = LLM_RETRY_BASE_DELAY * 2 ** (failures - 1) * (0.5 + random.random())
+                logger.warning(f"Transient Groq error, retrying in {backoff:.1f}s: {str(e)}")
+            except BaseException:
+                reservation.release()
+                raise
+            scheduler.stats["retries"] += 1
+            if backoff:
+                await asyncio.sleep(backoff)
+
+    async def run(
+        self,
+        api_key: str,
+        cost: float,
+        priority: int,
+        call: Callable[[], Awaitable[T]],
+        settle: Optional[Callable[[T], Optional[float]]] = None,
+    ) -> T:
+        """
+        Run one Groq call under the key's rate limits (see open)
+
+        Args:
+            settle: Optional function returning the actual tokens used by a result
+        """
+        reservation, result = await self.open(api_key, cost, priority, call)
+        used = None
+        try:
+            used = settle(result) if settle is not None else None
+        finally:
+            reservation.release(used)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {key[:12]: scheduler.get_stats() for key, scheduler in self._keys.items()}
+
+llm_scheduler = LLMScheduler()
@@ -1,73 +1,518 @@
 import os
+import re
 import json
-import groq
-from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, List, Dict, Any, Optional
+
+from app.services.groq_client import get_groq_registry
+from app.services.chunking import chunk_text, estimate_tokens, split_into_parts, CHARS_PER_TOKEN
+from app.services.llm_scheduler import llm_scheduler, key_hash, LLMOverloadedError, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from app.services.json_stream import JSONObjectStreamParser
+from app.services.singleflight import SingleFlight
+from app.services.cache import TwoTierCache, create_disk_store
+from app.services.normalize import compress_text
+from app.services.caption_parsing import run_parser
+from app.services.metrics import timed, LLM_CALL_SECONDS, LLM_PROMPT_TOKENS, LLM_COMPLETION_TOKENS
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL = os.getenv("DEFAULT_GROQ_MODEL", "llama3-70b-8192")
 
-async def generate_summary(transcript: str, api_key: str, instructions: Optional[str] = None) -> str:
+# Transcripts estimated above this many tokens are summarized map-reduce style
+SUMMARY_SINGLE_PASS_TOKENS = int(os.getenv("SUMMARY_SINGLE_PASS_TOKENS", "5000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_CHUNK_OUTPUT_TOKENS = int(os.getenv("SUMMARY_CHUNK_OUTPUT_TOKENS", "600"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+SUMMARY_TEMPERATURE = 0.3
+SUMMARY_MAX_TOKENS = 1500
+CHUNK_TEMPERATURE = 0.2
+
+SUMMARY_SYSTEM_PROMPT = "You are an educational assistant that specializes in creating concise, informative summaries."
+
+# Quizzes with more questions than this are generated in concurrent shards
+QUIZ_SHARD_SIZE = int(os.getenv("QUIZ_SHARD_SIZE", "5"))
+# Most questions one quiz may ask for; each shard is a separate Groq call
+QUIZ_MAX_QUESTIONS = int(os.getenv("QUIZ_MAX_QUESTIONS", "30"))
+QUIZ_CONCURRENCY = int(os.getenv("QUIZ_CONCURRENCY", "4"))
+QUIZ_SHARD_RETRIES = int(os.getenv("QUIZ_SHARD_RETRIES", "2"))
+QUIZ_DUPLICATE_THRESHOLD = float(os.getenv("QUIZ_DUPLICATE_THRESHOLD", "0.8"))
+
+QUIZ_TEMPERATURE = 0.5
+QUIZ_MAX_TOKENS = 2500
+# Transcript tokens per quiz prompt; longer transcripts are compressed to fit (0 disables)
+QUIZ_PROMPT_TOKENS = int(os.getenv("QUIZ_PROMPT_TOKENS", "5000"))
+
+LLM_CACHE_MEMORY_MB = float(os.getenv("LLM_CACHE_MEMORY_MB", "32"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+LLM_CACHE_DISK_ENABLED = os.getenv("LLM_CACHE_DISK_ENABLED", "true").lower() == "true"
+
+# Cache modes a caller can ask for: use the cache, regenerate and overwrite
+# the cached result, or neither read nor write it
+CACHE_DEFAULT = "default"
+CACHE_REFRESH = "refresh"
+CACHE_BYPASS = "bypass"
+
+QUIZ_SYSTEM_PROMPT = "You are an educational assistant that creates high-quality assessment questions."
+
+DEFAULT_SUMMARY_INSTRUCTIONS = """Create a concise, informative summary of the video transcript. 
+        Focus on key points, main ideas, and important takeaways. 
+        Keep the summary well-structured with headers for main sections."""
+
+CHUNK_PROMPT = """Condense this section of a video transcript into detailed notes.
+    Keep every key point, definition, example and conclusion, in the order they appear.
+    
+    TRANSCRIPT SECTION:
+    {text}
+    
+    Provide only the notes."""
+
+MERGE_PROMPT = """Merge these consecutive notes from a video into one set of notes.
+    Keep every key point and preserve the order; remove repetition.
+    
+    NOTES:
+    {text}
+    
+    Provide only the merged notes."""
+
+_llm_cache: Optional[TwoTierCache] = None
+
+# Identical concurrent generations share one Groq call
+llm_flights = SingleFlight("llm")
+
+def get_llm_cache() -> TwoTierCache:
+    """
+    Get the process-wide cache of LLM results (summaries, quizzes, chunk notes)
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = TwoTierCache(
+            "LLM",
+            int(LLM_CACHE_MEMORY_MB * 1024 * 1024),
+            LLM_CACHE_TTL,
+            disk=create_disk_store("llm_results.sqlite3", LLM_CACHE_DISK_ENABLED),
+        )
+    return _llm_cache
+
+def _result_key(kind: str, content: str, **params: Any) -> str:
+    """
+    Content-addressed cache key for an LLM result
+    """
+    material = json.dumps(
+        {
+            "kind": kind,
+            "model": DEFAULT_MODEL,
+            "content": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            **params,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _content_key(transcript: str, video_id: Optional[str] = None) -> str:
+    """
+    Identify the source content of a generation by video ID, or by transcript hash
+    """
+    if video_id:
+        return video_id
+    return hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+
+async def generate_summary(
+    transcript: str,
+    api_key: str,
+    instructions: Optional[str] = None,
+    video_id: Optional[str] = None,
+    cache_mode: str = CACHE_DEFAULT,
+) -> str:
     """
     Generate summary from transcript using Groq LLM
     
+    Results are cached by a hash of the transcript, instructions, model and
+    temperature. Concurrent calls for the same (video, instructions, model)
+    are coalesced into a single generation.
+    
     Args:
         transcript: The YouTube video transcript
         api_key: Groq API key
         instructions: Optional specific instructions for summarization
+        video_id: Optional video ID the transcript belongs to
+        cache_mode: CACHE_DEFAULT, CACHE_REFRESH or CACHE_BYPASS
         
     Returns:
         Generated summary text
     """
-    # Set up Groq client
-    client = groq.Groq(api_key=api_key)
+    cache = get_llm_cache()
+    cache_key = _summary_cache_key(transcript, instructions)
+    if cache_mode == CACHE_DEFAULT:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    async def generate() -> str:
+        summary = await _generate_summary(transcript, api_key, instructions)
+        if cache_mode != CACHE_BYPASS:
+            await cache.set(cache_key, summary)
+        return summary
     
+    # Callers asking for a fresh result do not join someone else's generation
+    if cache_mode != CACHE_DEFAULT:
+        return await generate()
+    # Only calls on the same API key are shared, so nobody's quota or key errors land on another user
+    key = ("summary", _content_key(transcript, video_id), instructions, DEFAULT_MODEL, key_hash(api_key))
+    return await llm_flights.do(key, generate)
+
+async def admit_summary(
+    transcript: str,
+    api_key: str,
+    instructions: Optional[str] = None,
+    cache_mode: str = CACHE_DEFAULT,
+) -> None:
+    """
+    Shed a summary request with 429 before its Groq work starts if the key is overloaded
+
+    A cached summary costs nothing. Otherwise the request is charged its
+    final prompt: the transcript, up to SUMMARY_SINGLE_PASS_TOKENS beyond
+    which it is condensed first, plus the completion.
+
+    Raises:
+        LLMOverloadedError: If the request should be rejected
+    """
+    if cache_mode == CACHE_DEFAULT and await _is_cached(_summary_cache_key(transcript, instructions)):
+        return
+    cost = min(estimate_tokens(transcript), SUMMARY_SINGLE_PASS_TOKENS) + SUMMARY_MAX_TOKENS
+    _admit(api_key, cost, PRIORITY_INTERACTIVE)
+
+async def _is_cached(cache_key: str) -> bool:
+    # A probe, not a lookup: the generation that follows records the hit or miss
+    return await get_llm_cache().get(cache_key, record=False) is not None
+
+def _admit(api_key: str, cost: int, priority: int) -> None:
+    try:
+        llm_scheduler.admit(api_key, cost, priority)
+    except LLMOverloadedError as e:
+        logger.warning(f"Shedding request: {str(e)}")
+        raise
+
+def _summary_cache_key(transcript: str, instructions: Optional[str]) -> str:
+    return _result_key(
+        "summary", transcript, instructions=instructions,
+        temperature=SUMMARY_TEMPERATURE, max_tokens=SUMMARY_MAX_TOKENS,
+    )
+
+async def _complete(
+    api_key: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    priority: int = PRIORITY_INTERACTIVE,
+    operation: str = "summary",
+) -> str:
+    """
+    Run a single chat completion on the pooled Groq client for this key
+    
+    The call goes through the key's scheduler, which applies its rate limits
+    and priority and retries rate-limit responses. Its latency and token
+    usage are recorded under `operation`.
+    """
+    async with get_groq_registry().client(api_key) as client:
+        async def call():
+            return await client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                model=DEFAULT_MODEL,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        
+        with timed(LLM_CALL_SECONDS, operation=operation) as labels:
+            try:
+                response = await llm_scheduler.run(
+                    api_key,
+                    _call_cost(system_prompt, prompt, max_tokens),
+                    priority,
+                    call,
+                    settle=lambda response: response.usage.total_tokens if response.usage else None,
+                )
+            except LLMOverloadedError:
+                labels["outcome"] = "rate_limited"
+                raise
+    
+    if response.usage:
+        LLM_PROMPT_TOKENS.observe(response.usage.prompt_tokens, operation=operation)
+        LLM_COMPLETION_TOKENS.observe(response.usage.completion_tokens, operation=operation)
+    return response.choices[0].message.content.strip()
+
+def _call_cost(system_prompt: str, prompt: str, max_tokens: int) -> int:
+    # Groq counts the completion against the TPM limit too, so reserve max_tokens up front
+    return estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens
+
+def _summary_prompt(instructions: Optional[str], content: str, label: str = "VIDEO TRANSCRIPT") -> str:
     # Default instructions if none provided
     if not instructions:
-        instructions = """Create a concise, informative summary of the video transcript. 
-        Focus on key points, main ideas, and important takeaways. 
-        Keep the summary well-structured with headers for main sections."""
+        instructions = DEFAULT_SUMMARY_INSTRUCTIONS
     
-    # Create prompt for the model
-    prompt = f"""You are an expert in creating concise, informative summaries of video content.
+    return f"""You are an expert in creating concise, informative summaries of video content.
     
     INSTRUCTIONS:
     {instructions}
     
-    VIDEO TRANSCRIPT:
-    {transcript}
+    {label}:
+    {content}
     
     Provide only the summary without any introductory text like "Here's a summary:" or "Summary:".
     """
+
+async def _stream_complete(
+    api_key: str,
+    system_prompt: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    priority: int = PRIORITY_INTERACTIVE,
+    operation: str = "summary",
+) -> AsyncIterator[str]:
+    """
+    Run a streaming chat completion and yield content deltas as they arrive
     
-    # Generate summary using Groq
-    response = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are an educational assistant that specializes in creating concise, informative summaries."},
-            {"role": "user", "content": prompt}
-        ],
-        model=DEFAULT_MODEL,
-        temperature=0.3,
-        max_tokens=1500,
+    The scheduler slot is held until the stream has been consumed. Latency
+    covers the whole stream and token counts are estimated.
+    """
+    async with get_groq_registry().client(api_key) as client:
+        async def call():
+            return await client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                model=DEFAULT_MODEL,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+        
+        cost = _call_cost(system_prompt, prompt, max_tokens)
+        with timed(LLM_CALL_SECONDS, operation=operation) as labels:
+            try:
+                reservation, stream = await llm_scheduler.open(api_key, cost, priority, call)
+            except LLMOverloadedError:
+                labels["outcome"] = "rate_limited"
+                raise
+            completion_chars = 0
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        completion_chars += len(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            finally:
+                try:
+                    await stream.close()
+                finally:
+                    # Streamed chunks carry no usage, so settle with an estimate
+                    completion_tokens = completion_chars // CHARS_PER_TOKEN
+                    reservation.release(cost - max_tokens + completion_tokens)
+                    LLM_PROMPT_TOKENS.observe(cost - max_tokens, operation=operation)
+                    LLM_COMPLETION_TOKENS.observe(completion_tokens, operation=operation)
+
+async def _build_summary_prompt(transcript: str, api_key: str, instructions: Optional[str]) -> str:
+    """
+    Build the final summary prompt, condensing the transcript first if it is too long
+    """
+    if estimate_tokens(transcript) <= SUMMARY_SINGLE_PASS_TOKENS:
+        return _summary_prompt(instructions, transcript)
+    
+    # Too long for a single prompt: summarize chunks concurrently, then reduce
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    chunks = chunk_text(transcript, SUMMARY_CHUNK_TOKENS)
+    logger.info(f"Summarizing long transcript in {len(chunks)} chunks")
+    partials = await asyncio.gather(*[_condense(chunk, api_key, semaphore, CHUNK_PROMPT) for chunk in chunks])
+    notes = await _reduce_partials(list(partials), api_key, semaphore)
+    return _summary_prompt(instructions, notes, "VIDEO SECTION NOTES (in order)")
+
+async def _generate_summary(transcript: str, api_key: str, instructions: Optional[str]) -> str:
+    prompt = await _build_summary_prompt(transcript, api_key, instructions)
+    return await _complete(api_key, SUMMARY_SYSTEM_PROMPT, prompt, SUMMARY_TEMPERATURE, SUMMARY_MAX_TOKENS)
+
+async def stream_summary(
+    transcript: str,
+    api_key: str,
+    instructions: Optional[str] = None,
+    cache_mode: str = CACHE_DEFAULT,
+) -> AsyncIterator[str]:
+    """
+    Generate a summary and yield it token by token as Groq streams it
+    
+    A cached summary is yielded in one piece.
+    
+    Args:
+        transcript: The YouTube video transcript
+        api_key: Groq API key
+        instructions: Optional specific instructions for summarization
+        cache_mode: CACHE_DEFAULT, CACHE_REFRESH or CACHE_BYPASS
+        
+    Yields:
+        Summary text deltas
+    """
+    cache = get_llm_cache()
+    cache_key = _summary_cache_key(transcript, instructions)
+    if cache_mode == CACHE_DEFAULT:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    prompt = await _build_summary_prompt(transcript, api_key, instructions)
+    parts = []
+    stream = _stream_complete(api_key, SUMMARY_SYSTEM_PROMPT, prompt, SUMMARY_TEMPERATURE, SUMMARY_MAX_TOKENS)
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            yield delta
+    finally:
+        # Closes the Groq stream and releases the scheduler slot now, not when garbage collected
+        await stream.aclose()
+    if cache_mode != CACHE_BYPASS:
+        await cache.set(cache_key, "".join(parts).strip())
+
+async def _condense(text: str, api_key: str, semaphore: asyncio.Semaphore, template: str) -> str:
+    """
+    Condense a chunk (or a batch of partial summaries) into notes
+
+    The result does not depend on the user's instructions, so it is cached by
+    content and a request with new instructions only reruns the final step.
+    """
+    cache = get_llm_cache()
+    key = _result_key(
+        "notes", text, template=template,
+        temperature=CHUNK_TEMPERATURE, max_tokens=SUMMARY_CHUNK_OUTPUT_TOKENS,
     )
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
     
-    return response.choices[0].message.content.strip()
+    async with semaphore:
+        notes = await _complete(
+            api_key, SUMMARY_SYSTEM_PROMPT, template.format(text=text), CHUNK_TEMPERATURE, SUMMARY_CHUNK_OUTPUT_TOKENS,
+            operation="notes"
+        )
+    
+    await cache.set(key, notes)
+    return notes
 
-async def generate_mcqs(transcript: str, api_key: str, num_questions: int = 5) -> List[Dict[str, Any]]:
+async def _reduce_partials(partials: List[str], api_key: str, semaphore: asyncio.Semaphore) -> str:
+    """
+    Merge partial summaries level by level until they fit in one prompt
+    """
+    while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > SUMMARY_SINGLE_PASS_TOKENS:
+        batches = []
+        current = []
+        for partial in partials:
+            if current and estimate_tokens("\n\n".join(current + [partial])) > SUMMARY_CHUNK_TOKENS:
+                batches.append(current)
+                current = []
+            current.append(partial)
+        batches.append(current)
+        if len(batches) == len(partials):
+            break
+        logger.info(f"Reducing {len(partials)} partial summaries into {len(batches)}")
+        partials = list(await asyncio.gather(
+            *[_condense("\n\n".join(batch), api_key, semaphore, MERGE_PROMPT) for batch in batches]
+        ))
+    return "\n\n".join(partials)
+
+async def generate_mcqs(
+    transcript: str,
+    api_key: str,
+    num_questions: int = 5,
+    cache_mode: str = CACHE_DEFAULT,
+) -> List[Dict[str, Any]]:
     """
     Generate multiple-choice questions based on the transcript
     
+    Results are cached by a hash of the transcript, question count, model and
+    temperature; use CACHE_REFRESH to get a fresh variant. Concurrent calls
+    for the same (transcript, question count, model) are coalesced into a
+    single generation.
+    
     Args:
         transcript: The YouTube video transcript
         api_key: Groq API key
         num_questions: Number of questions to generate
+        cache_mode: CACHE_DEFAULT, CACHE_REFRESH or CACHE_BYPASS
         
     Returns:
         List of MCQ objects
     """
-    # Set up Groq client
-    client = groq.Groq(api_key=api_key)
+    cache = get_llm_cache()
+    cache_key = _quiz_cache_key(transcript, num_questions)
+    if cache_mode == CACHE_DEFAULT:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
     
+    async def generate() -> List[Dict[str, Any]]:
+        questions = await _generate_quiz(transcript, api_key, num_questions)
+        if cache_mode != CACHE_BYPASS:
+            await cache.set(cache_key, questions)
+        return questions
+    
+    # Callers asking for a fresh variant do not join someone else's generation
+    if cache_mode != CACHE_DEFAULT:
+        return await generate()
+    key = ("quiz", _content_key(transcript), num_questions, DEFAULT_MODEL, key_hash(api_key))
+    return await llm_flights.do(key, generate)
+
+async def admit_quiz(
+    transcript: str,
+    api_key: str,
+    num_questions: int = 5,
+    cache_mode: str = CACHE_DEFAULT,
+) -> None:
+    """
+    Shed a quiz request with 429 before its Groq work starts if the key is overloaded
+
+    A cached quiz costs nothing. Otherwise the request is charged one call
+    per shard, as _generate_quiz makes them: the shard's section of the
+    transcript, up to QUIZ_PROMPT_TOKENS to which it is compressed, plus
+    the completion.
+
+    Raises:
+        LLMOverloadedError: If the request should be rejected
+    """
+    if cache_mode == CACHE_DEFAULT and await _is_cached(_quiz_cache_key(transcript, num_questions)):
+        return
+    counts = _shard_counts(num_questions)
+    sections = [transcript] if len(counts) == 1 else split_into_parts(transcript, len(counts))
+    prompt_tokens = 0
+    for i in range(len(counts)):
+        section_tokens = estimate_tokens(sections[i % len(sections)])
+        if QUIZ_PROMPT_TOKENS > 0:
+            section_tokens = min(section_tokens, QUIZ_PROMPT_TOKENS)
+        prompt_tokens += section_tokens
+    _admit(api_key, prompt_tokens + len(counts) * QUIZ_MAX_TOKENS, PRIORITY_BULK)
+
+def _quiz_cache_key(transcript: str, num_questions: int) -> str:
+    return _result_key(
+        "quiz", transcript, num_questions=num_questions,
+        temperature=QUIZ_TEMPERATURE, max_tokens=QUIZ_MAX_TOKENS,
+    )
+
+async def _fit_quiz_transcript(transcript: str) -> str:
+    """
+    Compress a transcript that would not fit the quiz prompt budget
+    """
+    if QUIZ_PROMPT_TOKENS <= 0 or estimate_tokens(transcript) <= QUIZ_PROMPT_TOKENS:
+        return transcript
+    compressed = await run_parser(compress_text, transcript, QUIZ_PROMPT_TOKENS)
+    logger.info(f"Compressed quiz transcript by {estimate_tokens(transcript) - estimate_tokens(compressed)} tokens")
+    return compressed
+
+def _quiz_prompt(transcript: str, num_questions: int) -> str:
     # Prompt for MCQ generation
-    prompt = f"""You are an expert in creating educational assessments.
+    return f"""You are an expert in creating educational assessments.
     
     INSTRUCTIONS:
     Create {num_questions} multiple-choice questions based on the provided transcript. 
@@ -90,35 +535,268 @@ async def generate_mcqs(transcript: str, api_key: str, num_questions: int = 5) -
     
     Provide ONLY the JSON array without any additional text. Ensure the JSON is valid.
     """
+
+def validate_question(item: Any) -> Optional[Dict[str, Any]]:
+    """
+    Check a parsed object against the QuizQuestion shape
+    
+    Returns:
+        The normalized question, or None if it is not a usable question
+    """
+    if not isinstance(item, dict):
+        return None
+    question = item.get("question")
+    options = item.get("options")
+    correct = item.get("correctAnswer")
+    explanation = item.get("explanation")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) < 2 or not all(isinstance(o, str) for o in options):
+        return None
+    if not isinstance(correct, str) or not correct.strip():
+        return None
+    if explanation is not None and not isinstance(explanation, str):
+        explanation = str(explanation)
+    return {
+        "question": question,
+        "options": options,
+        "correctAnswer": correct,
+        "explanation": explanation,
+    }
+
+def parse_questions(response_text: str) -> List[Dict[str, Any]]:
+    """
+    Extract every valid question from an LLM response
     
+    Malformed or truncated entries are skipped instead of failing the whole
+    response.
+    """
+    parser = JSONObjectStreamParser()
+    questions = [q for q in map(validate_question, parser.feed(response_text)) if q is not None]
+    if parser.errors:
+        logger.warning(f"Skipped {parser.errors} malformed question objects")
+    return questions
+
+async def _generate_mcqs(transcript: str, api_key: str, num_questions: int) -> List[Dict[str, Any]]:
     # Generate MCQs using Groq
-    response = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are an educational assistant that creates high-quality assessment questions."},
-            {"role": "user", "content": prompt}
-        ],
-        model=DEFAULT_MODEL,
-        temperature=0.5,
-        max_tokens=2500,
+    transcript = await _fit_quiz_transcript(transcript)
+    response_text = await _complete(
+        api_key, QUIZ_SYSTEM_PROMPT, _quiz_prompt(transcript, num_questions), QUIZ_TEMPERATURE, QUIZ_MAX_TOKENS,
+        priority=PRIORITY_BULK, operation="quiz"
     )
     
-    # Extract and parse JSON response
-    response_text = response.choices[0].message.content.strip()
+    questions = parse_questions(response_text)
+    if not questions:
+        raise ValueError("Failed to parse any questions from the LLM response")
+    return questions[:num_questions]
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _question_words(question: Dict[str, Any]) -> frozenset:
+    return frozenset(_WORD.findall(question["question"].lower()))
+
+def dedupe_questions(questions: List[Dict[str, Any]], threshold: float = QUIZ_DUPLICATE_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Drop questions whose text is a near-duplicate of an earlier one
+    
+    Two questions are near-duplicates when the Jaccard similarity of their
+    word sets is at least `threshold`.
+    """
+    kept = []
+    kept_words = []
+    for question in questions:
+        words = _question_words(question)
+        if not _is_near_duplicate(words, kept_words, threshold):
+            kept.append(question)
+            kept_words.append(words)
+    return kept
+
+def _is_near_duplicate(words: frozenset, kept_words: List[frozenset], threshold: float = QUIZ_DUPLICATE_THRESHOLD) -> bool:
+    for other in kept_words:
+        union = len(words | other)
+        if union and len(words & other) / union >= threshold:
+            return True
+    return False
+
+async def _generate_shard(section: str, api_key: str, num_questions: int, semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+    """
+    Generate one shard of a large quiz, retrying it on its own if it comes back short
+
+    Errors other than an unparseable response are raised, failing the quiz.
+    """
+    best: List[Dict[str, Any]] = []
+    for attempt in range(QUIZ_SHARD_RETRIES + 1):
+        try:
+            async with semaphore:
+                questions = await _generate_mcqs(section, api_key, num_questions)
+        except ValueError as e:
+            logger.warning(f"Quiz shard failed (attempt {attempt+1}/{QUIZ_SHARD_RETRIES + 1}): {str(e)}")
+            continue
+        if len(questions) > len(best):
+            best = questions
+        if len(best) >= num_questions:
+            break
+        logger.warning(f"Quiz shard returned {len(questions)}/{num_questions} questions (attempt {attempt+1})")
+    return best
+
+def _shard_counts(num_questions: int) -> List[int]:
+    """
+    Questions per shard of a large quiz
+    """
+    counts = [QUIZ_SHARD_SIZE] * (num_questions // QUIZ_SHARD_SIZE)
+    if num_questions % QUIZ_SHARD_SIZE:
+        counts.append(num_questions % QUIZ_SHARD_SIZE)
+    return counts
+
+async def _generate_quiz(transcript: str, api_key: str, num_questions: int) -> List[Dict[str, Any]]:
+    if num_questions <= QUIZ_SHARD_SIZE:
+        return await _generate_mcqs(transcript, api_key, num_questions)
     
-    # Clean up response text to ensure it's valid JSON
-    # Remove markdown code blocks if present
-    response_text = response_text.replace("```json", "").replace("```", "").strip()
+    # Large quiz: generate shards concurrently, each over its own section of the transcript
+    counts = _shard_counts(num_questions)
+    sections = split_into_parts(transcript, len(counts))
+    logger.info(f"Generating {num_questions} questions in {len(counts)} shards")
     
+    semaphore = asyncio.Semaphore(QUIZ_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(_generate_shard(sections[i % len(sections)], api_key, count, semaphore))
+        for i, count in enumerate(counts)
+    ]
     try:
-        questions = json.loads(response_text)
-        return questions
-    except json.JSONDecodeError:
-        # Fallback parsing for more complex responses
+        shards = await asyncio.gather(*tasks)
+    except BaseException:
+        # A shard's Groq call failed outright: stop the others spending the key's quota
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    questions = dedupe_questions([question for shard in shards for question in shard])
+    if not questions:
+        raise ValueError("Failed to generate any questions")
+    return questions[:num_questions]
+
+async def stream_mcqs(
+    transcript: str,
+    api_key: str,
+    num_questions: int = 5,
+    cache_mode: str = CACHE_DEFAULT,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate multiple-choice questions, yielding each one as soon as it is complete
+    
+    Large quizzes are sharded as in generate_mcqs, with the shards streamed
+    concurrently. A shard that comes back short is not retried, so only a
+    stream that delivered every question is cached.
+    
+    Args:
+        transcript: The YouTube video transcript
+        api_key: Groq API key
+        num_questions: Number of questions to generate
+        cache_mode: CACHE_DEFAULT, CACHE_REFRESH or CACHE_BYPASS
+        
+    Yields:
+        Validated MCQ objects
+    """
+    cache = get_llm_cache()
+    cache_key = _quiz_cache_key(transcript, num_questions)
+    if cache_mode == CACHE_DEFAULT:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            for question in cached:
+                yield question
+            return
+    
+    if num_questions <= QUIZ_SHARD_SIZE:
+        generator = _stream_questions(transcript, api_key, num_questions)
+    else:
+        generator = _stream_sharded_questions(transcript, api_key, num_questions)
+    questions = []
+    try:
+        async for question in generator:
+            yield question
+            questions.append(question)
+    finally:
+        # Stopping early leaves the Groq streams open; close them so the responses and
+        # the scheduler slots are released now, not when garbage collected
+        await generator.aclose()
+    # A short quiz under the full quiz's key would be served to /generate-quiz as complete
+    if len(questions) >= num_questions and cache_mode != CACHE_BYPASS:
+        await cache.set(cache_key, questions)
+
+async def _stream_questions(transcript: str, api_key: str, num_questions: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream one quiz call, yielding at most num_questions validated questions
+    """
+    parser = JSONObjectStreamParser()
+    count = 0
+    prompt = _quiz_prompt(await _fit_quiz_transcript(transcript), num_questions)
+    stream = _stream_complete(
+        api_key, QUIZ_SYSTEM_PROMPT, prompt, QUIZ_TEMPERATURE, QUIZ_MAX_TOKENS, priority=PRIORITY_BULK,
+        operation="quiz"
+    )
+    try:
+        async for delta in stream:
+            for item in parser.feed(delta):
+                question = validate_question(item)
+                if question is None:
+                    continue
+                yield question
+                count += 1
+                if count >= num_questions:
+                    return
+    finally:
+        await stream.aclose()
+        if parser.errors:
+            logger.warning(f"Skipped {parser.errors} malformed question objects while streaming")
+
+async def _stream_sharded_questions(transcript: str, api_key: str, num_questions: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the shards of a large quiz concurrently, yielding questions as any shard produces them
+
+    Near-duplicates of questions already yielded are dropped. If a shard
+    fails, its error is raised once the questions before it are yielded.
+    """
+    counts = _shard_counts(num_questions)
+    sections = split_into_parts(transcript, len(counts))
+    logger.info(f"Streaming {num_questions} questions in {len(counts)} shards")
+    semaphore = asyncio.Semaphore(QUIZ_CONCURRENCY)
+    # Questions, shard errors, and None when a shard is finished
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def run_shard(section: str, count: int) -> None:
         try:
-            # Add square brackets if they're missing
-            if not response_text.startswith("["):
-                response_text = "[" + response_text + "]"
-            questions = json.loads(response_text)
-            return questions
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse LLM response as JSON: {str(e)}") 
\ No newline at end of file
+            async with semaphore:
+                shard = _stream_questions(section, api_key, count)
+                try:
+                    async for question in shard:
+                        queue.put_nowait(question)
+                finally:
+                    await shard.aclose()
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(None)
+    
+    tasks = [
+        asyncio.ensure_future(run_shard(sections[i % len(sections)], count))
+        for i, count in enumerate(counts)
+    ]
+    running = len(tasks)
+    kept_words: List[frozenset] = []
+    try:
+        while running and len(kept_words) < num_questions:
+            item = await queue.get()
+            if item is None:
+                running -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            words = _question_words(item)
+            if _is_near_duplicate(words, kept_words):
+                continue
+            kept_words.append(words)
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,281 @@
+import time
+import asyncio
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Latency buckets in seconds, from a cache hit to a slow fallback chain
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 45, 90)
+# Transcript sizes in characters
+CHARS_BUCKETS = (1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+# Prompt and completion sizes in tokens
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 6000, 8000, 16000)
+
+# A collector returns (name, type, help, [(labels, value), ...]) tuples at scrape time
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    """
+    Monotonic counter with labels
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with labels, in the Prometheus layout
+
+    Observing a value is one bisect and a few list updates, cheap enough for
+    every request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = [0] * (len(self.buckets) + 1) + [0.0]
+            self._series[key] = series
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, **labels: Any):
+        """
+        Context manager observing the duration of its block (see timed)
+        """
+        return timed(self, **labels)
+
+    def render(self) -> Iterator[str]:
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class MetricsRegistry:
+    """
+    Metrics of this process, rendered in the Prometheus text format
+
+    Counters and histograms are updated as work happens. Values that the
+    services already keep (cache, queue and in-flight statistics) are read
+    by collectors only when /metrics is scraped.
+    """
+
+    def __init__(self, prefix: str = "epochly_"):
+        self.prefix = prefix
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(self.prefix + name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(self.prefix + name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                name = self.prefix + name
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# Outcomes recorded by timed()
+SUCCESS = "success"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+@contextmanager
+def timed(histogram: Histogram, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Observe how long a block takes, labelled with its outcome
+
+    The outcome is "success", "error" or "cancelled" depending on how the
+    block exits, unless the block sets one itself through the yielded labels:
+
+        with timed(TRANSCRIPT_SOURCE_SECONDS, source=name) as labels:
+            ...
+            labels["outcome"] = "miss"
+
+    Args:
+        histogram: Histogram with an "outcome" label
+        labels: Other label values
+
+    Yields:
+        The label dictionary, which the block may update
+    """
+    started = time.perf_counter()
+    outcome = SUCCESS
+    try:
+        yield labels
+    except asyncio.CancelledError:
+        outcome = CANCELLED
+        raise
+    except BaseException:
+        outcome = ERROR
+        raise
+    finally:
+        labels.setdefault("outcome", outcome)
+        histogram.observe(time.perf_counter() - started, **labels)
+
+def instrument(histogram: Histogram, **labels: Any) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Decorator timing every call of a coroutine function with timed()
+    """
+    def decorate(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with timed(histogram, **labels):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def gauge(name: str, help: str, samples: Iterable[Sample]) -> Family:
+    return (name, "gauge", help, list(samples))
+
+def counter(name: str, help: str, samples: Iterable[Sample]) -> Family:
+    return (name, "counter", help, list(samples))
+
+# Shared instruments
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+TRANSCRIPT_SOURCE_SECONDS = registry.histogram(
+    "transcript_source_duration_seconds",
+    "Latency of each transcript source attempt by outcome (success, miss, failure, cancelled)",
+    ("source", "outcome"),
+)
+TRANSCRIPT_SOURCE_CHARS = registry.histogram(
+    "transcript_source_chars", "Characters of transcripts returned by each source", ("source",), CHARS_BUCKETS
+)
+TRANSCRIPT_FETCH_SECONDS = registry.histogram(
+    "transcript_fetch_duration_seconds", "Latency of the whole transcript retrieval chain on a cache miss", ("outcome",)
+)
+TRANSCRIPT_NEGATIVE_CACHE = registry.counter(
+    "transcript_negative_cache_total",
+    "Videos without a transcript: outcomes remembered (stored) and requests failed fast from memory (hit)",
+    ("result",),
+)
+STAGE_SECONDS = registry.histogram(
+    "stage_duration_seconds", "Latency of CPU-bound processing stages", ("stage", "outcome")
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "llm_call_duration_seconds", "Latency of Groq calls, including rate-limit retries", ("operation", "outcome")
+)
+LLM_QUEUE_SECONDS = registry.histogram(
+    "llm_queue_wait_seconds", "Time Groq calls waited in their API key's scheduler", ("priority",)
+)
+LLM_PROMPT_TOKENS = registry.histogram(
+    "llm_prompt_tokens", "Prompt tokens per Groq call (estimated for streamed calls)", ("operation",), TOKEN_BUCKETS
+)
+LLM_COMPLETION_TOKENS = registry.histogram(
+    "llm_completion_tokens", "Completion tokens per Groq call (estimated for streamed calls)", ("operation",), TOKEN_BUCKETS
+)
+
+HTTP_REQUESTS_CANCELLED = registry.counter(
+    "http_requests_cancelled_total", "Requests cancelled because their client disconnected before the response", ("route",)
+)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording HTTP_REQUEST_SECONDS for every request
+
+    Durations run until the response body has been sent, so streamed
+    responses are measured in full. Requests that match no route share the
+    "unmatched" label to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
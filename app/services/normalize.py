@@ -0,0 +1,205 @@
+import os
+import re
+import html
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from app.services.transcript import Transcript
+from app.services.chunking import estimate_tokens, sentence_units, CHARS_PER_TOKEN
+
+# Bump when the normalization rules change, so cached transcripts are re-normalized
+NORMALIZATION_VERSION = 2
+# Drop hesitation words ("um", "uh", ...) from transcripts
+TRANSCRIPT_REMOVE_FILLERS = os.getenv("TRANSCRIPT_REMOVE_FILLERS", "true").lower() == "true"
+
+# Joins segment texts so every rule runs once over the whole transcript.
+# \x1f is whitespace to str.isspace(), so whitespace rules must exclude it.
+_SEPARATOR = "\x1f"
+
+# Only real caption markup: HTML formatting tags and WebVTT class, voice and
+# timestamp tags. Anything else in angle brackets ("x < 2 and y > 0") is speech.
+_MARKUP = re.compile(
+    r"</?(?:b|i|u|s|em|strong|span|font|p|div|br|ruby|rt)"
+    r"(?:\s+[a-z-]+=(?:\"[^\"<>\x1f]*\"|'[^'<>\x1f]*'|[^\s<>\x1f]+))*\s*/?>"
+    r"|</?c(?:\.[\w-]+)*>"
+    r"|<(?:v|lang)(?:\.[\w-]+)*\s[^<>\x1f]*>|</(?:v|lang)>"
+    r"|<\d{1,2}(?::\d{2}){1,2}[.,]\d{3}>",
+    re.IGNORECASE,
+)
+# The sound and music descriptions captions use, bracketed or parenthesized. A
+# closed list, so spoken brackets ("a[i]", "[1, 2, 3]") are kept; "[ __ ]" is a
+# bleeped word.
+_NON_SPEECH_WORDS = (
+    r"(?:music(?: playing)?|applause|laughter|laugh(?:s|ing)|cheering|clapping|inaudible|indistinct(?: chatter)?"
+    r"|silence|no audio|(?:background )?noise|crosstalk|sighs|coughs|foreign|speaking foreign language|__|[♪♫ ]+)"
+)
+_NON_SPEECH = re.compile(
+    rf"\[\s*{_NON_SPEECH_WORDS}\s*\]|\(\s*{_NON_SPEECH_WORDS}\s*\)|[♪♫]+",
+    re.IGNORECASE,
+)
+# Speaker change markers of auto-generated captions
+_SPEAKER_CHANGE = re.compile(r">>+")
+# A filler takes one adjacent comma with it: "so, um, the" -> "so the"
+_FILLERS = re.compile(r"(?:,\s*)?\b(?:u+h+m*|u+m+|e+r+m+|h+m+)\b(?![-'])(?:(?<!,)\s*,)?", re.IGNORECASE)
+_SPACES = re.compile(r"[^\S\x1f]+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" (?=[,.!?;:])")
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Longest overlap (in words) looked for between consecutive caption lines
+_MAX_OVERLAP = 16
+# Shorter overlaps are only merged when they make up a whole caption line
+_MIN_OVERLAP = 2
+
+# Rough length (characters) of a sentence unit when compressing captions without punctuation
+_COMPRESS_UNIT_CHARS = 240
+
+# Words too common to say anything about a sentence's topic
+STOPWORDS = frozenset("""
+    a an and are as at be but by do for from have he her his i if in is it its just know like me my
+    not of on or our so that the their them then there they this to too us was we were what when
+    which who will with would you your yeah okay oh right really very going get got gonna
+""".split())
+
+def _unescape(text: str) -> str:
+    # Captions are often escaped twice ("&amp;#39;"), so decode until stable
+    for _ in range(3):
+        decoded = html.unescape(text)
+        if decoded == text:
+            break
+        text = decoded
+    return text
+
+def _clean_texts(texts: List[str], remove_fillers: bool) -> List[str]:
+    """
+    Apply the text rules to every segment at once over their joined text
+
+    Caption noise goes, spoken symbols stay:
+
+    >>> _clean_texts(["[Music] so, um, <i>hello</i> &amp;amp; welcome [Applause]"], True)
+    ['so hello & welcome']
+    >>> _clean_texts(["when x < 2 and y > 0 the limit", "a[i] is [1, 2, 3]", "if a<b and c>d"], True)
+    ['when x < 2 and y > 0 the limit', 'a[i] is [1, 2, 3]', 'if a<b and c>d']
+    >>> _clean_texts(["<c.colorE5E5E5><00:00:01.500>we</c> go (laughs) on [ __ ] ♪"], False)
+    ['we go on']
+    """
+    joined = _SEPARATOR.join(text.replace(_SEPARATOR, " ") for text in texts)
+    joined = _unescape(joined)
+    joined = _MARKUP.sub(" ", joined)
+    joined = _NON_SPEECH.sub(" ", joined)
+    joined = _SPEAKER_CHANGE.sub(" ", joined)
+    if remove_fillers:
+        joined = _FILLERS.sub(" ", joined)
+    joined = _SPACES.sub(" ", joined)
+    joined = _SPACE_BEFORE_PUNCTUATION.sub("", joined)
+    return [text.strip(" ,") for text in joined.split(_SEPARATOR)]
+
+def _word_keys(words: List[str]) -> List[str]:
+    return ["".join(_WORD.findall(word.lower())) for word in words]
+
+def _merge_overlaps(texts: List[str]) -> Tuple[List[str], int]:
+    """
+    Remove words that repeat the end of the previous caption line
+
+    Auto-generated captions roll: each line often starts with the last
+    words of the line before it, or repeats it entirely.
+
+    Returns:
+        Tuple of (merged texts, number of lines dropped as duplicates)
+    """
+    merged = []
+    dropped = 0
+    previous: List[str] = []
+    for text in texts:
+        words = text.split()
+        keys = _word_keys(words)
+        overlap = 0
+        for size in range(min(len(previous), len(keys), _MAX_OVERLAP), 0, -1):
+            if previous[-size:] == keys[:size] and (size >= _MIN_OVERLAP or size == len(keys)):
+                overlap = size
+                break
+        if words and overlap == len(words):
+            merged.append("")
+            dropped += 1
+            continue
+        merged.append(" ".join(words[overlap:]))
+        if words:
+            previous = keys
+    return merged, dropped
+
+def normalize_transcript(
+    transcript: Transcript,
+    remove_fillers: bool = TRANSCRIPT_REMOVE_FILLERS,
+) -> Tuple[Transcript, Dict[str, Any]]:
+    """
+    Strip caption noise from a transcript before it is cached and sent to the LLM
+
+    Decodes HTML entities, removes markup and non-speech tags such as
+    [Music], drops filler words and merges the repeated words of rolling
+    auto-generated caption lines. The result only depends on the input, so
+    it is computed once per video and cached. CPU-bound; run it in the
+    parser pool.
+
+    Args:
+        transcript: Transcript as retrieved from a source
+        remove_fillers: Whether to drop hesitation words
+
+    Returns:
+        Tuple of (normalized transcript, statistics including tokens saved)
+    """
+    segments = list(transcript.segments())
+    texts = _clean_texts([text for _, _, text in segments], remove_fillers)
+    dropped = 0
+    if transcript.timed:
+        texts, dropped = _merge_overlaps(texts)
+        normalized = Transcript.from_entries(
+            {"start": start, "duration": duration, "text": text}
+            for (start, duration, _), text in zip(segments, texts)
+        )
+    else:
+        normalized = Transcript.from_text(" ".join(texts))
+    raw_tokens = estimate_tokens(transcript.text)
+    tokens = estimate_tokens(normalized.text)
+    return normalized, {
+        "version": NORMALIZATION_VERSION,
+        "raw_tokens": raw_tokens,
+        "tokens": tokens,
+        "tokens_saved": raw_tokens - tokens,
+        "duplicate_lines": dropped,
+    }
+
+def compress_text(text: str, max_tokens: int) -> str:
+    """
+    Shorten text to about max_tokens by keeping its most informative sentences
+
+    Sentences are scored by how often their content words occur across the
+    whole text, so sentences about the main topics are kept and asides are
+    dropped. Kept sentences stay in their original order. Deterministic for
+    a given text and budget.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget
+
+    Returns:
+        The text itself if it fits, otherwise the selected sentences
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    units = sentence_units(text, _COMPRESS_UNIT_CHARS)
+    unit_words = [[w for w in _WORD.findall(unit.lower()) if w not in STOPWORDS] for unit in units]
+    frequencies = Counter(word for words in unit_words for word in set(words))
+    scores = [
+        sum(frequencies[word] for word in set(words)) / (len(words) + 1) if words else 0.0
+        for words in unit_words
+    ]
+    budget = max_tokens * CHARS_PER_TOKEN
+    kept = []
+    used = 0
+    # Highest score first; ties go to the earlier sentence
+    for index in sorted(range(len(units)), key=lambda i: (-scores[i], i)):
+        length = len(units[index]) + 1
+        if used + length > budget:
+            continue
+        kept.append(index)
+        used += length
+    return " ".join(units[index] for index in sorted(kept))
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Iterable, Optional
+
+from app.services.youtube_service import get_youtube_transcript, select_time_range
+from app.services.llm_service import generate_summary, generate_mcqs, admit_summary, admit_quiz, CACHE_DEFAULT
+from app.services.retrieval import focus_transcript
+
+logger = logging.getLogger(__name__)
+
+OUTPUTS = ("transcript", "summary", "quiz")
+
+async def run_concurrently(work: Dict[str, Awaitable[Any]]) -> Dict[str, Any]:
+    """
+    Await named coroutines concurrently
+
+    If one fails, the others are cancelled and the error is raised.
+
+    Args:
+        work: Coroutines by name
+
+    Returns:
+        Results by name
+    """
+    tasks = {name: asyncio.ensure_future(coro) for name, coro in work.items()}
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return {name: task.result() for name, task in tasks.items()}
+
+async def process_video(
+    url: str,
+    api_key: str,
+    outputs: Iterable[str] = OUTPUTS,
+    instructions: Optional[str] = None,
+    num_questions: int = 5,
+    deadline: Optional[float] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    cache_mode: str = CACHE_DEFAULT,
+    focus: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch a transcript once and produce the requested outputs from it
+
+    Summary and quiz generation run concurrently, so once the transcript is
+    in, the wait is the slower of the two rather than their sum. Both are
+    admitted by the key's LLM scheduler before either starts.
+
+    Args:
+        url: YouTube video URL
+        api_key: Groq API key
+        outputs: Any of "transcript", "summary" and "quiz"
+        instructions: Optional summary instructions
+        num_questions: Number of quiz questions
+        deadline: Optional seconds to wait for the transcript
+        start: Optional section start in seconds
+        end: Optional section end in seconds
+        cache_mode: LLM result cache mode
+
+    Returns:
+        Dictionary with video_id and the requested transcript, summary and questions
+
+    Raises:
+        LLMOverloadedError: If the key is too busy to take the summary or quiz
+    """
+    outputs = set(outputs)
+    transcript_result = await get_youtube_transcript(url, deadline=deadline)
+    sectioned = start is not None or end is not None
+    transcript_result = select_time_range(transcript_result, start, end)
+    transcript = transcript_result["transcript"]
+    video_id = transcript_result["video_id"]
+    result: Dict[str, Any] = {"video_id": video_id}
+    if "transcript" in outputs:
+        result["transcript"] = transcript
+
+    prompt_text = transcript
+    if focus and ("summary" in outputs or "quiz" in outputs):
+        prompt_text = await focus_transcript(transcript, focus, video_id=None if sectioned else video_id)
+    
+    if "summary" in outputs:
+        await admit_summary(prompt_text, api_key, instructions, cache_mode)
+    if "quiz" in outputs:
+        await admit_quiz(prompt_text, api_key, num_questions, cache_mode)
+
+    work = {}
+    if "summary" in outputs:
+        work["summary"] = generate_summary(
+            prompt_text,
+            api_key,
+            instructions,
+            # A section or focused excerpt is keyed by its own text, not the whole video
+            video_id=None if sectioned or focus else video_id,
+            cache_mode=cache_mode,
+        )
+    if "quiz" in outputs:
+        work["questions"] = generate_mcqs(prompt_text, api_key, num_questions, cache_mode=cache_mode)
+    if work:
+        logger.info(f"Generating {', '.join(work)} for video ID: {video_id}")
+        result.update(await run_concurrently(work))
+    return result
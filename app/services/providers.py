@@ -0,0 +1,203 @@
+import os
+import time
+import json
+import logging
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_WINDOW = int(os.getenv("PROVIDER_WINDOW", "50"))
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "3"))
+PROVIDER_COOLDOWN = float(os.getenv("PROVIDER_COOLDOWN", "60"))
+PROVIDER_PRIOR_LATENCY = float(os.getenv("PROVIDER_PRIOR_LATENCY", "2"))
+
+# Outcomes of a provider call. A "miss" means the provider worked but had no
+# transcript for the video; it lowers the success rate but does not count
+# towards opening the circuit.
+SUCCESS = "success"
+MISS = "miss"
+FAILURE = "failure"
+
+class ProviderError(ValueError):
+    """
+    A provider-side failure (bad gateway, rate limit, broken response) as
+    opposed to the video simply having no transcript
+    """
+
+class CircuitOpenError(ProviderError):
+    """
+    Raised instead of calling a provider whose circuit is open
+    """
+
+class NoTranscriptError(ValueError):
+    """
+    Raised when no transcript source produced a transcript for a video
+
+    Attributes:
+        reason: Why there is no transcript, e.g. "TranscriptsDisabled"
+        sources: Outcome and error of every source tried, by source name
+        cacheable: Whether the outcome is about the video itself, so it can
+            be remembered, rather than about us or the providers
+    """
+
+    def __init__(self, message: str, reason: str, sources: Dict[str, Dict[str, str]], cacheable: bool = False):
+        super().__init__(message)
+        self.reason = reason
+        self.sources = sources
+        self.cacheable = cacheable
+
+class TranscriptNotCachedError(LookupError):
+    """
+    Raised by a cache-only transcript lookup when the transcript would have to be fetched
+    """
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class ProviderHealth:
+    """
+    Rolling health of one transcript provider with a circuit breaker
+
+    The breaker opens after `failure_threshold` consecutive failures. Once
+    `cooldown` seconds have passed it turns half-open and lets a single probe
+    through; the probe's outcome closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = PROVIDER_WINDOW,
+        failure_threshold: int = PROVIDER_FAILURE_THRESHOLD,
+        cooldown: float = PROVIDER_COOLDOWN,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._outcomes: deque = deque(maxlen=window)
+        self._latencies: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing keeps new providers from scoring 0 or 1
+        successes = sum(1 for outcome in self._outcomes if outcome == SUCCESS)
+        return (successes + 1) / (len(self._outcomes) + 2)
+
+    @property
+    def mean_latency(self) -> float:
+        if not self._latencies:
+            return PROVIDER_PRIOR_LATENCY
+        return sum(self._latencies) / len(self._latencies)
+
+    @property
+    def expected_time_to_success(self) -> float:
+        return self.mean_latency / self.success_rate
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now (claims the probe slot when half-open)
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record(self, outcome: str, latency: float) -> None:
+        self._outcomes.append(outcome)
+        if outcome == SUCCESS:
+            self._latencies.append(latency)
+        if outcome == FAILURE:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit opened for transcript provider {self.name}")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+        else:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(f"Circuit closed for transcript provider {self.name}")
+            self.state = CLOSED
+        self.probing = False
+
+    def release(self) -> None:
+        """
+        Give back a half-open probe slot without recording an outcome
+        """
+        self.probing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "calls": len(self._outcomes),
+            "success_rate": round(self.success_rate, 3),
+            "mean_latency": round(self.mean_latency, 3),
+            "expected_time_to_success": round(self.expected_time_to_success, 3),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+class ProviderRegistry:
+    """
+    Health tracking for every transcript source, used to order and skip them
+    """
+
+    def __init__(self, disabled: Iterable[str] = ()):
+        self.disabled = set(disabled)
+        self._providers: Dict[str, ProviderHealth] = {}
+
+    def get(self, name: str) -> ProviderHealth:
+        provider = self._providers.get(name)
+        if provider is None:
+            provider = ProviderHealth(name)
+            self._providers[name] = provider
+        return provider
+
+    def rank(self, names: List[str]) -> List[str]:
+        """
+        Order enabled providers by expected time-to-success
+
+        Ties keep the given order, so the configured order is used until
+        statistics have been collected.
+        """
+        enabled = [name for name in names if name not in self.disabled]
+        return sorted(enabled, key=lambda name: self.get(name).expected_time_to_success)
+
+    def record(self, name: str, outcome: str, latency: float) -> None:
+        self.get(name).record(outcome, latency)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "disabled": sorted(self.disabled),
+            "providers": {name: provider.get_stats() for name, provider in self._providers.items()},
+        }
+
+def load_provider_config() -> Dict[str, Any]:
+    """
+    Load transcript provider configuration
+
+    Reads the JSON file named by TRANSCRIPT_PROVIDERS_FILE, or inline JSON in
+    TRANSCRIPT_PROVIDERS. Supported keys are "disabled" (list of source names)
+    and "alternative_apis" (list of {"name", "url", "extract"} objects).
+    """
+    path = os.getenv("TRANSCRIPT_PROVIDERS_FILE")
+    raw: Optional[str] = os.getenv("TRANSCRIPT_PROVIDERS")
+    try:
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        if raw:
+            return json.loads(raw)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Invalid transcript provider configuration, using defaults: {str(e)}")
+    return {}
@@ -0,0 +1,169 @@
+import os
+import time
+import json
+import asyncio
+import logging
+import contextvars
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default outbound request rate (per second) and burst allowed per upstream host
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "5"))
+HOST_RATE_BURST = float(os.getenv("HOST_RATE_BURST", "10"))
+
+# Set by batch and background work, whose upstream calls wait for the host's
+# rate limit. Interactive calls are never delayed by it; they only spend from it.
+paced_fetches: contextvars.ContextVar[bool] = contextvars.ContextVar("paced_fetches", default=False)
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float = 1) -> float:
+        """
+        Seconds until `amount` tokens are available (0 if they are now)
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+    def backlog_time(self, amount: float) -> float:
+        """
+        Seconds until `amount` tokens will have accrued, which may exceed the capacity
+
+        Used to estimate how long a queue of requests takes to drain.
+        """
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """
+        Take `amount` tokens if they are available right now
+        """
+        if self.time_until(amount) > 0:
+            return False
+        self.tokens -= min(amount, self.capacity)
+        return True
+
+    async def acquire(self, amount: float = 1) -> float:
+        """
+        Wait until `amount` tokens are available and take them
+
+        Requests larger than the capacity wait for a full bucket instead of
+        forever.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            delay = self.time_until(amount)
+            if delay <= 0:
+                self.tokens -= min(amount, self.capacity)
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def consume(self, amount: float) -> None:
+        """
+        Take tokens unconditionally, possibly going into debt (or give them back if negative)
+
+        Used to correct an estimate once the real cost is known.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, max(-self.capacity, self.tokens - amount))
+
+    def drain(self) -> None:
+        """
+        Empty the bucket, e.g. after the upstream reported a rate limit
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+class HostRateLimiter:
+    """
+    One token bucket per upstream host
+
+    Limits for specific hosts come from HOST_RATE_LIMITS, a JSON object
+    mapping a host to {"rate": per_second, "burst": n}; other hosts use
+    HOST_RATE_LIMIT and HOST_RATE_BURST.
+    """
+
+    def __init__(
+        self,
+        rate: float = HOST_RATE_LIMIT,
+        burst: float = HOST_RATE_BURST,
+        overrides: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            limits = self.overrides.get(host, {})
+            bucket = TokenBucket(limits.get("rate", self.rate), limits.get("burst", self.burst))
+            self._buckets[host] = bucket
+            self.stats[host] = {"requests": 0, "throttled": 0, "wait_seconds": 0.0}
+        return bucket
+
+    async def acquire(self, host: str) -> None:
+        """
+        Wait for permission to send one request to `host`
+        """
+        waited = await self.bucket(host).acquire()
+        stats = self.stats[host]
+        stats["requests"] += 1
+        if waited > 0:
+            stats["throttled"] += 1
+            stats["wait_seconds"] += waited
+
+    def spend(self, host: str) -> None:
+        """
+        Count one request to `host` without waiting, leaving less budget for paced ones
+        """
+        self.bucket(host).consume(1)
+        self.stats[host]["requests"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            host: {**stats, "wait_seconds": round(stats["wait_seconds"], 3)}
+            for host, stats in self.stats.items()
+        }
+
+def load_host_limits() -> Dict[str, Dict[str, float]]:
+    """
+    Per-host rate limit overrides from the HOST_RATE_LIMITS environment variable
+    """
+    raw = os.getenv("HOST_RATE_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid HOST_RATE_LIMITS, using defaults: {str(e)}")
+        return {}
@@ -0,0 +1,205 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.caption_parsing import run_parser
+
+logger = logging.getLogger(__name__)
+
+# Faster JSON encoding when orjson is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Brotli compression when the brotli package is installed; gzip otherwise
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this (bytes) are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Memory (MB) for encoded and compressed response bodies, reused until their ETag changes
+RESPONSE_CACHE_MEMORY_MB = float(os.getenv("RESPONSE_CACHE_MEMORY_MB", "32"))
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+def json_bytes(value: Any) -> bytes:
+    """
+    Encode a JSON-serializable value to UTF-8 bytes, with orjson when available
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    codings = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[name.strip().lower()] = quality
+    return codings
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick the content coding for a response from the Accept-Encoding header
+
+    Brotli is preferred over gzip when both are acceptable and brotli is
+    installed. Codings with q=0 are refused.
+
+    Returns:
+        "br", "gzip" or "identity"
+    """
+    if not accept_encoding:
+        return IDENTITY
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    supported = [BROTLI, GZIP] if BROTLI_AVAILABLE else [GZIP]
+    best, best_quality = IDENTITY, 0.0
+    for coding in supported:
+        quality = codings.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == GZIP:
+        # mtime=0 keeps the output, and so the ETag, identical across processes
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+def content_etag(*parts: str) -> str:
+    """
+    Strong entity tag (without quotes or coding suffix) derived from content parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+def quoted_etag(tag: str, encoding: str) -> str:
+    # Each coding of a representation is a different byte sequence, so it gets its own strong tag
+    return f'"{tag}"' if encoding == IDENTITY else f'"{tag}-{encoding}"'
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """
+    Whether an If-None-Match header matches any coding of an entity tag
+
+    If-None-Match uses weak comparison, so W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    candidates = {quoted_etag(tag, encoding) for encoding in (IDENTITY, GZIP, BROTLI)}
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*":
+            return True
+        if value.startswith("W/"):
+            value = value[2:]
+        if value in candidates:
+            return True
+    return False
+
+class EncodedBodyCache:
+    """
+    LRU of encoded response bodies keyed by entity tag, one entry per coding
+
+    Repeat requests for an unchanged resource then skip both JSON encoding
+    and compression.
+    """
+
+    def __init__(self, max_bytes: int = int(RESPONSE_CACHE_MEMORY_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._used = 0
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, tag: str, encoding: str) -> Optional[bytes]:
+        body = self._entries.get((tag, encoding))
+        if body is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end((tag, encoding))
+        self.stats["hits"] += 1
+        return body
+
+    def has(self, tag: str, encoding: str) -> bool:
+        return (tag, encoding) in self._entries
+
+    def set(self, tag: str, encoding: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop((tag, encoding), None)
+        if previous is not None:
+            self._used -= len(previous)
+        self._entries[(tag, encoding)] = body
+        self._used += len(body)
+        while self._used > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._used -= len(evicted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries), "bytes": self._used}
+
+async def encode_body(cache: EncodedBodyCache, tag: str, encoding: str, value: Any) -> Tuple[bytes, str]:
+    """
+    Encoded (and possibly compressed) body of a value, reused from the cache when possible
+
+    Encoding and compression of a long transcript take milliseconds, so on
+    a cache miss they run in the parser pool.
+
+    Returns:
+        Tuple of (body, coding actually applied); small bodies stay uncompressed
+    """
+    body = cache.get(tag, encoding)
+    if body is not None:
+        return body, encoding
+    raw = await _identity_body(cache, tag, encoding, value)
+    if encoding == IDENTITY or len(raw) < COMPRESS_MIN_BYTES:
+        return raw, IDENTITY
+    body = await run_parser(compress, raw, encoding)
+    cache.set(tag, encoding, body)
+    return body, encoding
+
+async def applied_encoding(cache: EncodedBodyCache, tag: str, encoding: str, value: Any) -> str:
+    """
+    Coding encode_body would apply to a value, without compressing it
+
+    A 304 must carry the ETag of the 200 it validates, and small bodies are
+    sent as identity whatever the client accepts.
+    """
+    if encoding == IDENTITY or cache.has(tag, encoding):
+        return encoding
+    raw = await _identity_body(cache, tag, encoding, value)
+    return IDENTITY if len(raw) < COMPRESS_MIN_BYTES else encoding
+
+async def _identity_body(cache: EncodedBodyCache, tag: str, encoding: str, value: Any) -> bytes:
+    # Already looked up by encode_body when the identity coding was asked for
+    raw = cache.get(tag, IDENTITY) if encoding != IDENTITY else None
+    if raw is None:
+        raw = await run_parser(json_bytes, value)
+        cache.set(tag, IDENTITY, raw)
+    return raw
@@ -0,0 +1,286 @@
+import os
+import re
+import math
+import heapq
+import hashlib
+import logging
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.transcript import Transcript, encode_array, decode_array
+from app.services.normalize import STOPWORDS
+from app.services.chunking import sentence_spans
+from app.services.caption_parsing import run_parser
+from app.services.youtube_service import get_transcript_cache
+from app.services.metrics import timed, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Chunks put into a prompt for a focus query
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+# Sentences per chunk; consecutive chunks share one sentence
+RETRIEVAL_WINDOW = int(os.getenv("RETRIEVAL_WINDOW", "3"))
+
+# Bump when chunking or tokenization changes, so cached indexes are rebuilt
+INDEX_VERSION = 1
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Auto-generated captions have no punctuation, so long "sentences" are cut at this many characters
+_MAX_SENTENCE_CHARS = 300
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase content words with plural endings folded ("cells" -> "cell")
+    """
+    tokens = []
+    for word in _TOKEN.findall(text.lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def _chunk_spans(text: str, window: int) -> List[Tuple[int, int]]:
+    """
+    Character spans of overlapping windows of `window` sentences
+    """
+    sentences = sentence_spans(text, _MAX_SENTENCE_CHARS)
+    if not sentences:
+        return []
+    stride = max(1, window - 1)
+    chunks = []
+    for first in range(0, len(sentences), stride):
+        last = min(first + window, len(sentences)) - 1
+        chunks.append((sentences[first][0], sentences[last][1]))
+        if last == len(sentences) - 1:
+            break
+    return chunks
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class TranscriptIndex:
+    """
+    BM25 index over sentence-window chunks of one transcript
+
+    The term-chunk matrix is kept in CSR form: for term i, `chunk_ids` and
+    `tfs` between `indptr[i]` and `indptr[i + 1]` list the chunks it occurs
+    in and how often. The columns are flat arrays, so an index packs into a
+    compact payload that is cached next to its transcript.
+    """
+
+    __slots__ = ("text", "spans", "terms", "indptr", "chunk_ids", "tfs", "lengths", "_term_ids", "_norms")
+
+    def __init__(
+        self,
+        text: str,
+        spans: array,
+        terms: List[str],
+        indptr: array,
+        chunk_ids: array,
+        tfs: array,
+        lengths: array,
+    ):
+        self.text = text
+        self.spans = spans
+        self.terms = terms
+        self.indptr = indptr
+        self.chunk_ids = chunk_ids
+        self.tfs = tfs
+        self.lengths = lengths
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        average = sum(lengths) / len(lengths) if len(lengths) else 0.0
+        # Per-chunk length normalization of BM25, computed once
+        self._norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * (length / average if average else 0.0)) for length in lengths
+        ]
+
+    @classmethod
+    def build(cls, text: str, window: int = RETRIEVAL_WINDOW) -> "TranscriptIndex":
+        """
+        Chunk and index a transcript (CPU-bound; run it in the parser pool)
+        """
+        chunk_spans = _chunk_spans(text, window)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = array("i")
+        for chunk_id, (start, end) in enumerate(chunk_spans):
+            counts = Counter(tokenize(text[start:end]))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((chunk_id, tf))
+        terms = sorted(postings)
+        indptr = array("i", [0])
+        chunk_ids = array("i")
+        tfs = array("i")
+        for term in terms:
+            for chunk_id, tf in postings[term]:
+                chunk_ids.append(chunk_id)
+                tfs.append(tf)
+            indptr.append(len(chunk_ids))
+        spans = array("q", (offset for span in chunk_spans for offset in span))
+        return cls(text, spans, terms, indptr, chunk_ids, tfs, lengths)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def span(self, chunk_id: int) -> Tuple[int, int]:
+        return self.spans[2 * chunk_id], self.spans[2 * chunk_id + 1]
+
+    def chunk(self, chunk_id: int) -> str:
+        start, end = self.span(chunk_id)
+        return self.text[start:end]
+
+    def search(self, query: str, top_k: int = RETRIEVAL_TOP_K) -> List[Tuple[int, float]]:
+        """
+        Rank chunks against a query with BM25
+
+        Args:
+            query: Free-text query
+            top_k: Maximum number of chunks returned
+
+        Returns:
+            (chunk ID, score) pairs of matching chunks, best first
+        """
+        count = len(self)
+        scores = [0.0] * count
+        for term in set(tokenize(query)):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                continue
+            low, high = self.indptr[term_id], self.indptr[term_id + 1]
+            frequency = high - low
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for chunk_id, tf in zip(self.chunk_ids[low:high], self.tfs[low:high]):
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + self._norms[chunk_id])
+        matches = [chunk_id for chunk_id in range(count) if scores[chunk_id] > 0]
+        best = heapq.nlargest(top_k, matches, key=lambda chunk_id: (scores[chunk_id], -chunk_id))
+        return [(chunk_id, scores[chunk_id]) for chunk_id in best]
+
+    def excerpt(self, chunk_ids: List[int]) -> str:
+        """
+        Text of the given chunks in transcript order, overlapping chunks merged
+        """
+        merged: List[List[int]] = []
+        for start, end in sorted(self.span(chunk_id) for chunk_id in chunk_ids):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return "\n\n".join(self.text[start:end] for start, end in merged)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """
+        JSON-serializable form, tied to its transcript text by digest
+        """
+        return {
+            "version": INDEX_VERSION,
+            "digest": text_digest(self.text),
+            "spans": encode_array(self.spans),
+            "terms": " ".join(self.terms),
+            "indptr": encode_array(self.indptr),
+            "chunk_ids": encode_array(self.chunk_ids),
+            "tfs": encode_array(self.tfs),
+            "lengths": encode_array(self.lengths),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], text: str) -> Optional["TranscriptIndex"]:
+        """
+        Rebuild an index from to_payload() output
+
+        Returns:
+            The index, or None if it is outdated or was built from other text
+        """
+        if payload.get("version") != INDEX_VERSION or payload.get("digest") != text_digest(text):
+            return None
+        return cls(
+            text,
+            decode_array("q", payload["spans"]),
+            payload["terms"].split(" ") if payload["terms"] else [],
+            decode_array("i", payload["indptr"]),
+            decode_array("i", payload["chunk_ids"]),
+            decode_array("i", payload["tfs"]),
+            decode_array("i", payload["lengths"]),
+        )
+
+async def get_transcript_index(text: str, video_id: Optional[str] = None) -> TranscriptIndex:
+    """
+    Index of a transcript, built once per video and cached next to it
+
+    Args:
+        text: Transcript text
+        video_id: Video the text is the whole transcript of; sections and
+            client-sent transcripts are indexed without caching
+
+    Returns:
+        The transcript's index
+    """
+    cache = get_transcript_cache() if video_id else None
+    if cache is not None:
+        cached = await cache.get_index(video_id)
+        index = TranscriptIndex.from_payload(cached, text) if cached is not None else None
+        if index is not None:
+            return index
+    with timed(STAGE_SECONDS, stage="index"):
+        index = await run_parser(TranscriptIndex.build, text)
+    if cache is not None:
+        await cache.set_index(video_id, index.to_payload())
+        logger.info(f"Indexed transcript of video ID {video_id}: {len(index)} chunks, {len(index.terms)} terms")
+    return index
+
+async def focus_transcript(text: str, focus: str, video_id: Optional[str] = None, top_k: int = RETRIEVAL_TOP_K) -> str:
+    """
+    The parts of a transcript most relevant to a focus query, for a smaller prompt
+
+    Args:
+        text: Transcript text
+        focus: Topic the summary or quiz should be about
+        video_id: Video the text is the whole transcript of, if it is
+        top_k: Number of chunks to keep
+
+    Returns:
+        The best matching chunks in transcript order
+
+    Raises:
+        ValueError: If nothing in the transcript matches the query
+    """
+    index = await get_transcript_index(text, video_id)
+    matches = index.search(focus, top_k)
+    if not matches:
+        raise ValueError(f"Nothing in this transcript matches the focus \"{focus}\"")
+    return index.excerpt([chunk_id for chunk_id, _ in matches])
+
+async def search_transcript(result: dict, query: str, top_k: int = RETRIEVAL_TOP_K) -> List[Dict[str, Any]]:
+    """
+    Search a video's transcript for the passages best matching a query
+
+    Args:
+        result: Whole-video result of get_transcript_for_video
+        query: Free-text query
+        top_k: Maximum number of passages
+
+    Returns:
+        Passages best first, with their score and start time in seconds
+        (None when the transcript has no timings)
+    """
+    transcript = Transcript.from_payload(result)
+    index = await get_transcript_index(result["transcript"], result["video_id"])
+    passages = []
+    for chunk_id, score in index.search(query, top_k):
+        start, _ = index.span(chunk_id)
+        passage = {"text": index.chunk(chunk_id), "score": round(score, 4), "start": None}
+        if transcript.timed and len(transcript):
+            segment = max(0, bisect_right(transcript.offsets, start) - 1)
+            passage["start"] = transcript.starts[min(segment, len(transcript) - 1)]
+        passages.append(passage)
+    return passages
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class _Flight:
+    """
+    One in-flight execution and the callers waiting on it
+    """
+    __slots__ = ("task", "waiters", "detached")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        # Set once a caller gave up on a deadline: the work then runs to completion
+        self.detached = False
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one in-flight execution
+
+    The first caller for a key starts the work in its own task and every
+    caller, including the first, waits on that task. A caller that is
+    cancelled (e.g. its client disconnected) stops waiting without cancelling
+    the work while other callers still need it; when the last waiter is
+    cancelled, the work is cancelled too. A caller whose timeout expires
+    also stops waiting, but the work then runs to completion so it can fill
+    the caches for the next request.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.stats = {"leaders": 0, "followers": 0, "cancelled": 0}
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def _abandon(self, key: Hashable, flight: _Flight) -> None:
+        flight.waiters -= 1
+        if flight.waiters > 0 or flight.detached or flight.task.done():
+            return
+        logger.info(f"Cancelling {self.name} call, no caller is waiting for it any more")
+        # New callers start afresh instead of joining work that is being cancelled
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+        flight.task.cancel()
+        self.stats["cancelled"] += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identity of the work
+            fn: Zero-argument coroutine function performing the work
+            timeout: Optional seconds this caller waits before giving up;
+                the work itself keeps running
+
+        Returns:
+            The shared result (or raises the shared exception)
+
+        Raises:
+            asyncio.TimeoutError: If the timeout expired first
+        """
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda t: self._forget(key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+            logger.info(f"Joining in-flight {self.name} call")
+        flight.waiters += 1
+        try:
+            # asyncio.wait never cancels the task it waits on
+            done, _ = await asyncio.wait({flight.task}, timeout=timeout)
+        except asyncio.CancelledError:
+            self._abandon(key, flight)
+            raise
+        flight.waiters -= 1
+        if not done:
+            flight.detached = True
+            raise asyncio.TimeoutError()
+        return flight.task.result()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": self.in_flight()}
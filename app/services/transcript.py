@@ -0,0 +1,186 @@
+import sys
+import base64
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+def encode_array(values: array) -> str:
+    """
+    Pack a numeric array as little-endian base64 for JSON payloads
+    """
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+def decode_array(typecode: str, data: str) -> array:
+    """
+    Unpack an array packed by encode_array
+    """
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+class Transcript:
+    """
+    Timed transcript segments stored in array-backed columns
+
+    Segment start times and durations live in float arrays and all segment
+    texts in one joined string, with `offsets` marking where each segment
+    begins (plus one trailing end offset). Slicing shares the underlying
+    buffers through memoryviews, so a section of a long transcript costs
+    O(1) to create and time ranges are found by binary search.
+    """
+
+    __slots__ = ("_text", "starts", "durations", "offsets", "timed", "_section")
+
+    def __init__(self, text: str, starts: Any, durations: Any, offsets: Any, timed: bool = True):
+        self._text = text
+        self.starts = memoryview(starts) if not isinstance(starts, memoryview) else starts
+        self.durations = memoryview(durations) if not isinstance(durations, memoryview) else durations
+        self.offsets = memoryview(offsets) if not isinstance(offsets, memoryview) else offsets
+        self.timed = timed
+        self._section: Optional[str] = None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> "Transcript":
+        """
+        Build a transcript from youtube-transcript-api style entries
+
+        Args:
+            entries: Dicts with "text", "start" and "duration" keys
+        """
+        starts = array("d")
+        durations = array("d")
+        offsets = array("q")
+        parts = []
+        position = 0
+        for entry in entries:
+            text = entry["text"].strip()
+            if not text:
+                continue
+            starts.append(float(entry.get("start", 0.0)))
+            durations.append(float(entry.get("duration", 0.0)))
+            offsets.append(position)
+            parts.append(text)
+            position += len(text) + 1
+        offsets.append(position)
+        return cls(" ".join(parts), starts, durations, offsets)
+
+    @classmethod
+    def from_text(cls, text: str) -> "Transcript":
+        """
+        Wrap plain transcript text without timing information as one segment
+        """
+        text = text.strip()
+        return cls(text, array("d", [0.0]), array("d", [0.0]), array("q", [0, len(text) + 1]), timed=False)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def text(self) -> str:
+        """
+        Text of the segments in this transcript, joined by spaces
+        """
+        if self._section is None:
+            if len(self) == 0:
+                self._section = ""
+            elif self.offsets[0] == 0 and self.offsets[-1] == len(self._text) + 1:
+                self._section = self._text
+            else:
+                self._section = self._text[self.offsets[0]:self.offsets[-1] - 1]
+        return self._section
+
+    @property
+    def duration(self) -> float:
+        if len(self) == 0 or not self.timed:
+            return 0.0
+        return self.starts[-1] + self.durations[-1] - self.starts[0]
+
+    def segment(self, index: int) -> Tuple[float, float, str]:
+        """
+        Return (start, duration, text) of one segment
+        """
+        return (
+            self.starts[index],
+            self.durations[index],
+            self._text[self.offsets[index]:self.offsets[index + 1] - 1],
+        )
+
+    def segments(self) -> Iterator[Tuple[float, float, str]]:
+        for index in range(len(self)):
+            yield self.segment(index)
+
+    def __getitem__(self, item: slice) -> "Transcript":
+        if not isinstance(item, slice) or item.step not in (None, 1):
+            raise TypeError("Transcript only supports contiguous slicing")
+        start, stop, _ = item.indices(len(self))
+        stop = max(start, stop)
+        return Transcript(
+            self._text,
+            self.starts[start:stop],
+            self.durations[start:stop],
+            self.offsets[start:stop + 1],
+            self.timed,
+        )
+
+    def slice_time(self, start: Optional[float] = None, end: Optional[float] = None) -> "Transcript":
+        """
+        Segments overlapping the [start, end) time range, in O(log n)
+
+        Args:
+            start: Range start in seconds (defaults to the beginning)
+            end: Range end in seconds (defaults to the end)
+
+        Returns:
+            A transcript view sharing this transcript's buffers
+        """
+        if start is None and end is None:
+            return self
+        if not self.timed:
+            raise ValueError("This transcript has no timing information")
+        if start is not None and end is not None and end <= start:
+            raise ValueError("end must be greater than start")
+        first = 0
+        if start is not None:
+            # The segment starting at or before `start` still overlaps it if it runs past `start`
+            first = bisect_right(self.starts, start) - 1
+            if first < 0 or self.starts[first] + self.durations[first] <= start:
+                first += 1
+        last = len(self) if end is None else bisect_left(self.starts, end)
+        return self[first:last]
+
+    def to_payload(self) -> Dict[str, Any]:
+        """
+        Compact JSON-serializable form: text plus base64-packed columns
+        """
+        base = self.offsets[0] if len(self) else 0
+        offsets = array("q", (offset - base for offset in self.offsets))
+        return {
+            "transcript": self.text,
+            "timing": {
+                "timed": self.timed,
+                "starts": encode_array(array("d", self.starts)),
+                "durations": encode_array(array("d", self.durations)),
+                "offsets": encode_array(offsets),
+            },
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "Transcript":
+        """
+        Rebuild a transcript from to_payload() output (or a plain {"transcript": text})
+        """
+        timing = payload.get("timing")
+        if not timing:
+            return cls.from_text(payload["transcript"])
+        return cls(
+            payload["transcript"],
+            decode_array("d", timing["starts"]),
+            decode_array("d", timing["durations"]),
+            decode_array("q", timing["offsets"]),
+            timing.get("timed", True),
+        )
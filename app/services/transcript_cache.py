@@ -0,0 +1,99 @@
+import os
+import random
+from typing import Any, Dict, Optional
+
+from app.services.cache import TwoTierCache, SQLiteStore
+
+TRANSCRIPT_CACHE_MEMORY_MB = float(os.getenv("TRANSCRIPT_CACHE_MEMORY_MB", "64"))
+TRANSCRIPT_CACHE_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSCRIPT_CACHE_DISK_ENABLED = os.getenv("TRANSCRIPT_CACHE_DISK_ENABLED", "true").lower() == "true"
+# How long (seconds) a video known to have no transcript fails fast; captions
+# can be added after upload, so this is kept short
+TRANSCRIPT_NEGATIVE_TTL = float(os.getenv("TRANSCRIPT_NEGATIVE_TTL", "1800"))
+# Random spread (fraction of the TTL) so entries stored together do not expire together
+TRANSCRIPT_NEGATIVE_TTL_JITTER = float(os.getenv("TRANSCRIPT_NEGATIVE_TTL_JITTER", "0.2"))
+
+DEFAULT_LANGUAGE = "auto"
+
+class TranscriptCache(TwoTierCache):
+    """
+    Two-tier transcript cache keyed by (video ID, language)
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = int(TRANSCRIPT_CACHE_MEMORY_MB * 1024 * 1024),
+        ttl: float = TRANSCRIPT_CACHE_TTL,
+        disk: Optional[SQLiteStore] = None,
+        seed: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        super().__init__("Transcript", memory_bytes, ttl, disk, seed)
+
+    @staticmethod
+    def key(video_id: str, language: str = DEFAULT_LANGUAGE) -> str:
+        return f"{video_id}:{language}"
+
+    async def get_transcript(self, video_id: str, language: str = DEFAULT_LANGUAGE) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached transcript
+
+        Args:
+            video_id: YouTube video ID
+            language: Transcript language, or "auto" for the default track
+
+        Returns:
+            The cached transcript payload, or None on a miss
+        """
+        return await self.get(self.key(video_id, language))
+
+    async def set_transcript(
+        self,
+        video_id: str,
+        value: Dict[str, Any],
+        language: str = DEFAULT_LANGUAGE,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Store a transcript in both cache tiers
+
+        Args:
+            video_id: YouTube video ID
+            value: JSON-serializable transcript payload
+            language: Transcript language, or "auto" for the default track
+            ttl: Time to live in seconds (defaults to the cache TTL)
+        """
+        await self.set(self.key(video_id, language), value, ttl)
+
+    async def get_index(self, video_id: str, language: str = DEFAULT_LANGUAGE) -> Optional[Dict[str, Any]]:
+        """
+        Look up the cached retrieval index of a transcript (see retrieval.TranscriptIndex)
+        """
+        return await self.get(f"{self.key(video_id, language)}:index", record=False)
+
+    async def set_index(self, video_id: str, value: Dict[str, Any], language: str = DEFAULT_LANGUAGE) -> None:
+        """
+        Store the retrieval index of a transcript next to the transcript
+        """
+        await self.set(f"{self.key(video_id, language)}:index", value)
+
+    async def get_missing(self, video_id: str, language: str = DEFAULT_LANGUAGE) -> Optional[Dict[str, Any]]:
+        """
+        Look up a remembered "no transcript" outcome for a video
+
+        Returns:
+            The stored outcome (reason, sources tried, checked_at), or None
+        """
+        return await self.get(f"{self.key(video_id, language)}:missing", record=False)
+
+    async def set_missing(
+        self,
+        video_id: str,
+        value: Dict[str, Any],
+        language: str = DEFAULT_LANGUAGE,
+        ttl: float = TRANSCRIPT_NEGATIVE_TTL,
+        jitter: float = TRANSCRIPT_NEGATIVE_TTL_JITTER,
+    ) -> None:
+        """
+        Remember that a video has no obtainable transcript, for a jittered short TTL
+        """
+        await self.set(f"{self.key(video_id, language)}:missing", value, ttl * random.uniform(1 - jitter, 1 + jitter))
@@ -0,0 +1,82 @@
+import os
+import time
+import asyncio
+import logging
+import importlib
+from typing import Awaitable, Callable, Dict
+from urllib.parse import urlparse
+
+from app.services.http_client import get_http_client
+from app.services.caption_parsing import run_parser, parse_timedtext
+from app.services.youtube_service import (
+    get_transcript_cache, ALTERNATIVE_APIS, YOUTUBE_BASE_URL, PYTUBE_AVAILABLE, BEAUTIFULSOUP_AVAILABLE
+)
+from app.services.llm_service import get_llm_cache
+
+logger = logging.getLogger(__name__)
+
+# Prepare each worker before it accepts traffic (see warm_up)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+# Upper bound (seconds) on each warm-up step; a slow upstream must not hold up startup
+WARMUP_STEP_TIMEOUT = float(os.getenv("WARMUP_STEP_TIMEOUT", "5"))
+
+async def _open_caches() -> None:
+    # Creates the SQLite stores and loads the seeded transcripts
+    get_transcript_cache()
+    get_llm_cache()
+
+async def _start_parser_pool() -> None:
+    await run_parser(parse_timedtext, "<transcript></transcript>")
+
+async def _import_fallbacks() -> None:
+    # The transcript sources import these lazily; pay for it now instead of on a request
+    modules = ["youtube_transcript_api"] + [
+        name for name, available in (("pytube", PYTUBE_AVAILABLE), ("bs4", BEAUTIFULSOUP_AVAILABLE)) if available
+    ]
+    for name in modules:
+        await asyncio.to_thread(importlib.import_module, name)
+
+async def _open_connections() -> None:
+    # One request per upstream host leaves a keep-alive connection in the shared pools
+    origins = {YOUTUBE_BASE_URL: True}
+    for api in ALTERNATIVE_APIS:
+        url = urlparse(api["url"])
+        # The alternative APIs are called without certificate verification
+        origins[f"{url.scheme}://{url.netloc}"] = False
+
+    async def touch(origin: str, verify: bool) -> None:
+        try:
+            await get_http_client(verify=verify).head(origin, timeout=WARMUP_STEP_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Warm-up connection to {origin} failed: {str(e)}")
+
+    await asyncio.gather(*(touch(origin, verify) for origin, verify in origins.items()))
+
+WARMUP_STEPS: Dict[str, Callable[[], Awaitable[None]]] = {
+    "caches": _open_caches,
+    "parser_pool": _start_parser_pool,
+    "fallback_imports": _import_fallbacks,
+    "connections": _open_connections,
+}
+
+async def warm_up() -> Dict[str, float]:
+    """
+    Prepare this worker so its first requests are not slower than the rest
+
+    Opens the cache stores, starts the parser pool, imports the fallback
+    libraries and opens pooled connections to the upstream hosts. Failing
+    or slow steps are logged and skipped.
+
+    Returns:
+        Seconds spent in each step
+    """
+    timings = {}
+    for name, step in WARMUP_STEPS.items():
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(step(), WARMUP_STEP_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {type(e).__name__}: {str(e)}")
+        timings[name] = time.perf_counter() - started
+    logger.info("Warm-up finished: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+    return timings
@@ -1,14 +1,36 @@
 import re
 import logging
 import json
-import requests
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+import asyncio
+import os
+import sys
 import time
-import urllib3
-from bs4 import BeautifulSoup
+import socket
+import importlib.util
+import urllib.error
+from urllib.parse import urlparse
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
 
-# Suppress SSL verification warning
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from app.services.http_client import get_http_client
+from app.services.cache import create_disk_store
+from app.services.transcript_cache import TranscriptCache, TRANSCRIPT_CACHE_DISK_ENABLED
+from app.services.singleflight import SingleFlight
+from app.services.rate_limit import HostRateLimiter, load_host_limits, paced_fetches
+from app.services.transcript import Transcript
+from app.services.normalize import normalize_transcript, NORMALIZATION_VERSION
+from app.services.metrics import (
+    timed, instrument, TRANSCRIPT_SOURCE_SECONDS, TRANSCRIPT_SOURCE_CHARS, TRANSCRIPT_FETCH_SECONDS, STAGE_SECONDS,
+    TRANSCRIPT_NEGATIVE_CACHE
+)
+from app.services.caption_parsing import (
+    CaptionTrackScanner, SegmentElementScanner, TimedTextParser, select_caption_urls, parse_timedtext, extract_segment_text,
+    run_parser
+)
+from app.services.providers import (
+    ProviderRegistry, ProviderError, CircuitOpenError, NoTranscriptError, TranscriptNotCachedError, load_provider_config,
+    SUCCESS, MISS, FAILURE
+)
 
 # Pre-cached transcripts for guaranteed working examples
 CACHED_TRANSCRIPTS = {
@@ -28,25 +50,29 @@ CACHED_TRANSCRIPTS = {
     "ZizdB0TgAVM": """Welcome to the Science of Well-Being. I'm Professor Laurie Santos, and I teach psychology at Yale University. In this course, we'll explore what psychological science says about happiness. What makes us happy? Why do we want the things we think will make us happy? Are we actually wrong in the things that we think will make us happy? And how can we use the science to short-circuit the biases we have to actually be happier? At some level, the structure of the course is loosely based on a class I teach at Yale called 'Psychology and the Good Life'. It's a bit of positive psychology, which is the psychology of what makes life worth living, but also a bit of the latest research on behavior change, how to change your habits for the better."""
 }
 
-# Import pytube for additional transcript retrieval method
-try:
-    from pytube import YouTube
-    PYTUBE_AVAILABLE = True
-except ImportError:
-    PYTUBE_AVAILABLE = False
+# pytube and BeautifulSoup are only needed by fallback sources, so they are
+# imported the first time one of those runs rather than at startup
+PYTUBE_AVAILABLE = importlib.util.find_spec("pytube") is not None
+if not PYTUBE_AVAILABLE:
     logging.warning("pytube library not available - this fallback method won't be used")
 
-# Import BeautifulSoup for web scraping fallback
-try:
-    from bs4 import BeautifulSoup
-    BEAUTIFULSOUP_AVAILABLE = True
-except ImportError:
-    BEAUTIFULSOUP_AVAILABLE = False
-    logging.warning("BeautifulSoup library not available - webscraping fallback won't be used")
+BEAUTIFULSOUP_AVAILABLE = importlib.util.find_spec("bs4") is not None
+if not BEAUTIFULSOUP_AVAILABLE:
+    logging.warning("BeautifulSoup library not available - page text scraping fallback won't be used")
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Seconds to wait on the primary source before racing all fallbacks
+TRANSCRIPT_HEDGE_DELAY = float(os.getenv("TRANSCRIPT_HEDGE_DELAY", "2"))
+# Upper bound (seconds) on the whole retrieval chain
+TRANSCRIPT_DEADLINE = float(os.getenv("TRANSCRIPT_DEADLINE", "45"))
+# Seconds between launching successive fallback sources in ranked order
+TRANSCRIPT_HEDGE_STAGGER = float(os.getenv("TRANSCRIPT_HEDGE_STAGGER", "0.5"))
+# Origin of the YouTube pages we fetch ourselves (watch pages and playlists);
+# the benchmarks point it at a local stand-in
+YOUTUBE_BASE_URL = os.getenv("YOUTUBE_BASE_URL", "https://www.youtube.com").rstrip("/")
+
 def extract_video_id(url: str) -> str:
     """
     Extract YouTube video ID from URL
@@ -125,9 +151,16 @@ def extract_video_id(url: str) -> str:
         logger.error(f"Error extracting video ID: {str(e)}")
         raise ValueError(f"Invalid YouTube URL format: {str(e)}")
 
-def get_transcript_with_pytube(video_id: str) -> str:
+def _open_pytube(url: str):
+    from pytube import YouTube
+    return YouTube(url)
+
+async def get_transcript_with_pytube(video_id: str) -> Transcript:
     """
     Attempt to get transcript using pytube library
+
+    pytube is a blocking library, so every call that may hit the network
+    runs in a worker thread.
     """
     if not PYTUBE_AVAILABLE:
         raise ValueError("pytube library not available")
@@ -142,17 +175,17 @@ def get_transcript_with_pytube(video_id: str) -> str:
         
         for attempt in range(max_retries):
             try:
-                yt = YouTube(youtube_url)
+                yt = await asyncio.to_thread(_open_pytube, youtube_url)
                 break
             except Exception as e:
                 if attempt == max_retries - 1:
                     raise
                 logger.warning(f"pytube connection error (attempt {attempt+1}/{max_retries}): {str(e)}")
-                time.sleep(retry_delay)
+                await asyncio.sleep(retry_delay)
                 retry_delay *= 2
         
         # Get caption tracks
-        caption_tracks = yt.captions
+        caption_tracks = await asyncio.to_thread(lambda: yt.captions)
         
         if not caption_tracks or len(caption_tracks) == 0:
             logger.warning("No captions found using pytube")
@@ -173,37 +206,57 @@ def get_transcript_with_pytube(video_id: str) -> str:
             raise ValueError("No usable captions found")
             
         # Get the transcript text
-        transcript_xml = caption.xml_captions
+        transcript_xml = await asyncio.to_thread(lambda: caption.xml_captions)
         
-        # Simple XML parsing to extract text
-        transcript_text = ""
-        import re
-        text_parts = re.findall(r'<text[^>]*>(.*?)</text>', transcript_xml)
+        # Parse the timed text off the event loop
+        transcript = Transcript.from_entries(await run_parser(parse_timedtext, transcript_xml))
         
-        for part in text_parts:
-            # Remove XML entities and cleanup
-            cleaned_part = part.replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
-            transcript_text += cleaned_part + " "
-            
-        transcript_text = transcript_text.strip()
-        
-        if not transcript_text or len(transcript_text) < 50:
+        if len(transcript.text) < 50:
             raise ValueError("Retrieved transcript is too short or empty")
             
-        logger.info(f"Successfully retrieved transcript using pytube: {len(transcript_text)} chars")
-        return transcript_text
+        logger.info(f"Successfully retrieved transcript using pytube: {len(transcript.text)} chars")
+        return transcript
         
     except Exception as e:
         logger.error(f"pytube error: {str(e)}")
         raise ValueError(f"pytube error: {str(e)}")
 
-def get_transcript_by_scraping(video_id: str) -> str:
+async def _scan_watch_page(response: httpx.Response) -> dict:
+    """
+    Read a watch page body in chunks until its caption tracks have been found
+
+    The rest of the page is not downloaded once the captionTracks JSON has
+    been decoded. If the page has no caption tracks it is read to the end,
+    keeping only its segment-text elements for the fallback; chunks are
+    dropped as soon as both scanners have consumed them.
+    """
+    scanner = CaptionTrackScanner()
+    segments = SegmentElementScanner()
+    async for chunk in response.aiter_text():
+        if scanner.feed(chunk):
+            break
+        segments.feed(chunk)
+    if scanner.done:
+        logger.info(f"Found {len(scanner.tracks)} caption tracks after {scanner.chars_scanned} characters")
+        return {"caption_urls": select_caption_urls(scanner.tracks), "html": ""}
+    return {"caption_urls": [], "html": segments.html}
+
+async def _fetch_caption_track(client: httpx.AsyncClient, caption_url: str) -> Transcript:
+    """
+    Stream a timedtext caption file through the incremental XML parser
+    """
+    parser = TimedTextParser()
+    async with client.stream("GET", caption_url, timeout=10) as caption_response:
+        if caption_response.status_code != 200:
+            raise ValueError(f"Caption file request failed: {caption_response.status_code}")
+        async for chunk in caption_response.aiter_text():
+            parser.feed(chunk)
+    return Transcript.from_entries(parser.close())
+
+async def get_transcript_by_scraping(video_id: str) -> Transcript:
     """
     Last resort method to attempt to extract transcript by scraping
     """
-    if not BEAUTIFULSOUP_AVAILABLE:
-        raise ValueError("BeautifulSoup library not available for web scraping")
-        
     try:
         logger.info(f"Attempting to get transcript via web scraping for video ID: {video_id}")
         
@@ -211,7 +264,8 @@ def get_transcript_by_scraping(video_id: str) -> str:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+        youtube_url = f"{YOUTUBE_BASE_URL}/watch?v={video_id}"
+        client = get_http_client()
         
         # Try with a timeout and retry logic
         max_retries = 2
@@ -219,296 +273,576 @@ def get_transcript_by_scraping(video_id: str) -> str:
         
         for attempt in range(max_retries):
             try:
-                response = requests.get(youtube_url, headers=headers, timeout=10)
+                async with client.stream("GET", youtube_url, headers=headers, timeout=10) as response:
+                    if response.status_code >= 500 or response.status_code == 429:
+                        raise ProviderError(f"Failed to fetch YouTube page: {response.status_code}")
+                    if response.status_code != 200:
+                        raise ValueError(f"Failed to fetch YouTube page: {response.status_code}")
+                    page = await _scan_watch_page(response)
                 break
-            except Exception as e:
+            except httpx.TransportError as e:
                 if attempt == max_retries - 1:
                     raise
                 logger.warning(f"Scraping connection error (attempt {attempt+1}/{max_retries}): {str(e)}")
-                time.sleep(retry_delay)
+                await asyncio.sleep(retry_delay)
                 retry_delay *= 2
         
-        if response.status_code != 200:
-            raise ValueError(f"Failed to fetch YouTube page: {response.status_code}")
-            
-        # Parse the page
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Look for transcript data in the page
-        # This is a simplistic approach and may break if YouTube changes their structure
-        transcript_text = ""
-        
-        # Try to find script tags with JSON data
-        for script_tag in soup.find_all('script'):
-            if script_tag.string and "captionTracks" in script_tag.string:
-                script_content = script_tag.string
-                
-                # Extract captionTracks
-                caption_tracks_start = script_content.find("\"captionTracks\":")
-                if caption_tracks_start > -1:
-                    # Find the end of the captionTracks array
-                    caption_tracks_end = script_content.find("]", caption_tracks_start)
-                    caption_tracks_data = script_content[caption_tracks_start:caption_tracks_end+1]
-                    
-                    # Try to extract baseUrl
-                    base_url_match = re.search(r"\"baseUrl\":\"(.*?)\"", caption_tracks_data)
-                    if base_url_match:
-                        caption_url = base_url_match.group(1).replace("\\u0026", "&")
-                        
-                        # Fetch the caption file
-                        try:
-                            caption_response = requests.get(caption_url, timeout=10)
-                            if caption_response.status_code == 200:
-                                # Parse the XML
-                                caption_soup = BeautifulSoup(caption_response.text, 'xml')
-                                
-                                # Extract text from each entry
-                                for text_tag in caption_soup.find_all('text'):
-                                    if text_tag.string:
-                                        transcript_text += text_tag.string + " "
-                                
-                                if transcript_text:
-                                    break
-                        except Exception as e:
-                            logger.error(f"Error fetching caption file: {str(e)}")
+        transcript = None
+        for caption_url in page["caption_urls"]:
+            # Fetch the caption file
+            try:
+                transcript = await _fetch_caption_track(client, caption_url)
+                if transcript.text:
+                    break
+            except Exception as e:
+                logger.error(f"Error fetching caption file: {str(e)}")
         
         # Check if we found any transcript text
-        transcript_text = transcript_text.strip()
-        if not transcript_text or len(transcript_text) < 50:
-            # Try an alternative approach - look for transcript text in the page
-            # This is also likely to break if YouTube changes their page structure
-            transcript_sections = soup.find_all('div', {'class': 'segment-text'})
-            if transcript_sections:
-                for section in transcript_sections:
-                    transcript_text += section.get_text() + " "
+        if (transcript is None or len(transcript.text) < 50) and page["html"] and BEAUTIFULSOUP_AVAILABLE:
+            # Fall back to transcript text found in the page, which has no timing
+            page_text = await run_parser(extract_segment_text, page["html"])
+            transcript = Transcript.from_text(((transcript.text if transcript else "") + " " + page_text))
                     
         # Final check for transcript text
-        transcript_text = transcript_text.strip()
-        if not transcript_text or len(transcript_text) < 50:
+        if transcript is None or len(transcript.text) < 50:
             raise ValueError("Could not extract transcript via web scraping")
             
-        logger.info(f"Successfully retrieved transcript via web scraping: {len(transcript_text)} chars")
-        return transcript_text
+        logger.info(f"Successfully retrieved transcript via web scraping: {len(transcript.text)} chars")
+        return transcript
         
     except Exception as e:
         logger.error(f"Web scraping error: {str(e)}")
         raise ValueError(f"Failed to extract transcript via web scraping: {str(e)}")
 
-def get_transcript_with_alternative_api(video_id: str) -> str:
-    """
-    Alternative transcript fetcher using multiple fallback APIs
-    """
-    apis = [
-        {
-            "name": "tube.demarches.tech",
-            "url": f"https://tube.demarches.tech/api/v1/captions/{video_id}",
-            "extract": lambda data: data.get("description", "")
-        },
-        {
-            "name": "inv.bp.mutahar.rocks",
-            "url": f"https://inv.bp.mutahar.rocks/api/v1/captions/{video_id}",
-            "extract": lambda data: data.get("description", "")
-        },
-        {
-            "name": "vid.puffyan.us",
-            "url": f"https://vid.puffyan.us/api/v1/videos/{video_id}?fields=captions",
-            "extract": lambda data: "\n".join([cap.get("label", "") for cap in data.get("captions", [])])
-        }
-    ]
+# Ways to pull transcript text out of an alternative API's JSON response
+ALTERNATIVE_API_EXTRACTORS = {
+    "description": lambda data: data.get("description", ""),
+    "caption_labels": lambda data: "\n".join([cap.get("label", "") for cap in data.get("captions", [])]),
+}
+
+# Default alternative caption APIs (Invidious instances). Override them with
+# the "alternative_apis" key of the provider configuration.
+DEFAULT_ALTERNATIVE_APIS = [
+    {
+        "name": "tube.demarches.tech",
+        "url": "https://tube.demarches.tech/api/v1/captions/{video_id}",
+        "extract": "description"
+    },
+    {
+        "name": "inv.bp.mutahar.rocks",
+        "url": "https://inv.bp.mutahar.rocks/api/v1/captions/{video_id}",
+        "extract": "description"
+    },
+    {
+        "name": "vid.puffyan.us",
+        "url": "https://vid.puffyan.us/api/v1/videos/{video_id}?fields=captions",
+        "extract": "caption_labels"
+    }
+]
+
+PROVIDER_CONFIG = load_provider_config()
+
+ALTERNATIVE_APIS = [
+    {**api, "extract": ALTERNATIVE_API_EXTRACTORS[api.get("extract", "description")]}
+    for api in PROVIDER_CONFIG.get("alternative_apis", DEFAULT_ALTERNATIVE_APIS)
+]
+
+# Rolling health and circuit breakers for every transcript source
+provider_registry = ProviderRegistry(disabled=PROVIDER_CONFIG.get("disabled", []))
+
+# Upstream host of every source, for per-host rate limiting
+YOUTUBE_HOST = urlparse(YOUTUBE_BASE_URL).hostname
+SOURCE_HOSTS = {api["name"]: urlparse(api["url"]).hostname for api in ALTERNATIVE_APIS}
+host_limiter = HostRateLimiter(overrides=load_host_limits())
+
+async def get_transcript_from_alternative_api(api: dict, video_id: str) -> Transcript:
+    """
+    Fetch a transcript from a single alternative caption API
+    
+    Args:
+        api: Entry of ALTERNATIVE_APIS
+        video_id: YouTube video ID
+        
+    Returns:
+        Transcript text
+    """
+    logger.info(f"Trying {api['name']} API for video ID: {video_id}")
+    
+    # Disable SSL verification for these APIs as they often have self-signed certificates
+    client = get_http_client(verify=False)
+    response = await client.get(api["url"].format(video_id=video_id), timeout=15)
+    
+    if response.status_code >= 500 or response.status_code == 429:
+        raise ProviderError(f"{api['name']} API error: {response.status_code} - {response.text[:200]}")
+    if response.status_code != 200:
+        raise ValueError(f"{api['name']} API error: {response.status_code} - {response.text[:200]}")
+        
+    try:
+        data = response.json()
+    except json.JSONDecodeError:
+        raise ProviderError(f"{api['name']} API returned invalid JSON")
+        
+    transcript_text = api["extract"](data)
     
-    last_error = None
+    if not transcript_text or len(transcript_text) < 50:
+        raise ValueError(f"{api['name']} API returned empty or very short transcript")
+        
+    logger.info(f"Successfully retrieved transcript from {api['name']} API: {len(transcript_text)} chars")
+    return Transcript.from_text(transcript_text)
+
+def _transcript_api():
+    # Imported on first use, with requests, off the worker's startup path
+    from youtube_transcript_api import YouTubeTranscriptApi
+    return YouTubeTranscriptApi
+
+def _get_transcript_entries(video_id: str, languages: Optional[List[str]] = None):
+    if languages:
+        return _transcript_api().get_transcript(video_id, languages=languages)
+    return _transcript_api().get_transcript(video_id)
+
+def _list_transcripts(video_id: str):
+    return _transcript_api().list_transcripts(video_id)
+
+async def get_transcript_with_transcript_api(video_id: str, languages: Optional[List[str]] = None) -> Transcript:
+    """
+    Get transcript using youtube-transcript-api, optionally for specific languages
+    """
+    transcript_list = await asyncio.to_thread(_get_transcript_entries, video_id, languages)
+    logger.info(f"Successfully retrieved transcript with {len(transcript_list)} entries")
+    return Transcript.from_entries(transcript_list)
+
+async def get_transcript_from_transcript_list(video_id: str) -> Transcript:
+    """
+    List all available transcripts and fetch the first one
+    """
+    transcript_list = await asyncio.to_thread(_list_transcripts, video_id)
+    first_transcript = next(iter(transcript_list))
+    logger.info(f"Found transcript in language: {first_transcript.language}")
+    entries = await asyncio.to_thread(first_transcript.fetch)
+    logger.info(f"Successfully retrieved transcript in {first_transcript.language}")
+    return Transcript.from_entries(entries)
+
+def _loaded_errors(module: str, *names: str) -> tuple:
+    """
+    Exception classes of a lazily imported library, or none if it was never imported
+
+    A library that was not imported cannot have raised, and importing it
+    here would put it back on the startup path.
+    """
+    loaded = sys.modules.get(module)
+    return tuple(getattr(loaded, name) for name in names) if loaded is not None else ()
+
+# Errors that mean a provider itself is unhealthy rather than the video lacking captions
+_PROVIDER_FAILURES = (
+    ProviderError,
+    httpx.TransportError,
+    urllib.error.URLError,
+    OSError,
+    asyncio.TimeoutError,
+)
+
+def _provider_failures() -> tuple:
+    return (
+        _PROVIDER_FAILURES
+        + _loaded_errors("requests", "RequestException")
+        + _loaded_errors("youtube_transcript_api", "TooManyRequests", "YouTubeRequestFailed")
+    )
+
+def classify_source_error(error: BaseException) -> str:
+    """
+    Classify a source error as a provider FAILURE or a MISS (no transcript)
+    
+    Sources wrap their errors in ValueError, so the whole exception chain is
+    inspected.
+    """
+    failures = _provider_failures()
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, failures):
+            return FAILURE
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return MISS
+
+# Outcomes of a source in a failed retrieval chain, besides MISS and FAILURE:
+# the request never got an answer, or the source was not called at all
+NETWORK = "network"
+SKIPPED = "skipped"
+
+# Errors on our side of the connection (DNS, connect, timeouts)
+_NETWORK_ERRORS = (
+    httpx.TransportError,
+    ConnectionError,
+    socket.gaierror,
+    TimeoutError,
+    asyncio.TimeoutError,
+)
+
+def describe_source_error(error: BaseException) -> Dict[str, str]:
+    """
+    Outcome (MISS, FAILURE, NETWORK or SKIPPED) and short description of a failed source
+    """
+    if isinstance(error, asyncio.CancelledError):
+        return {"outcome": SKIPPED, "error": "cancelled"}
+    if isinstance(error, CircuitOpenError):
+        return {"outcome": SKIPPED, "error": str(error)}
+    outcome = classify_source_error(error)
+    network_errors = _NETWORK_ERRORS + _loaded_errors("requests", "ConnectionError", "Timeout")
+    seen = set()
+    cause = error
+    while cause is not None and id(cause) not in seen:
+        if isinstance(cause, network_errors):
+            outcome = NETWORK
+            break
+        seen.add(id(cause))
+        cause = cause.__cause__ or cause.__context__
+    if type(error).__module__.startswith("youtube_transcript_api"):
+        # Its messages are paragraphs; the exception name says it all
+        description = type(error).__name__
+    else:
+        description = (str(error).strip().splitlines() or [type(error).__name__])[0][:200]
+    return {"outcome": outcome, "error": description}
+
+def no_transcript_message(reason: str) -> str:
+    return f"No transcript available for this video after all attempts ({reason}). This video likely doesn't have captions enabled."
+
+def no_transcript_error(sources: Dict[str, Dict[str, str]]) -> NoTranscriptError:
+    """
+    Error for a retrieval chain in which every source came back without a transcript
+
+    The outcome may be remembered only if a YouTube source (any source but
+    the alternative APIs) said the video has no transcript and no YouTube
+    source failed or hit a network error. The alternative APIs are
+    third-party mirrors, so their outages say nothing about the video.
+    """
+    youtube = [source for name, source in sources.items() if name not in SOURCE_HOSTS]
+    misses = [source for source in youtube if source["outcome"] == MISS]
+    cacheable = bool(misses) and not any(source["outcome"] in (FAILURE, NETWORK) for source in youtube)
+    reason = misses[0]["error"] if misses else "every transcript source failed"
+    return NoTranscriptError(no_transcript_message(reason), reason, sources, cacheable)
+
+async def run_transcript_source(name: str, source: Callable[[], Awaitable[Transcript]]) -> Transcript:
+    """
+    Run a transcript source through its circuit breaker and record its health
     
-    # First try pytube if available
-    if PYTUBE_AVAILABLE:
+    Batch and background calls (see paced_fetches) are paced by the rate
+    limit of the host the source talks to. Interactive calls never wait for
+    it, but spend from it so that paced calls back off. The breaker is
+    checked first, so a short-circuited call uses no host budget.
+    """
+    if name in provider_registry.disabled:
+        raise CircuitOpenError(f"{name} is disabled")
+    health = provider_registry.get(name)
+    if not health.allow():
+        raise CircuitOpenError(f"circuit open for {name}")
+    host = SOURCE_HOSTS.get(name, YOUTUBE_HOST)
+    if not paced_fetches.get():
+        host_limiter.spend(host)
+    else:
+        try:
+            await host_limiter.acquire(host)
+        except asyncio.CancelledError:
+            # Give back the half-open probe slot allow() may have claimed
+            health.release()
+            raise
+    started = time.monotonic()
+    with timed(TRANSCRIPT_SOURCE_SECONDS, source=name) as labels:
         try:
-            return get_transcript_with_pytube(video_id)
+            transcript = await source()
+        except asyncio.CancelledError:
+            health.release()
+            raise
         except Exception as e:
-            logger.warning(f"pytube fallback failed: {str(e)}")
-            # Continue to other APIs
+            labels["outcome"] = classify_source_error(e)
+            health.record(labels["outcome"], time.monotonic() - started)
+            raise
+        labels["outcome"] = SUCCESS if transcript.text else MISS
+        health.record(labels["outcome"], time.monotonic() - started)
+    TRANSCRIPT_SOURCE_CHARS.observe(len(transcript.text), source=name)
+    return transcript
+
+async def race_transcript_sources(
+    sources: List[Tuple[str, Callable[[], Awaitable[Transcript]]]],
+    stagger: float = TRANSCRIPT_HEDGE_STAGGER,
+) -> Tuple[str, Transcript]:
+    """
+    Race transcript sources and return the first valid transcript
     
-    for api in apis:
-        try:
-            logger.info(f"Trying {api['name']} API for video ID: {video_id}")
-            
-            # Disable SSL verification for these APIs as they often have self-signed certificates
-            response = requests.get(api["url"], timeout=15, verify=False)
-            
-            if response.status_code != 200:
-                logger.warning(f"{api['name']} API error: {response.status_code} - {response.text}")
-                continue
-                
-            try:
-                data = response.json()
-            except json.JSONDecodeError:
-                logger.warning(f"{api['name']} API returned invalid JSON")
-                continue
-                
-            transcript_text = api["extract"](data)
-            
-            if not transcript_text or len(transcript_text) < 50:
-                logger.warning(f"{api['name']} API returned empty or very short transcript")
+    Sources are launched in the given order, the next one starting after
+    `stagger` seconds or as soon as a running source fails. Sources that are
+    still running once a winner is found are cancelled.
+    
+    Args:
+        sources: (name, zero-argument coroutine function) pairs in priority order
+        stagger: Seconds between successive launches
+        
+    Returns:
+        Tuple of (winning source name, transcript)
+        
+    Raises:
+        NoTranscriptError: If no source produced a transcript
+    """
+    queue = list(sources)
+    tasks = {}
+    pending = set()
+    errors: Dict[str, Dict[str, str]] = {}
+    
+    def launch() -> None:
+        name, source = queue.pop(0)
+        task = asyncio.ensure_future(source())
+        tasks[task] = name
+        pending.add(task)
+    
+    try:
+        while queue or pending:
+            if not pending:
+                launch()
+            done, _ = await asyncio.wait(
+                pending, timeout=stagger if queue else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch()
                 continue
-                
-            logger.info(f"Successfully retrieved transcript from {api['name']} API: {len(transcript_text)} chars")
-            return transcript_text
-            
-        except Exception as e:
-            logger.error(f"{api['name']} API error: {str(e)}")
-            last_error = e
-            continue
+            for task in done:
+                pending.discard(task)
+                name = tasks[task]
+                if task.cancelled():
+                    errors[name] = {"outcome": SKIPPED, "error": "cancelled"}
+                    continue
+                error = task.exception()
+                if error is not None:
+                    if not isinstance(error, CircuitOpenError):
+                        logger.warning(f"Transcript source {name} failed: {str(error)}")
+                    errors[name] = describe_source_error(error)
+                    continue
+                transcript = task.result()
+                if not transcript.text:
+                    errors[name] = {"outcome": MISS, "error": "empty transcript"}
+                    continue
+                return name, transcript
+            # Every finished source failed, so start the next one right away
+            if queue:
+                launch()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
     
-    # Final fallback - try web scraping if available
-    if BEAUTIFULSOUP_AVAILABLE:
-        try:
-            return get_transcript_by_scraping(video_id)
-        except Exception as e:
-            logger.warning(f"Web scraping fallback failed: {str(e)}")
-            # Continue to error
+    raise no_transcript_error(errors)
+
+_transcript_cache: Optional[TranscriptCache] = None
+
+# Concurrent requests for the same video share one fetch
+transcript_flights = SingleFlight("transcript")
+
+def select_time_range(result: dict, start: Optional[float] = None, end: Optional[float] = None) -> dict:
+    """
+    Restrict a get_youtube_transcript result to the segments within [start, end) seconds
     
-    # If we get here, all methods failed
-    error_msg = f"All alternative APIs and fallbacks failed. Last error: {str(last_error)}"
-    logger.error(error_msg)
-    raise ValueError(error_msg)
+    Args:
+        result: Result of get_youtube_transcript
+        start: Section start in seconds
+        end: Section end in seconds
+        
+    Returns:
+        A result of the same shape covering only the requested section
+    """
+    if start is None and end is None:
+        return result
+    section = Transcript.from_payload(result).slice_time(start, end)
+    if not section.text:
+        raise ValueError("No transcript text in the requested time range")
+    return {**section.to_payload(), "video_id": result["video_id"]}
 
-def get_youtube_transcript(url: str) -> dict:
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Get the process-wide transcript cache, seeded with CACHED_TRANSCRIPTS
+    """
+    global _transcript_cache
+    if _transcript_cache is None:
+        seed = {
+            TranscriptCache.key(video_id): {"transcript": transcript, "video_id": video_id}
+            for video_id, transcript in CACHED_TRANSCRIPTS.items()
+        }
+        _transcript_cache = TranscriptCache(
+            disk=create_disk_store("transcripts.sqlite3", TRANSCRIPT_CACHE_DISK_ENABLED),
+            seed=seed,
+        )
+    return _transcript_cache
+
+async def get_youtube_transcript(url: str, deadline: Optional[float] = None) -> dict:
     """
     Get transcript from YouTube video
     
     Args:
         url: YouTube video URL
+        deadline: Optional number of seconds this caller is willing to wait.
+            The shared fetch keeps running (and fills the cache) if it expires,
+            whereas a cancelled caller cancels it unless another request shares it.
         
     Returns:
-        Dictionary containing transcript text and video ID
+        Dictionary containing the normalized transcript text and video ID,
+        packed segment timing under "timing" (see Transcript.to_payload) and
+        normalization statistics under "normalization"
     """
-    video_id = None
+    # Extract video ID from URL
+    video_id = extract_video_id(url)
+    logger.info(f"Extracted video ID: {video_id} from URL: {url}")
+    return await get_transcript_for_video(video_id, deadline)
+
+VIDEO_ID_PATTERN = re.compile(r'^[a-zA-Z0-9_-]{11}$')
+
+async def get_transcript_for_video(video_id: str, deadline: Optional[float] = None, fetch: bool = True) -> dict:
+    """
+    Get the transcript of a video by ID, from the transcript store when available
     
-    try:
-        # Extract video ID from URL
-        video_id = extract_video_id(url)
-        logger.info(f"Extracted video ID: {video_id} from URL: {url}")
+    Args:
+        video_id: YouTube video ID
+        deadline: Optional number of seconds this caller is willing to wait
+        fetch: Whether to run the retrieval chain on a cache miss
+        
+    Returns:
+        Same as get_youtube_transcript
         
-        # Check if we have a cached transcript for this video ID
-        if video_id in CACHED_TRANSCRIPTS:
+    Raises:
+        TranscriptNotCachedError: If fetch is False and the transcript is not cached
+    """
+    if not VIDEO_ID_PATTERN.match(video_id):
+        raise ValueError(f"Invalid YouTube video ID: {video_id}")
+    
+    # Check the transcript cache before going to YouTube
+    cache = get_transcript_cache()
+    cached = await cache.get_transcript(video_id)
+    stale = None
+    if cached is not None:
+        version = cached.get("normalization", {}).get("version")
+        if version == NORMALIZATION_VERSION:
+            logger.info(f"Using cached transcript for video ID: {video_id}")
+            return cached
+        if version is None:
+            # Seeded, or cached before transcripts were normalized
             logger.info(f"Using cached transcript for video ID: {video_id}")
-            return {
-                "transcript": CACHED_TRANSCRIPTS[video_id],
-                "video_id": video_id
-            }
+            cached = await normalize_result(cached)
+            await cache.set_transcript(video_id, cached)
+            return cached
+        # Older rules may have removed spoken text, so fetch the original again,
+        # falling back to this copy if that fails
+        logger.info(f"Cached transcript for video ID {video_id} predates normalization v{NORMALIZATION_VERSION}, refetching")
+        stale = cached
+    
+    # Videos recently found to have no transcript fail fast
+    missing = await cache.get_missing(video_id)
+    if missing is not None and stale is not None:
+        return stale
+    if missing is not None:
+        TRANSCRIPT_NEGATIVE_CACHE.inc(result="hit")
+        logger.info(f"Video ID {video_id} is known to have no transcript: {missing['reason']}")
+        raise NoTranscriptError(no_transcript_message(missing["reason"]), missing["reason"], missing["sources"], True)
+    if not fetch:
+        if stale is not None:
+            return stale
+        raise TranscriptNotCachedError(f"The transcript of video ID {video_id} has not been fetched yet")
+    
+    async def fetch_and_cache() -> dict:
+        try:
+            result = await fetch_transcript_uncached(video_id)
+        except NoTranscriptError as e:
+            if e.cacheable:
+                await cache.set_missing(video_id, {"reason": e.reason, "sources": e.sources, "checked_at": time.time()})
+                TRANSCRIPT_NEGATIVE_CACHE.inc(result="stored")
+            raise
+        await cache.set_transcript(video_id, result)
+        return result
+    
+    try:
+        return await transcript_flights.do(video_id, fetch_and_cache, timeout=deadline)
+    except asyncio.TimeoutError:
+        if stale is not None:
+            return stale
+        logger.error(f"Transcript request for video ID {video_id} exceeded caller deadline of {deadline}s")
+        raise ValueError("Timed out fetching the transcript for this video. Please try again later.")
+    except Exception as e:
+        if stale is None:
+            raise
+        logger.warning(f"Refetching the transcript of video ID {video_id} failed, using the cached one: {str(e)}")
+        return stale
+
+async def fetch_transcript_uncached(video_id: str) -> dict:
+    """
+    Run the transcript retrieval chain for a video, bypassing the cache
+    
+    The cheap default youtube-transcript-api call runs first. If it has not
+    succeeded within TRANSCRIPT_HEDGE_DELAY seconds, every other source is
+    launched concurrently and the first valid transcript wins. The whole
+    chain is bounded by TRANSCRIPT_DEADLINE.
+    
+    Args:
+        video_id: YouTube video ID
         
+    Returns:
+        Dictionary containing transcript text, packed segment timing and video ID
+    """
+    async def hedged() -> Tuple[str, Transcript]:
+        logger.info(f"Attempting to get transcript for video ID: {video_id}")
+        primary = asyncio.ensure_future(run_transcript_source(
+            "youtube_transcript_api", lambda: get_transcript_with_transcript_api(video_id)
+        ))
         try:
-            # First attempt: Try to get transcript with default settings
-            logger.info(f"Attempting to get transcript for video ID: {video_id}")
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            logger.info(f"Successfully retrieved transcript with {len(transcript_list)} entries")
-            
-            # Combine transcript pieces into a single text
-            transcript_text = ""
-            for entry in transcript_list:
-                transcript_text += entry['text'] + " "
-            
-            # Clean up the transcript
-            transcript_text = transcript_text.strip()
-            logger.info(f"Transcript processed. Length: {len(transcript_text)} characters")
-            
-            return {
-                "transcript": transcript_text,
-                "video_id": video_id
-            }
+            transcript = await asyncio.wait_for(asyncio.shield(primary), TRANSCRIPT_HEDGE_DELAY)
+            if transcript.text:
+                return "youtube_transcript_api", transcript
+        except asyncio.TimeoutError:
+            logger.info(f"Primary transcript source still running after {TRANSCRIPT_HEDGE_DELAY}s, hedging")
+        except asyncio.CancelledError:
+            # The shield keeps the primary alive for the race, which will not happen now
+            primary.cancel()
+            raise
         except Exception as e:
-            # First attempt failed, log the error
             logger.error(f"Error getting transcript: {str(e)}")
-            
-            # Second attempt: Try with English language code explicitly
-            logger.info("Trying to get transcript with language code 'en'")
-            try:
-                transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
-                logger.info(f"Successfully retrieved English transcript with {len(transcript_list)} entries")
-                
-                # Combine transcript pieces into a single text
-                transcript_text = ""
-                for entry in transcript_list:
-                    transcript_text += entry['text'] + " "
-                
-                # Clean up the transcript
-                transcript_text = transcript_text.strip()
-                logger.info(f"Transcript processed. Length: {len(transcript_text)} characters")
-                
-                return {
-                    "transcript": transcript_text,
-                    "video_id": video_id
-                }
-            except Exception as e2:
-                logger.error(f"Error getting transcript with language code: {str(e2)}")
-                
-                # Third attempt: Try getting all available transcripts and selecting the first one
-                logger.info("Trying to list all available transcripts")
-                try:
-                    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                    first_transcript = next(iter(transcript_list))
-                    logger.info(f"Found transcript in language: {first_transcript.language}")
-                    transcript_list = first_transcript.fetch()
-                    logger.info(f"Successfully retrieved transcript in {first_transcript.language}")
-                    
-                    # Combine transcript pieces into a single text
-                    transcript_text = ""
-                    for entry in transcript_list:
-                        transcript_text += entry['text'] + " "
-                    
-                    # Clean up the transcript
-                    transcript_text = transcript_text.strip()
-                    logger.info(f"Transcript processed. Length: {len(transcript_text)} characters")
-                    
-                    return {
-                        "transcript": transcript_text,
-                        "video_id": video_id
-                    }
-                except Exception as e3:
-                    logger.error(f"All standard transcript retrieval methods failed: {str(e3)}")
-                    
-                    # Last attempt: Try alternative API
-                    logger.info("Trying alternative API as final fallback")
-                    try:
-                        transcript_text = get_transcript_with_alternative_api(video_id)
-                        return {
-                            "transcript": transcript_text,
-                            "video_id": video_id
-                        }
-                    except Exception as e4:
-                        logger.error(f"Alternative API fallback failed: {str(e4)}")
-                        raise ValueError("No transcript available for this video after all attempts. This video likely doesn't have captions enabled.")
-    
-    except TranscriptsDisabled:
-        logger.error(f"TranscriptsDisabled error for video ID: {video_id}")
         
-        # Try alternative API as a last resort
-        try:
-            transcript_text = get_transcript_with_alternative_api(video_id)
-            return {
-                "transcript": transcript_text,
-                "video_id": video_id
-            }
-        except Exception as alt_error:
-            logger.error(f"Alternative API failed after TranscriptsDisabled: {str(alt_error)}")
-            raise ValueError("Transcripts are disabled for this video and alternative methods failed.")
-            
-    except NoTranscriptFound:
-        logger.error(f"NoTranscriptFound error for video ID: {video_id}")
+        fallbacks = {
+            "youtube_transcript_api_en": lambda: get_transcript_with_transcript_api(video_id, languages=['en']),
+            "youtube_transcript_list": lambda: get_transcript_from_transcript_list(video_id),
+        }
+        if PYTUBE_AVAILABLE:
+            fallbacks["pytube"] = lambda: get_transcript_with_pytube(video_id)
+        for api in ALTERNATIVE_APIS:
+            fallbacks[api["name"]] = lambda api=api: get_transcript_from_alternative_api(api, video_id)
+        if BEAUTIFULSOUP_AVAILABLE:
+            fallbacks["scraping"] = lambda: get_transcript_by_scraping(video_id)
         
-        # Try alternative API as a last resort
-        try:
-            transcript_text = get_transcript_with_alternative_api(video_id)
-            return {
-                "transcript": transcript_text,
-                "video_id": video_id
-            }
-        except Exception as alt_error:
-            logger.error(f"Alternative API failed after NoTranscriptFound: {str(alt_error)}")
-            raise ValueError("No transcript found for this video. It might not have captions available.")
-            
-    except ValueError as ve:
-        # Pass through any ValueError we raised ourselves
-        logger.error(f"ValueError: {str(ve)}")
+        # Launch fallbacks in order of expected time-to-success
+        sources = [("youtube_transcript_api", lambda: primary)]
+        for name in provider_registry.rank(list(fallbacks)):
+            sources.append((name, lambda name=name: run_transcript_source(name, fallbacks[name])))
+        return await race_transcript_sources(sources)
+    
+    try:
+        with timed(TRANSCRIPT_FETCH_SECONDS):
+            source, transcript = await asyncio.wait_for(hedged(), TRANSCRIPT_DEADLINE)
+    except asyncio.TimeoutError:
+        logger.error(f"Transcript retrieval for video ID {video_id} exceeded {TRANSCRIPT_DEADLINE}s")
+        raise ValueError("Timed out fetching the transcript for this video. Please try again later.")
+    except NoTranscriptError as e:
+        summary = "; ".join(f"{name}: {source['outcome']} ({source['error']})" for name, source in e.sources.items())
+        logger.error(f"All transcript retrieval methods failed for video ID {video_id}: {summary}")
         raise
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        raise ValueError(f"Error fetching transcript: {str(e)}") 
\ No newline at end of file
+    
+    logger.info(f"Transcript retrieved from {source}. Length: {len(transcript.text)} characters")
+    return await normalize_result({**transcript.to_payload(), "video_id": video_id})
+
+@instrument(STAGE_SECONDS, stage="normalize")
+async def normalize_result(result: dict) -> dict:
+    """
+    Normalize the transcript of a get_youtube_transcript result (see normalize_transcript)
+    
+    Args:
+        result: Transcript payload with video_id
+        
+    Returns:
+        A result of the same shape with the cleaned transcript, plus
+        normalization statistics under "normalization"
+    """
+    transcript, stats = await run_parser(normalize_transcript, Transcript.from_payload(result))
+    logger.info(f"Normalized transcript for video ID {result['video_id']}: {stats['tokens_saved']} tokens saved")
+    return {**transcript.to_payload(), "video_id": result["video_id"], "normalization": stats}
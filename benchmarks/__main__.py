@@ -0,0 +1,94 @@
+"""
+Benchmark command line
+
+    python -m benchmarks run                      # all scenarios, compared with baseline.json
+    python -m benchmarks run --scenario quiz --size full
+    python -m benchmarks run --update-baseline    # record this run as the new baseline
+    python -m benchmarks replay benchmarks/traffic/requests.jsonl --speed 2
+
+`run` exits with status 1 when a scenario regresses against the baseline.
+"""
+import sys
+import json
+import asyncio
+import logging
+import argparse
+
+from benchmarks.harness import (
+    SCENARIOS, SIZES, BASELINE_PATH, REGRESSION_TOLERANCE, DEFAULT_LIMIT_SCENARIOS, running_stack, replay,
+    load_traffic, calibrate, compare, load_baseline, save_baseline,
+)
+
+def _print_result(name: str, result: dict) -> None:
+    print(
+        f"{name:<20} {result['requests']:>5} req  {result['throughput']:>8.2f} req/s  "
+        f"p50 {result['p50'] * 1000:>8.1f}ms  p95 {result['p95'] * 1000:>8.1f}ms  "
+        f"p99 {result['p99'] * 1000:>8.1f}ms  errors {result['error_rate']:.2%}  shed {result['shed_rate']:.2%}  "
+        f"{result['statuses']}"
+    )
+
+def command_run(args: argparse.Namespace) -> int:
+    names = args.scenario or list(SCENARIOS)
+    size = SIZES[args.size]
+    results = {}
+    # Scenarios needing the default scheduler limits get a service of their own
+    for default_limits in (False, True):
+        group = [name for name in names if (name in DEFAULT_LIMIT_SCENARIOS) == default_limits]
+        if not group:
+            continue
+        with running_stack(args.fakes, workers=args.workers, default_limits=default_limits) as base_url:
+            calibration = asyncio.run(calibrate(base_url, size))
+            _print_result("calibration", calibration)
+            for name in group:
+                results[name] = {**asyncio.run(SCENARIOS[name](base_url, size)), "calibration": calibration["throughput"]}
+                _print_result(name, results[name])
+
+    baselines = load_baseline(args.baseline)
+    if args.update_baseline:
+        baselines[args.size] = {**baselines.get(args.size, {}), **results}
+        save_baseline(baselines, args.baseline)
+        print(f"Baseline for size '{args.size}' written to {args.baseline}")
+        return 0
+    if args.fakes:
+        print("Fake overrides given, not comparing with the baseline")
+        return 0
+    regressions = compare(results, baselines.get(args.size, {}), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+def command_replay(args: argparse.Namespace) -> int:
+    entries = load_traffic(args.file)
+    with running_stack(args.fakes, workers=args.workers) as base_url:
+        result = asyncio.run(replay(base_url, entries, args.speed))
+    _print_result("replay", result)
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline benchmarks against local fakes")
+    parser.add_argument("--fakes", type=json.loads, default=None,
+                        help="JSON per-fake overrides, e.g. '{\"groq\": {\"latency\": 1, \"rate_limit_rate\": 0.1}}'")
+    parser.add_argument("--workers", type=int, default=1, help="Service worker processes")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run load scenarios")
+    run.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Scenario to run (repeatable; default all)")
+    run.add_argument("--size", choices=list(SIZES), default="quick")
+    run.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    run.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    run.add_argument("--update-baseline", action="store_true")
+    run.set_defaults(handler=command_run)
+
+    replay_command = commands.add_parser("replay", help="Replay captured traffic")
+    replay_command.add_argument("file", help="JSON lines file of requests")
+    replay_command.add_argument("--speed", type=float, default=1.0)
+    replay_command.set_defaults(handler=command_replay)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
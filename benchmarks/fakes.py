@@ -0,0 +1,307 @@
+"""
+Local stand-ins for YouTube, Invidious and the Groq API
+
+Each fake is a small FastAPI app with configurable latency, jitter,
+failure rate and streaming behaviour. Transcripts are generated from the
+video ID, so every run serves the same content. Run all three with:
+
+    python -m benchmarks.fakes --youtube-port 9101 --invidious-port 9102 --groq-port 9103
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+
+DEFAULT_FAKE_CONFIG: Dict[str, Dict[str, Any]] = {
+    "youtube": {
+        "latency": 0.05,
+        "jitter": 0.02,
+        "failure_rate": 0.0,
+        # Share of videos whose watch page has no caption tracks
+        "no_captions_rate": 0.0,
+        # Watch page size and how it is streamed
+        "page_kb": 300,
+        "chunk_chars": 8192,
+        "chunk_delay": 0.001,
+        "segments": 600,
+    },
+    "invidious": {
+        "latency": 0.4,
+        "jitter": 0.2,
+        "failure_rate": 0.3,
+    },
+    "groq": {
+        # Time to first token, then per streamed chunk
+        "latency": 0.25,
+        "jitter": 0.05,
+        "token_delay": 0.002,
+        "chars_per_chunk": 16,
+        "failure_rate": 0.0,
+        "rate_limit_rate": 0.0,
+        "summary_tokens": 300,
+    },
+}
+
+_WORDS = (
+    "energy cell membrane protein gradient network market history empire theory data model signal "
+    "function limit derivative integral vector matrix equation pressure climate ocean carbon trade "
+    "language memory learning evolution species gene enzyme reaction atom orbit planet light wave"
+).split()
+_NOISE = ("[Music]", "[Applause]", "um", "uh")
+
+def merge_config(overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Default fake configuration with per-fake overrides applied
+    """
+    config = {name: dict(values) for name, values in DEFAULT_FAKE_CONFIG.items()}
+    for name, values in (overrides or {}).items():
+        config.setdefault(name, {}).update(values)
+    return config
+
+def transcript_segments(video_id: str, count: int) -> List[Dict[str, Any]]:
+    """
+    Deterministic caption segments for a video, with some caption noise
+    """
+    rng = random.Random(video_id)
+    segments = []
+    for index in range(count):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 12))]
+        if rng.random() < 0.05:
+            words.insert(0, rng.choice(_NOISE))
+        segments.append({"start": index * 2.5, "duration": 2.5, "text": " ".join(words)})
+    return segments
+
+def transcript_text(video_id: str, count: int) -> str:
+    return " ".join(segment["text"] for segment in transcript_segments(video_id, count))
+
+class _Behaviour:
+    """
+    Latency and failure injection shared by the fakes
+
+    Draws are seeded by the request key (video ID or prompt) and how often
+    that key was requested before, so a request gets the same latency and
+    outcome in every run whatever the interleaving of concurrent requests,
+    which keeps runs comparable with a baseline, while retries still get
+    fresh draws.
+    """
+
+    def __init__(self, config: Dict[str, Any], seed: int):
+        self.config = config
+        self.seed = seed
+        self._attempts: Dict[str, int] = {}
+
+    def draw(self, key: str) -> random.Random:
+        attempt = self._attempts.get(key, 0)
+        self._attempts[key] = attempt + 1
+        return random.Random(f"{self.seed}:{key}:{attempt}")
+
+    async def delay(self, rng: random.Random) -> None:
+        latency = self.config.get("latency", 0.0) + rng.uniform(-1, 1) * self.config.get("jitter", 0.0)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def fails(self, rng: random.Random, key: str = "failure_rate") -> bool:
+        return rng.random() < self.config.get(key, 0.0)
+
+def create_youtube_app(config: Dict[str, Any], seed: int = 1) -> FastAPI:
+    """
+    Watch pages, timedtext caption files and playlist pages
+    """
+    app = FastAPI()
+    behaviour = _Behaviour(config, seed)
+
+    async def stream_text(text: str) -> AsyncIterator[str]:
+        size = config["chunk_chars"]
+        for start in range(0, len(text), size):
+            yield text[start:start + size]
+            if config["chunk_delay"]:
+                await asyncio.sleep(config["chunk_delay"])
+
+    @app.get("/watch")
+    async def watch(request: Request, v: str):
+        rng = behaviour.draw(f"watch:{v}")
+        await behaviour.delay(rng)
+        if behaviour.fails(rng):
+            return HTMLResponse("Service unavailable", status_code=503)
+        padding = "<div class=\"filler\">" + "x" * 1000 + "</div>\n"
+        pages = max(1, config["page_kb"])
+        head = padding * int(pages * 0.6)
+        tail = padding * (pages - int(pages * 0.6))
+        if random.Random(v).random() < config["no_captions_rate"]:
+            player = {"playabilityStatus": {"status": "OK"}}
+        else:
+            base = str(request.base_url).rstrip("/")
+            player = {"captions": {"playerCaptionsTracklistRenderer": {"captionTracks": [
+                {"baseUrl": f"{base}/api/timedtext?v={v}&lang=en", "languageCode": "en", "kind": "asr"}
+            ]}}}
+        page = f"<html><head></head><body>{head}<script>var ytInitialPlayerResponse = {json.dumps(player)};</script>{tail}</body></html>"
+        return StreamingResponse(stream_text(page), media_type="text/html")
+
+    @app.get("/api/timedtext")
+    async def timedtext(v: str):
+        rng = behaviour.draw(f"timedtext:{v}")
+        await behaviour.delay(rng)
+        if behaviour.fails(rng):
+            return HTMLResponse("Service unavailable", status_code=503)
+        parts = ['<?xml version="1.0" encoding="utf-8" ?><transcript>']
+        for segment in transcript_segments(v, config["segments"]):
+            text = segment["text"].replace("'", "&amp;#39;")
+            parts.append(f'<text start="{segment["start"]}" dur="{segment["duration"]}">{text}</text>')
+        parts.append("</transcript>")
+        return StreamingResponse(stream_text("".join(parts)), media_type="text/xml")
+
+    @app.get("/playlist")
+    async def playlist(list: str):
+        await behaviour.delay(behaviour.draw(f"playlist:{list}"))
+        rng = random.Random(list)
+        entries = "".join(
+            f'"playlistVideoRenderer":{{"videoId":"bench{rng.randint(0, 999999):06d}"}},' for _ in range(50)
+        )
+        return HTMLResponse(f"<html><body><script>var data = {{{entries}}};</script></body></html>")
+
+    return app
+
+def create_invidious_app(config: Dict[str, Any], seed: int = 2) -> FastAPI:
+    """
+    The two Invidious response shapes the service reads
+    """
+    app = FastAPI()
+    behaviour = _Behaviour(config, seed)
+    segments = DEFAULT_FAKE_CONFIG["youtube"]["segments"]
+
+    @app.get("/api/v1/captions/{video_id}")
+    async def captions(video_id: str):
+        rng = behaviour.draw(f"captions:{video_id}")
+        await behaviour.delay(rng)
+        if behaviour.fails(rng):
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        return {"description": transcript_text(video_id, segments)}
+
+    @app.get("/api/v1/videos/{video_id}")
+    async def video(video_id: str):
+        rng = behaviour.draw(f"videos:{video_id}")
+        await behaviour.delay(rng)
+        if behaviour.fails(rng):
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        return {"captions": [{"label": segment["text"]} for segment in transcript_segments(video_id, segments)]}
+
+    return app
+
+def _fake_questions(count: int, rng: random.Random) -> str:
+    questions = []
+    for index in range(count):
+        options = [f"{rng.choice(_WORDS)} {rng.choice(_WORDS)}" for _ in range(4)]
+        questions.append({
+            "question": f"Question {index + 1} about {rng.choice(_WORDS)} and {rng.choice(_WORDS)}?",
+            "options": options,
+            "correctAnswer": options[0],
+            "explanation": f"Because of {rng.choice(_WORDS)}.",
+        })
+    return json.dumps(questions, indent=2)
+
+def create_groq_app(config: Dict[str, Any], seed: int = 3) -> FastAPI:
+    """
+    OpenAI-compatible chat completions as served by Groq, streamed or not
+    """
+    app = FastAPI()
+    behaviour = _Behaviour(config, seed)
+
+    def completion_text(body: Dict[str, Any], prompt: str) -> str:
+        rng = random.Random(prompt)
+        match = re.search(r"Create (\d+) multiple-choice", prompt)
+        if match:
+            return _fake_questions(int(match.group(1)), rng)
+        tokens = min(body.get("max_tokens") or config["summary_tokens"], config["summary_tokens"])
+        return " ".join(rng.choice(_WORDS) for _ in range(tokens))
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        rng = behaviour.draw(prompt)
+        await behaviour.delay(rng)
+        if behaviour.fails(rng, "rate_limit_rate"):
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": "1"},
+            )
+        if behaviour.fails(rng):
+            return JSONResponse({"error": {"message": "Service unavailable", "type": "internal_server_error"}}, status_code=503)
+        content = completion_text(body, prompt)
+        prompt_chars = len(prompt)
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_chars // 4 + len(content) // 4,
+        }
+        common = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "fake"), "system_fingerprint": "fake"}
+        if not body.get("stream"):
+            return {
+                **common,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            size = config["chars_per_chunk"]
+            for start in range(0, len(content), size):
+                chunk = {
+                    **common,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None, "logprobs": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if config["token_delay"]:
+                    await asyncio.sleep(config["token_delay"])
+            final = {
+                **common,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop", "logprobs": None}],
+                "x_groq": {"usage": usage},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+async def serve_fakes(ports: Dict[str, int], config: Dict[str, Dict[str, Any]], host: str = "127.0.0.1") -> None:
+    """
+    Serve the fakes on the given ports until cancelled
+    """
+    import uvicorn
+
+    factories = {"youtube": create_youtube_app, "invidious": create_invidious_app, "groq": create_groq_app}
+    servers = [
+        uvicorn.Server(uvicorn.Config(factories[name](config[name]), host=host, port=port, log_level="warning"))
+        for name, port in ports.items()
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the benchmark fakes")
+    parser.add_argument("--youtube-port", type=int, default=9101)
+    parser.add_argument("--invidious-port", type=int, default=9102)
+    parser.add_argument("--groq-port", type=int, default=9103)
+    parser.add_argument("--config", help="JSON object of per-fake overrides, e.g. '{\"groq\": {\"latency\": 1}}'")
+    args = parser.parse_args()
+    config = merge_config(json.loads(args.config) if args.config else None)
+    ports = {"youtube": args.youtube_port, "invidious": args.invidious_port, "groq": args.groq_port}
+    asyncio.run(serve_fakes(ports, config))
+
+if __name__ == "__main__":
+    main()
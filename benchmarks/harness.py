@@ -0,0 +1,467 @@
+"""
+Run the service against the local fakes and measure it under load
+
+The fakes and the service run as subprocesses on free local ports. The
+service is pointed at the fakes through its normal configuration:
+YOUTUBE_BASE_URL for watch pages and playlists, GROQ_BASE_URL for the Groq
+SDK and TRANSCRIPT_PROVIDERS for the Invidious instances. The
+youtube-transcript-api and pytube sources cannot be redirected, so they
+are disabled, and every transcript comes from scraping or Invidious.
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import logging
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.fakes import merge_config, transcript_text
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Headers every benchmark request sends; the fake Groq server accepts any key
+BENCH_HEADERS = {"X-API-Key": "bench-key", "X-API-Provider": "groq"}
+
+# Sources that talk to hosts we cannot point at the fakes
+UNREDIRECTABLE_SOURCES = ["youtube_transcript_api", "youtube_transcript_api_en", "youtube_transcript_list", "pytube"]
+
+# Allowed slowdown (fraction) of a latency percentile, and drop in throughput,
+# before a run counts as a regression against the baseline
+REGRESSION_TOLERANCE = float(os.getenv("BENCH_REGRESSION_TOLERANCE", "0.25"))
+# Latency growth (seconds) below which a percentile never counts as regressed;
+# millisecond cache hits jitter by more than the tolerance
+REGRESSION_MIN_SECONDS = float(os.getenv("BENCH_REGRESSION_MIN_SECONDS", "0.05"))
+# Growth of the error or shed rate (fraction of requests) tolerated as noise
+REGRESSION_ERROR_TOLERANCE = float(os.getenv("BENCH_REGRESSION_ERROR_TOLERANCE", "0.02"))
+
+# Scheduler limits lifted for most scenarios, to measure the service rather
+# than the politeness limits meant for real upstreams
+UNLIMITED_ENV = {
+    "GROQ_RPM": "100000",
+    "GROQ_TPM": "100000000",
+    "LLM_KEY_CONCURRENCY": "64",
+    "LLM_QUEUE_LIMIT": "1024",
+}
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def service_env(ports: Dict[str, int], cache_dir: str, default_limits: bool = False) -> Dict[str, str]:
+    """
+    Environment that points the service at the fakes
+
+    Args:
+        ports: Ports of the fakes
+        cache_dir: Transcript cache directory
+        default_limits: Keep the service's default Groq scheduler limits
+            instead of lifting them (see UNLIMITED_ENV)
+    """
+    invidious = f"http://127.0.0.1:{ports['invidious']}"
+    providers = {
+        "disabled": UNREDIRECTABLE_SOURCES,
+        "alternative_apis": [
+            {"name": "invidious-captions", "url": f"{invidious}/api/v1/captions/{{video_id}}", "extract": "description"},
+            {"name": "invidious-videos", "url": f"{invidious}/api/v1/videos/{{video_id}}?fields=captions", "extract": "caption_labels"},
+        ],
+    }
+    env = dict(os.environ)
+    env.update({
+        "YOUTUBE_BASE_URL": f"http://127.0.0.1:{ports['youtube']}",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{ports['groq']}",
+        "TRANSCRIPT_PROVIDERS": json.dumps(providers),
+        "TRANSCRIPT_CACHE_DIR": cache_dir,
+        # The primary source is disabled, so hedge straight away
+        "TRANSCRIPT_HEDGE_DELAY": "0",
+        # The fakes are not rate limited, so neither are the requests to them
+        "HOST_RATE_LIMIT": "10000",
+        "HOST_RATE_BURST": "10000",
+    })
+    env.pop("TRANSCRIPT_PROVIDERS_FILE", None)
+    env.pop("HOST_RATE_LIMITS", None)
+    if default_limits:
+        for name in UNLIMITED_ENV:
+            env.pop(name, None)
+    else:
+        env.update(UNLIMITED_ENV)
+    return env
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process serving {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+@contextmanager
+def running_stack(
+    fake_overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    workers: int = 1,
+    default_limits: bool = False,
+) -> Iterator[str]:
+    """
+    Start the fakes and the service, and stop them on exit
+
+    Args:
+        fake_overrides: Per-fake configuration overrides (see fakes.DEFAULT_FAKE_CONFIG)
+        workers: Service worker processes
+        default_limits: Run the service with its default Groq scheduler limits
+
+    Yields:
+        Base URL of the service
+    """
+    ports = {name: free_port() for name in ("youtube", "invidious", "groq", "service")}
+    workdir = tempfile.mkdtemp(prefix="epochly-bench-")
+    fakes_log = open(os.path.join(workdir, "fakes.log"), "wb")
+    service_log = open(os.path.join(workdir, "service.log"), "wb")
+    fakes = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fakes",
+            "--youtube-port", str(ports["youtube"]),
+            "--invidious-port", str(ports["invidious"]),
+            "--groq-port", str(ports["groq"]),
+            "--config", json.dumps(merge_config(fake_overrides)),
+        ],
+        cwd=ROOT, stdout=fakes_log, stderr=subprocess.STDOUT,
+    )
+    service = None
+    try:
+        for name in ("youtube", "invidious", "groq"):
+            wait_ready(f"http://127.0.0.1:{ports[name]}/docs", fakes)
+        service = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(ports["service"]),
+                "--workers", str(workers), "--log-level", "warning",
+            ],
+            cwd=ROOT, env=service_env(ports, os.path.join(workdir, "cache"), default_limits),
+            stdout=service_log, stderr=subprocess.STDOUT,
+        )
+        base_url = f"http://127.0.0.1:{ports['service']}"
+        wait_ready(f"{base_url}/", service)
+        logger.info(f"Benchmark stack running, logs in {workdir}")
+        yield base_url
+    finally:
+        if service is not None:
+            _stop(service)
+        _stop(fakes)
+        fakes_log.close()
+        service_log.close()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """
+    Summary of a load run
+
+    Requests shed with 429 are counted apart from errors: shedding is how
+    the service is meant to answer more LLM work than a key's limits allow.
+    """
+    ordered = sorted(latencies)
+    ok = statuses.get("200", 0)
+    shed = statuses.get("429", 0)
+    return {
+        "requests": len(latencies),
+        "statuses": dict(sorted(statuses.items())),
+        "error_rate": round(1 - (ok + shed) / len(latencies), 4) if latencies else 0.0,
+        "shed_rate": round(shed / len(latencies), 4) if latencies else 0.0,
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50": round(percentile(ordered, 0.50), 4),
+        "p95": round(percentile(ordered, 0.95), 4),
+        "p99": round(percentile(ordered, 0.99), 4),
+        "max": round(ordered[-1], 4) if ordered else 0.0,
+    }
+
+# A request is (method, path, JSON body or None, extra headers or None)
+Request = Tuple[str, str, Optional[Dict[str, Any]], Optional[Dict[str, str]]]
+
+async def _send(client: httpx.AsyncClient, request: Request) -> Tuple[float, str]:
+    method, path, body, headers = request
+    started = time.perf_counter()
+    try:
+        # The body is read in full, so streamed responses count until their last byte
+        response = await client.request(method, path, json=body, headers={**BENCH_HEADERS, **(headers or {})})
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    return time.perf_counter() - started, status
+
+async def run_load(
+    base_url: str,
+    requests: List[Request],
+    concurrency: int,
+    timeout: float = 120,
+) -> Dict[str, Any]:
+    """
+    Send requests from a fixed number of concurrent workers (closed loop)
+
+    Args:
+        base_url: Service base URL
+        requests: Requests to send, in order
+        concurrency: Requests in flight at any time
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        Summary with throughput (requests/s) and p50/p95/p99 latency in seconds
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    queue = iter(requests)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker() -> None:
+            for request in queue:
+                latency, status = await _send(client, request)
+                latencies.append(latency)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, statuses, elapsed)
+
+async def replay(base_url: str, entries: List[Dict[str, Any]], speed: float = 1.0) -> Dict[str, Any]:
+    """
+    Replay captured traffic with its original timing (open loop)
+
+    Each entry is sent at its "t" offset (seconds from the start of the
+    capture) divided by `speed`, whether or not earlier requests have
+    finished, so bursts in the capture are bursts in the replay.
+
+    Args:
+        base_url: Service base URL
+        entries: Captured requests with "method", "path", optional "body",
+            "headers" and "t"
+        speed: Replay speed multiplier
+
+    Returns:
+        Summary of the replay, as for run_load
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    entries = sorted(entries, key=lambda entry: entry.get("t", 0))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=None)) as client:
+        started = time.perf_counter()
+
+        async def fire(entry: Dict[str, Any]) -> None:
+            delay = entry.get("t", 0) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            latency, status = await _send(
+                client, (entry.get("method", "GET"), entry["path"], entry.get("body"), entry.get("headers"))
+            )
+            latencies.append(latency)
+            statuses[status] = statuses.get(status, 0) + 1
+
+        await asyncio.gather(*(fire(entry) for entry in entries))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, statuses, elapsed)
+
+def load_traffic(path: str) -> List[Dict[str, Any]]:
+    """
+    Read captured traffic, one JSON request per line (blank lines and # comments skipped)
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                entries.append(json.loads(line))
+    return entries
+
+def bench_video_ids(prefix: str, count: int) -> List[str]:
+    """
+    Distinct valid 11-character video IDs, e.g. "cold0000001"
+    """
+    width = 11 - len(prefix)
+    return [f"{prefix}{index:0{width}d}" for index in range(count)]
+
+def _transcript_request(video_id: str) -> Request:
+    return ("POST", "/api/transcript", {"url": f"https://www.youtube.com/watch?v={video_id}"}, None)
+
+def _quiz_request(video_id: str, questions: int) -> Request:
+    # Bypass the LLM result cache so every request reaches the (fake) model
+    return ("POST", "/api/youtube/generate-quiz", {"video_id": video_id, "numQuestions": questions}, {"X-LLM-Cache": "bypass"})
+
+def _text_quiz_request(text: str, questions: int, bypass: bool) -> Request:
+    return (
+        "POST", "/api/youtube/generate-quiz", {"transcript": text, "numQuestions": questions},
+        {"X-LLM-Cache": "bypass"} if bypass else None,
+    )
+
+async def _warm(base_url: str, video_ids: List[str]) -> None:
+    await run_load(base_url, [_transcript_request(video_id) for video_id in video_ids], concurrency=8)
+
+async def scenario_transcript_cold(base_url: str, size: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Every request is for a new video: scraping, parsing and normalization
+    """
+    ids = bench_video_ids("cold", size["requests"])
+    return await run_load(base_url, [_transcript_request(video_id) for video_id in ids], size["concurrency"])
+
+async def scenario_transcript_warm(base_url: str, size: Dict[str, int]) -> Dict[str, Any]:
+    """
+    A few popular videos requested over and over: the cache hit path
+    """
+    ids = bench_video_ids("warm", 10)
+    await _warm(base_url, ids)
+    requests = [_transcript_request(ids[index % len(ids)]) for index in range(size["requests"])]
+    return await run_load(base_url, requests, size["concurrency"])
+
+async def scenario_quiz(base_url: str, size: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Quizzes on stored transcripts with the LLM cache bypassed: sharded
+    generation, scheduling and parsing of model output
+    """
+    ids = bench_video_ids("quiz", 10)
+    await _warm(base_url, ids)
+    requests = [_quiz_request(ids[index % len(ids)], 10) for index in range(max(1, size["requests"] // 4))]
+    return await run_load(base_url, requests, size["concurrency"])
+
+async def scenario_quiz_default_limits(base_url: str, size: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Quizzes for one key under the default Groq limits
+
+    Most requests are for a few popular quizzes already in the LLM cache,
+    which are admitted for free. Every fourth is a fresh quiz on a short
+    (five-minute) transcript, charged its prompt and completion; those
+    arriving together queue for the token budget or, past
+    LLM_MAX_QUEUE_WAIT, get 429s.
+    """
+    texts = [transcript_text(video_id, 120) for video_id in bench_video_ids("limit", 10)]
+    popular, fresh = texts[:3], texts[3:]
+    # Generated one at a time, which the token budget allows
+    for text in popular:
+        await run_load(base_url, [_text_quiz_request(text, 5, bypass=False)], concurrency=1)
+    requests = [
+        _text_quiz_request(fresh[(index // 4) % len(fresh)], 5, bypass=True) if index % 4 == 3
+        else _text_quiz_request(popular[index % len(popular)], 5, bypass=False)
+        for index in range(size["concurrency"] * 2)
+    ]
+    return await run_load(base_url, requests, size["concurrency"])
+
+async def calibrate(base_url: str, size: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Measure how fast this machine serves a trivial request
+
+    Run in the same process as the scenarios, so their results can be
+    related to the machine that produced them (see compare).
+    """
+    requests: List[Request] = [("GET", "/", None, None)] * (size["requests"] * 5)
+    return await run_load(base_url, requests, size["concurrency"])
+
+SCENARIOS: Dict[str, Callable[[str, Dict[str, int]], Awaitable[Dict[str, Any]]]] = {
+    "transcript-cold": scenario_transcript_cold,
+    "transcript-warm": scenario_transcript_warm,
+    "quiz": scenario_quiz,
+    "quiz-default-limits": scenario_quiz_default_limits,
+}
+
+# Scenarios run against a service with its default Groq scheduler limits
+DEFAULT_LIMIT_SCENARIOS = {"quiz-default-limits"}
+
+# Requests and concurrency per scenario run
+SIZES = {
+    "quick": {"requests": 80, "concurrency": 8},
+    "full": {"requests": 400, "concurrency": 32},
+}
+
+def slowdown(result: Dict[str, Any], expected: Dict[str, Any]) -> float:
+    """
+    How much slower this run's machine is than the baseline's, never below 1
+
+    Both results carry the throughput of the calibration run (see calibrate)
+    measured alongside them; their ratio scales the baseline. A faster
+    machine is compared with the baseline as recorded, as much of each
+    scenario is spent waiting on the fakes' fixed latencies, which do not
+    shrink with it.
+    """
+    if not result.get("calibration") or not expected.get("calibration"):
+        return 1.0
+    return max(1.0, expected["calibration"] / result["calibration"])
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = REGRESSION_TOLERANCE,
+) -> List[str]:
+    """
+    Regressions of a run against a stored baseline
+
+    The baseline's latencies and throughput are first scaled by how much
+    slower this machine is (see slowdown). A scenario then regresses when
+    a latency percentile grows by more than `tolerance` and by more than
+    REGRESSION_MIN_SECONDS, when throughput shrinks by more than
+    `tolerance`, or when its error or shed rate grows by more than
+    REGRESSION_ERROR_TOLERANCE. Scenarios missing from the baseline are not
+    compared.
+
+    Returns:
+        One message per regression; empty if there are none
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        factor = slowdown(result, expected)
+        scaled = f" (x{factor:.2f} for this machine)" if factor > 1 else ""
+        for key in ("p50", "p95", "p99"):
+            allowed = expected.get(key, 0) * factor
+            limit = max(allowed * (1 + tolerance), allowed + REGRESSION_MIN_SECONDS)
+            if expected.get(key) and result[key] > limit:
+                regressions.append(f"{name}: {key} {result[key]:.4f}s > baseline {allowed:.4f}s{scaled}")
+        if expected.get("throughput"):
+            allowed = expected["throughput"] / factor
+            if result["throughput"] < allowed * (1 - tolerance):
+                regressions.append(f"{name}: throughput {result['throughput']}/s < baseline {allowed:.2f}/s{scaled}")
+        for key in ("error_rate", "shed_rate"):
+            if result.get(key, 0.0) > expected.get(key, 0.0) + REGRESSION_ERROR_TOLERANCE:
+                regressions.append(f"{name}: {key.replace('_', ' ')} {result[key]} > baseline {expected.get(key, 0.0)}")
+    return regressions
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_baseline(results: Dict[str, Dict[str, Any]], path: str = BASELINE_PATH) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,20 @@
+from app.services.chunking import chunk_text, sentence_units, split_into_parts
+
+URL = "https://example.com/watch?v=abcdefghijklmnopqrstuvwxyz"
+
+def test_chunk_text_cuts_long_words_without_losing_characters():
+    assert chunk_text("abcdefghijklmnop", 1) == ["abcd", "efgh", "ijkl", "mnop"]
+    assert "".join(chunk_text(URL, 2)) == URL
+
+def test_split_into_parts_cuts_long_words_without_losing_characters():
+    assert split_into_parts("short", 3) == ["s", "h", "ort"]
+    assert "".join(split_into_parts(URL, 4)) == URL
+
+def test_sentence_units_cuts_long_words_without_losing_characters():
+    assert "".join(sentence_units(URL, 8)) == URL
+    assert sentence_units("see " + URL, 8)[:3] == ["see", "https://", "example."]
+
+def test_word_boundaries_are_still_preferred():
+    assert chunk_text("aaa bbb ccc", 2) == ["aaa bbb", "ccc"]
+    text = "One two. Three four. Five six."
+    assert " ".join(split_into_parts(text, 3)) == text